@@ -0,0 +1,186 @@
+"""
+Oil Shop Management System - Inventory Analytics
+Margin, GMROI, days of cover, sell-through and ABC classes per product and
+category.
+
+Two bulk queries feed the calculation: the product list and sale_items
+aggregated per product by the database over the period (a range on
+created_at, so only the matching partitions are read). Everything else is
+column arithmetic in pandas/NumPy, which stays in the low seconds for 100k
+SKUs. pandas and NumPy are imported on first use, not at start-up.
+
+Definitions, over a period of `period_days`:
+  margin_pct     gross margin / revenue, at the cost recorded on each sale line
+  gmroi          annualized gross margin / stock on hand at cost
+  days_of_cover  stock on hand / average units sold per day
+  sell_through   units sold / (units sold + stock on hand)
+  abc            A for the products making the first 80% of revenue, B up
+                 to 95%, C for the rest (including products without sales)
+"""
+
+from datetime import date, timedelta
+
+ANALYTICS_CONFIG = {
+    'period_days': 90,
+    'max_period_days': 730,
+    'abc_thresholds': (0.80, 0.95),
+}
+
+# `+ 0E0` turns DECIMAL into DOUBLE (an E-notation literal is a float), on any
+# MySQL version and on SQLite; CAST(... AS DOUBLE) needs MySQL 8.0.17
+PRODUCTS_SQL = """
+    SELECT id, name, barcode, category,
+           price + 0E0, cost_price + 0E0, quantity, min_stock_level
+    FROM products
+"""
+PRODUCT_COLUMNS = ['product_id', 'name', 'barcode', 'category',
+                   'price', 'cost_price', 'quantity', 'min_stock_level']
+
+SALES_BY_PRODUCT_SQL = """
+    SELECT product_id, SUM(quantity), SUM(subtotal) + 0E0,
+           SUM(quantity * cost_price) + 0E0
+    FROM sale_items
+    WHERE created_at >= %s AND product_id IS NOT NULL
+    GROUP BY product_id
+"""
+SALES_COLUMNS = ['product_id', 'units_sold', 'revenue', 'cogs']
+
+PRODUCT_OUTPUT = ['product_id', 'name', 'barcode', 'category', 'price', 'cost_price', 'quantity',
+                  'units_sold', 'revenue', 'gross_margin', 'margin_pct', 'unit_margin',
+                  'stock_value', 'gmroi', 'days_of_cover', 'sell_through', 'revenue_share', 'abc']
+CATEGORY_OUTPUT = ['category', 'products', 'quantity', 'units_sold', 'revenue', 'gross_margin',
+                   'margin_pct', 'stock_value', 'gmroi', 'sell_through', 'a_products']
+
+
+def configure(config):
+    ANALYTICS_CONFIG.update(config)
+
+
+def _fetch(conn, sql, params=()):
+    # Plain tuples: no per-row dicts for what can be 100k+ rows
+    cursor = conn.cursor()
+    try:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def load_frames(conn, period_days):
+    """Products and per-product sales since `period_days` ago, as DataFrames"""
+    import pandas as pd
+
+    since = date.today() - timedelta(days=period_days)
+    products = pd.DataFrame.from_records(_fetch(conn, PRODUCTS_SQL), columns=PRODUCT_COLUMNS)
+    sales = pd.DataFrame.from_records(_fetch(conn, SALES_BY_PRODUCT_SQL, (since.isoformat(),)),
+                                      columns=SALES_COLUMNS)
+    return products, sales
+
+
+def _ratio(numerator, denominator):
+    """Element-wise division with NaN where the denominator is zero"""
+    import numpy as np
+
+    numerator = np.asarray(numerator, dtype='float64')
+    denominator = np.asarray(denominator, dtype='float64')
+    out = np.full(numerator.shape, np.nan)
+    np.divide(numerator, denominator, out=out, where=denominator != 0)
+    return out
+
+
+def compute(products, sales, period_days):
+    """Per-product and per-category metrics; returns (products, categories) DataFrames"""
+    import numpy as np
+
+    df = products.merge(sales, on='product_id', how='left')
+    df['units_sold'] = df['units_sold'].fillna(0).astype('int64')
+    df['revenue'] = df['revenue'].fillna(0.0)
+    df['category'] = df['category'].fillna('Uncategorized')
+    df['quantity'] = df['quantity'].fillna(0).clip(lower=0)
+
+    annualize = 365.0 / period_days
+    df['cogs'] = df['cogs'].fillna(0.0)
+    df['gross_margin'] = df['revenue'] - df['cogs']
+    df['margin_pct'] = _ratio(df['gross_margin'], df['revenue'])
+    df['unit_margin'] = df['price'] - df['cost_price']
+    df['stock_value'] = df['quantity'] * df['cost_price']
+    df['gmroi'] = _ratio(df['gross_margin'] * annualize, df['stock_value'])
+    df['days_of_cover'] = _ratio(df['quantity'], df['units_sold'] / period_days)
+    df['sell_through'] = _ratio(df['units_sold'], df['units_sold'] + df['quantity'])
+
+    # Pareto ranking: cumulative revenue share in descending revenue order
+    df = df.sort_values('revenue', ascending=False, kind='stable').reset_index(drop=True)
+    total_revenue = df['revenue'].sum()
+    df['revenue_share'] = df['revenue'] / total_revenue if total_revenue else 0.0
+    cumulative = df['revenue_share'].cumsum() - df['revenue_share']
+    a_limit, b_limit = ANALYTICS_CONFIG['abc_thresholds']
+    df['abc'] = np.where(df['revenue'] <= 0, 'C',
+                         np.where(cumulative < a_limit, 'A', np.where(cumulative < b_limit, 'B', 'C')))
+
+    categories = df.groupby('category', sort=False).agg(
+        products=('product_id', 'size'),
+        quantity=('quantity', 'sum'),
+        units_sold=('units_sold', 'sum'),
+        revenue=('revenue', 'sum'),
+        gross_margin=('gross_margin', 'sum'),
+        stock_value=('stock_value', 'sum'),
+        a_products=('abc', lambda classes: int((classes == 'A').sum())),
+    ).reset_index()
+    categories['margin_pct'] = _ratio(categories['gross_margin'], categories['revenue'])
+    categories['gmroi'] = _ratio(categories['gross_margin'] * annualize, categories['stock_value'])
+    categories['sell_through'] = _ratio(categories['units_sold'],
+                                        categories['units_sold'] + categories['quantity'])
+    categories = categories.sort_values('revenue', ascending=False, kind='stable')
+    return df[PRODUCT_OUTPUT], categories[CATEGORY_OUTPUT]
+
+
+def frame_columns(df, decimals=4):
+    """{column: [values]} with floats rounded and NaN/inf as None"""
+    import numpy as np
+
+    columns = {}
+    for name in df.columns:
+        series = df[name]
+        if series.dtype.kind == 'f':
+            values = series.round(decimals).to_numpy()
+            missing = ~np.isfinite(values)
+            values = values.astype(object)
+            values[missing] = None
+            columns[name] = values.tolist()
+        else:
+            columns[name] = series.tolist()
+    return columns
+
+
+def frame_records(df, decimals=4):
+    columns = frame_columns(df, decimals)
+    names = list(columns)
+    return [dict(zip(names, row)) for row in zip(*columns.values())]
+
+
+def inventory_report(conn, period_days=None):
+    """Everything the analytics endpoint serves: plain Python structures, except
+    'products', which stays a DataFrame so the endpoint can filter it and choose
+    records or columns (frame_records / frame_columns)"""
+    period_days = period_days or ANALYTICS_CONFIG['period_days']
+    products, sales = load_frames(conn, period_days)
+    per_product, per_category = compute(products, sales, period_days)
+    class_counts = per_product['abc'].value_counts()
+    revenue = float(per_product['revenue'].sum())
+    gross_margin = float(per_product['gross_margin'].sum())
+    stock_value = float(per_product['stock_value'].sum())
+    return {
+        'period_days': period_days,
+        'generated_at': date.today().isoformat(),
+        'summary': {
+            'products': int(len(per_product)),
+            'revenue': round(revenue, 2),
+            'gross_margin': round(gross_margin, 2),
+            'margin_pct': round(gross_margin / revenue, 4) if revenue else None,
+            'stock_value': round(stock_value, 2),
+            'gmroi': round(gross_margin * 365.0 / period_days / stock_value, 4) if stock_value else None,
+            'abc': {cls: int(class_counts.get(cls, 0)) for cls in ('A', 'B', 'C')},
+        },
+        'categories': frame_records(per_category),
+        'products': per_product,
+    }
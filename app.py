@@ -1,32 +1,187 @@
 from flask import Flask, render_template, request, jsonify, session, redirect, url_for, send_file
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
-from werkzeug.security import generate_password_hash, check_password_hash
-import mysql.connector
 from mysql.connector import Error
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import json
 from functools import wraps
-import io
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
-from reportlab.lib.units import inch
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.enums import TA_CENTER, TA_RIGHT, TA_LEFT
 import os
+import math
+import time
+import analytics
+import cache_bus
+import customers
+import forecasting
+import invoices
+import jobs
+import password_hashing
+import query_tracer
+import receipts
+import responses
+import sales_archive
+import storage
+from query_tracer import query_budget
+from repositories import (transaction, ProductRepository, SaleRepository, StockRepository,
+                          CustomerRepository, ReorderRepository, SupplierRepository,
+                          EmployeeRepository, JobRepository)
+from contextlib import contextmanager
 
 app = Flask(__name__)
 app.secret_key = 'your-secret-key-change-in-production'
 
 # Database Configuration
 DB_CONFIG = {
-    'host': 'localhost',
-    'user': 'root',
-    'password': '1234',  
-    'database': 'oil_shop_db'
+    'host': os.environ.get('DB_HOST', 'localhost'),
+    'user': os.environ.get('DB_USER', 'root'),
+    'password': os.environ.get('DB_PASSWORD', '1234'),
+    'database': os.environ.get('DB_NAME', 'oil_shop_db'),
+    # Bounds the connect and handshake only; the driver clears it once connected
+    'connection_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', 3)),
 }
 
+# Statement timeouts (0 turns a limit off). DB_READ_TIMEOUT is a client-side
+# socket timeout on every connection, so a hung INSERT/UPDATE or a server that
+# dies mid-query raises instead of blocking the worker; it needs the pure-Python
+# driver. Server-side, SELECTs stop after DB_STATEMENT_TIMEOUT and row lock
+# waits after DB_LOCK_WAIT_TIMEOUT. Background jobs (forecasts, archiving,
+# snapshots) get their own connections without the SELECT limit.
+DB_TIMEOUTS = {
+    'read': float(os.environ.get('DB_READ_TIMEOUT', 35)),
+    'statement': float(os.environ.get('DB_STATEMENT_TIMEOUT', 30)),
+    'lock_wait': int(os.environ.get('DB_LOCK_WAIT_TIMEOUT', 10)),
+    'batch_read': float(os.environ.get('DB_BATCH_READ_TIMEOUT', 900)),
+}
+
+def session_init_command(statement_timeout):
+    settings = []
+    if DB_TIMEOUTS['lock_wait'] > 0:
+        settings.append(f"innodb_lock_wait_timeout = {DB_TIMEOUTS['lock_wait']}")
+    if statement_timeout > 0:
+        settings.append(f"max_execution_time = {int(statement_timeout * 1000)}")
+    return f"SET SESSION {', '.join(settings)}" if settings else None
+
+BATCH_DB_CONFIG = dict(DB_CONFIG)
+for config, statement_timeout in ((DB_CONFIG, DB_TIMEOUTS['statement']), (BATCH_DB_CONFIG, 0)):
+    init_command = session_init_command(statement_timeout)
+    if init_command:
+        config['init_command'] = init_command
+    if DB_TIMEOUTS['read'] > 0 or DB_TIMEOUTS['batch_read'] > 0:
+        config['use_pure'] = True
+
+# Storage backend: 'mysql' (default) or 'sqlite' for single-PC shops
+DB_BACKEND = os.environ.get('DB_BACKEND', 'mysql')
+SQLITE_CONFIG = {
+    'path': os.environ.get('SQLITE_PATH', 'oil_shop.db'),
+    'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+    'cache_size_kb': int(os.environ.get('SQLITE_CACHE_SIZE_KB', 64 * 1024)),
+    # First start of a new shop: SQLITE_SEED_ADMIN=True creates this admin when missing
+    'seed_admin': os.environ.get('SQLITE_SEED_ADMIN', 'False') == 'True',
+    'admin_username': os.environ.get('SQLITE_ADMIN_USERNAME', 'admin'),
+    'admin_password': os.environ.get('SQLITE_ADMIN_PASSWORD'),
+}
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+storage.configure(DB_BACKEND, DB_CONFIG, SQLITE_CONFIG, pool_size=DB_POOL_SIZE)
+storage.configure_timeouts(DB_TIMEOUTS['read'], BATCH_DB_CONFIG, DB_TIMEOUTS['batch_read'])
+
+# Circuit breaker: after this many failed connects in a row, requests fail fast
+# with 503 for the cool-down, then a single request probes the server again
+BREAKER_CONFIG = {
+    'failure_threshold': int(os.environ.get('DB_BREAKER_FAILURES', 5)),
+    'open_seconds': float(os.environ.get('DB_BREAKER_OPEN_SECONDS', 10)),
+}
+storage.configure_breaker(BREAKER_CONFIG)
+
+# MySQL read replicas for reporting and list reads: DB_REPLICAS=host[:port],host[:port]
+def replica_configs(endpoints):
+    configs = []
+    for endpoint in filter(None, (e.strip() for e in endpoints.split(','))):
+        host, _, port = endpoint.partition(':')
+        configs.append(dict(DB_CONFIG, host=host, port=int(port or 3306),
+                            user=os.environ.get('DB_REPLICA_USER', DB_CONFIG['user']),
+                            password=os.environ.get('DB_REPLICA_PASSWORD', DB_CONFIG['password'])))
+    return configs
+
+REPLICA_CONFIG = {
+    'max_lag_seconds': float(os.environ.get('REPLICA_MAX_LAG_SECONDS', 5)),
+    'check_interval': float(os.environ.get('REPLICA_CHECK_INTERVAL', 2)),
+}
+storage.configure_replicas(replica_configs(os.environ.get('DB_REPLICAS', '')), REPLICA_CONFIG)
+# After writing, a session reads from the primary for this long so it sees its own changes
+READ_YOUR_WRITES_SECONDS = float(os.environ.get('READ_YOUR_WRITES_SECONDS', 10))
+
+# Query tracing (slow-query log, N+1 detection, per-route query budgets)
+QUERY_TRACE_CONFIG = {
+    'enabled': os.environ.get('QUERY_TRACE', 'False') == 'True',
+    'slow_query_ms': float(os.environ.get('SLOW_QUERY_MS', 100)),
+    'n_plus_one_threshold': int(os.environ.get('N_PLUS_ONE_THRESHOLD', 5)),
+    'enforce_budgets': os.environ.get('QUERY_BUDGET_ENFORCE', 'False') == 'True',
+}
+query_tracer.init_app(app, QUERY_TRACE_CONFIG)
+
+# Password hashing executor and login throttling
+PASSWORD_CONFIG = {
+    'hash_method': os.environ.get('PASSWORD_HASH_METHOD', 'scrypt'),
+    'workers': int(os.environ.get('PASSWORD_HASH_WORKERS', 2)),
+    'queue_limit': int(os.environ.get('PASSWORD_HASH_QUEUE', 8)),
+    'timeout': float(os.environ.get('PASSWORD_HASH_TIMEOUT', 10)),
+    'user_attempts': int(os.environ.get('MAX_LOGIN_ATTEMPTS', 5)),
+    'user_refill_seconds': float(os.environ.get('LOGIN_USER_REFILL_SECONDS', 60)),
+    'ip_attempts': int(os.environ.get('MAX_LOGIN_ATTEMPTS_PER_IP', 30)),
+    'ip_refill_seconds': float(os.environ.get('LOGIN_IP_REFILL_SECONDS', 2)),
+}
+password_hashing.configure(PASSWORD_CONFIG)
+
+# Sales older than the horizon live in the archive tables (see sales_archive.py)
+ARCHIVE_CONFIG = {
+    'horizon_months': int(os.environ.get('ARCHIVE_HORIZON_MONTHS', 24)),
+}
+sales_archive.configure(ARCHIVE_CONFIG)
+
+# Response compression (gzip, or brotli when installed) for JSON above the threshold
+COMPRESSION_CONFIG = {
+    'enabled': os.environ.get('RESPONSE_COMPRESSION', 'True') == 'True',
+    'min_size': int(os.environ.get('COMPRESSION_MIN_SIZE', 1024)),
+}
+responses.init_app(app, COMPRESSION_CONFIG)
+
+# Per-worker caches, kept coherent across workers by the cache_versions table
+CACHE_CONFIG = {
+    'enabled': os.environ.get('CACHE_ENABLED', 'True') == 'True',
+    'ttl_seconds': float(os.environ.get('CACHE_TTL_SECONDS', 300)),
+    'max_entries': int(os.environ.get('CACHE_MAX_ENTRIES', 1000)),
+}
+cache_bus.configure(CACHE_CONFIG)
+user_cache = cache_bus.VersionedCache('users', depends_on=['users'])
+product_cache = cache_bus.VersionedCache('products', depends_on=['products', 'suppliers'])
+dashboard_cache = cache_bus.VersionedCache('dashboard', depends_on=['products', 'sales'])
+analytics_cache = cache_bus.VersionedCache('analytics', depends_on=['products', 'sales'])
+
+# Inventory analytics window (days of sales behind margin, GMROI and ABC classes)
+analytics.configure({'period_days': int(os.environ.get('ANALYTICS_PERIOD_DAYS', 90))})
+
+# Thermal receipt printer settings
+receipts.configure({'width': int(os.environ.get('RECEIPT_WIDTH', 42))})
+
+# Demand forecasting behind the reorder suggestions (run by the forecast job)
+FORECAST_CONFIG = {
+    'history_days': int(os.environ.get('FORECAST_HISTORY_DAYS', 182)),
+    'lead_time_days': int(os.environ.get('FORECAST_LEAD_TIME_DAYS', 7)),
+    'review_days': int(os.environ.get('FORECAST_REVIEW_DAYS', 7)),
+}
+forecasting.configure(FORECAST_CONFIG)
+
+# Background jobs (invoices, backups, archiving, forecasts) run on this worker pool
+JOBS_CONFIG = {
+    'enabled': os.environ.get('JOBS_ENABLED', 'True') == 'True',
+    'workers': int(os.environ.get('JOB_WORKERS', 2)),
+    'reserved_workers': int(os.environ.get('JOB_RESERVED_WORKERS', 1)),
+    'max_attempts': int(os.environ.get('JOB_MAX_ATTEMPTS', 3)),
+    'retry_base_seconds': float(os.environ.get('JOB_RETRY_BASE_SECONDS', 10)),
+    'keep_days': int(os.environ.get('JOB_KEEP_DAYS', 7)),
+    'result_dir': os.environ.get('JOB_RESULT_DIR', 'job_results'),
+    'forecast': FORECAST_CONFIG,
+}
+jobs.configure(JOBS_CONFIG)
+
 # Flask-Login setup
 login_manager = LoginManager()
 login_manager.init_app(app)
@@ -40,25 +195,70 @@ class User(UserMixin):
 
 @login_manager.user_loader
 def load_user(user_id):
-    conn = get_db_connection()
-    if conn:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM employees WHERE id = %s", (user_id,))
-        user_data = cursor.fetchone()
-        cursor.close()
-        conn.close()
-        if user_data:
-            return User(user_data['id'], user_data['username'], user_data['role'])
+    try:
+        with db_session() as conn:
+            user_data = user_cache.get_or_load(conn, user_id, lambda: EmployeeRepository(conn).get(user_id))
+    except DatabaseUnavailable:
+        # Keep signed-in users signed in through an outage, so pages still render
+        user_data = user_cache.last_known(user_id)
+    if user_data:
+        return User(user_data.id, user_data.username, user_data.role)
     return None
 
-def get_db_connection():
+def get_db_connection(replica=False):
     try:
-        conn = mysql.connector.connect(**DB_CONFIG)
-        return conn
+        conn = storage.connect_replica() if replica else storage.connect()
+        return query_tracer.wrap_connection(conn)
+    except storage.CircuitOpenError:
+        return None
     except Error as e:
         print(f"Database connection error: {e}")
         return None
 
+class DatabaseUnavailable(Exception):
+    pass
+
+def wrote_recently():
+    last_write = session.get('last_write_at')
+    return last_write is not None and time.time() - last_write < READ_YOUR_WRITES_SECONDS
+
+@contextmanager
+def db_session(replica=False):
+    """replica=True: the read may be served by a read replica, unless this session wrote recently"""
+    conn = get_db_connection(replica=replica and not wrote_recently())
+    if conn is None:
+        raise DatabaseUnavailable()
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+@app.after_request
+def remember_write(response):
+    if (storage.STORAGE_CONFIG['replicas'] and request.method in ('POST', 'PUT', 'DELETE')
+            and response.status_code < 400):
+        session['last_write_at'] = time.time()
+    return response
+
+@app.before_request
+def start_job_workers():
+    # Started by the first request so the debug reloader's parent process runs no workers
+    if JOBS_CONFIG['enabled']:
+        jobs.start()
+
+@app.context_processor
+def inject_jobs_enabled():
+    # Without workers queued jobs never run, so pages use the synchronous routes instead
+    return {'jobs_enabled': JOBS_CONFIG['enabled']}
+
+@app.errorhandler(DatabaseUnavailable)
+def handle_database_unavailable(e):
+    response = jsonify({'error': 'Database connection failed'})
+    response.status_code = 503
+    if storage.breaker.state == 'open':
+        response.headers['Retry-After'] = str(math.ceil(storage.breaker.retry_after()) or 1)
+    return response
+
 def role_required(*roles):
     def decorator(f):
         @wraps(f)
@@ -82,24 +282,51 @@ def login():
         data = request.get_json()
         username = data.get('username')
         password = data.get('password')
-        
-        conn = get_db_connection()
-        if conn:
-            cursor = conn.cursor(dictionary=True)
-            cursor.execute("SELECT * FROM employees WHERE username = %s", (username,))
-            user_data = cursor.fetchone()
-            cursor.close()
-            conn.close()
-            
-            if user_data and check_password_hash(user_data['password'], password):
-                user = User(user_data['id'], user_data['username'], user_data['role'])
-                login_user(user)
-                return jsonify({'success': True, 'role': user_data['role']})
-            
+
+        ip = request.remote_addr or 'unknown'
+        retry_after = password_hashing.throttle_login(username, ip)
+        if retry_after:
+            response = jsonify({'success': False,
+                                'message': 'Too many login attempts. Please wait and try again.'})
+            response.headers['Retry-After'] = str(math.ceil(retry_after))
+            return response, 429
+
+        try:
+            with db_session() as conn:
+                user_data = EmployeeRepository(conn).get_by_username(username)
+        except DatabaseUnavailable:
+            # An outage is not a wrong password: answer 503 and do not count the attempt
+            password_hashing.login_unchecked(username, ip)
+            raise
+
+        try:
+            valid = bool(user_data) and password_hashing.check_password(user_data.password, password)
+        except password_hashing.HashQueueFull:
+            password_hashing.login_unchecked(username, ip)
+            return jsonify({'success': False, 'message': 'Login is busy, please try again.'}), 503
+
+        if valid:
+            password_hashing.login_succeeded(username)
+            upgrade_password_hash(user_data, password)
+            user = User(user_data.id, user_data.username, user_data.role)
+            login_user(user)
+            return jsonify({'success': True, 'role': user_data.role})
+
         return jsonify({'success': False, 'message': 'Invalid credentials'}), 401
     
     return render_template('login.html')
 
+def upgrade_password_hash(user_data, password):
+    """Re-hash a verified password when the stored hash uses an older method or cost"""
+    try:
+        if not password_hashing.needs_rehash(user_data.password):
+            return
+        new_hash = password_hashing.hash_password(password)
+        with db_session() as conn, transaction(conn):
+            EmployeeRepository(conn).update_password(user_data.id, new_hash)
+    except (password_hashing.HashQueueFull, DatabaseUnavailable, Error) as e:
+        print(f"Password hash upgrade skipped for user {user_data.id}: {e!r}")
+
 @app.route('/logout')
 @login_required
 def logout():
@@ -142,405 +369,341 @@ def users_page():
 
 # Product APIs
 @app.route('/api/products', methods=['GET'])
+@query_budget(4)
 @login_required
 def get_products():
-    conn = get_db_connection()
-    if conn:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("""
-            SELECT p.*, s.name as supplier_name 
-            FROM products p 
-            LEFT JOIN suppliers s ON p.supplier_id = s.id
-            ORDER BY p.name
-        """)
-        products = cursor.fetchall()
-        cursor.close()
-        conn.close()
-        return jsonify(products)
-    return jsonify({'error': 'Database connection failed'}), 500
+    with db_session(replica=True) as conn:
+        products = product_cache.get_or_load(conn, 'all', ProductRepository(conn).list_all)
+    return responses.list_response(products)
 
 @app.route('/api/products/<barcode>', methods=['GET'])
+@query_budget(3)
 @login_required
 def get_product_by_barcode(barcode):
-    conn = get_db_connection()
-    if conn:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("""
-            SELECT p.*, s.name as supplier_name 
-            FROM products p 
-            LEFT JOIN suppliers s ON p.supplier_id = s.id
-            WHERE p.barcode = %s
-        """, (barcode,))
-        product = cursor.fetchone()
-        cursor.close()
-        conn.close()
-        if product:
-            return jsonify(product)
-        return jsonify({'error': 'Product not found'}), 404
-    return jsonify({'error': 'Database connection failed'}), 500
+    with db_session() as conn:
+        product = product_cache.get_or_load(conn, ('barcode', barcode),
+                                            lambda: ProductRepository(conn).get_by_barcode(barcode))
+    if product:
+        return jsonify(product._asdict())
+    return jsonify({'error': 'Product not found'}), 404
 
 @app.route('/api/products', methods=['POST'])
 @login_required
 @role_required('admin', 'manager')
 def add_product():
     data = request.get_json()
-    conn = get_db_connection()
-    if conn:
-        cursor = conn.cursor()
-        try:
-            cursor.execute("""
-                INSERT INTO products (name, barcode, category, price, cost_price, quantity, 
-                                    min_stock_level, supplier_id, description)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """, (data['name'], data['barcode'], data['category'], data['price'], 
-                  data.get('cost_price', 0), data['quantity'], data.get('min_stock_level', 10),
-                  data.get('supplier_id'), data.get('description', '')))
-            conn.commit()
-            product_id = cursor.lastrowid
-            cursor.close()
-            conn.close()
-            return jsonify({'success': True, 'id': product_id})
-        except Error as e:
-            conn.rollback()
-            cursor.close()
-            conn.close()
-            return jsonify({'error': str(e)}), 400
-    return jsonify({'error': 'Database connection failed'}), 500
+    try:
+        with db_session() as conn, transaction(conn):
+            product_id = ProductRepository(conn).create(data, current_user.id)
+    except Error as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'success': True, 'id': product_id})
 
 @app.route('/api/products/<int:product_id>', methods=['PUT'])
 @login_required
 @role_required('admin', 'manager')
 def update_product(product_id):
     data = request.get_json()
-    conn = get_db_connection()
-    if conn:
-        cursor = conn.cursor()
-        try:
-            cursor.execute("""
-                UPDATE products 
-                SET name=%s, barcode=%s, category=%s, price=%s, cost_price=%s, 
-                    quantity=%s, min_stock_level=%s, supplier_id=%s, description=%s
-                WHERE id=%s
-            """, (data['name'], data['barcode'], data['category'], data['price'],
-                  data.get('cost_price', 0), data['quantity'], data.get('min_stock_level', 10),
-                  data.get('supplier_id'), data.get('description', ''), product_id))
-            conn.commit()
-            cursor.close()
-            conn.close()
-            return jsonify({'success': True})
-        except Error as e:
-            conn.rollback()
-            cursor.close()
-            conn.close()
-            return jsonify({'error': str(e)}), 400
-    return jsonify({'error': 'Database connection failed'}), 500
+    try:
+        with db_session() as conn, transaction(conn):
+            ProductRepository(conn).update(product_id, data, current_user.id)
+    except Error as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'success': True})
 
 @app.route('/api/products/<int:product_id>', methods=['DELETE'])
 @login_required
 @role_required('admin')
 def delete_product(product_id):
-    conn = get_db_connection()
-    if conn:
-        cursor = conn.cursor()
-        try:
-            cursor.execute("DELETE FROM products WHERE id=%s", (product_id,))
-            conn.commit()
-            cursor.close()
-            conn.close()
-            return jsonify({'success': True})
-        except Error as e:
-            conn.rollback()
-            cursor.close()
-            conn.close()
-            return jsonify({'error': str(e)}), 400
-    return jsonify({'error': 'Database connection failed'}), 500
+    try:
+        with db_session() as conn, transaction(conn):
+            ProductRepository(conn).delete(product_id)
+    except Error as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'success': True})
 
 # Sales APIs
+MAX_SALES_PER_BATCH = 500
+DEFAULT_ITEMS_PAGE = 100
+
 @app.route('/api/sales', methods=['POST'])
 @login_required
 def create_sale():
     data = request.get_json()
-    conn = get_db_connection()
-    if conn:
-        cursor = conn.cursor()
-        try:
-            # Create sale record
-            cursor.execute("""
-                INSERT INTO sales (customer_name, customer_phone, total_amount, 
-                                 discount, payment_method, employee_id)
-                VALUES (%s, %s, %s, %s, %s, %s)
-            """, (data.get('customer_name', 'Walk-in'), data.get('customer_phone', ''),
-                  data['total_amount'], data.get('discount', 0), 
-                  data.get('payment_method', 'cash'), current_user.id))
-            
-            sale_id = cursor.lastrowid
-            
-            # Add sale items and update inventory
-            for item in data['items']:
-                cursor.execute("""
-                    INSERT INTO sale_items (sale_id, product_id, quantity, price, subtotal)
-                    VALUES (%s, %s, %s, %s, %s)
-                """, (sale_id, item['product_id'], item['quantity'], 
-                      item['price'], item['subtotal']))
-                
-                # Update product quantity
-                cursor.execute("""
-                    UPDATE products SET quantity = quantity - %s WHERE id = %s
-                """, (item['quantity'], item['product_id']))
-            
-            conn.commit()
-            cursor.close()
-            conn.close()
-            return jsonify({'success': True, 'sale_id': sale_id})
-        except Error as e:
-            conn.rollback()
-            cursor.close()
-            conn.close()
-            return jsonify({'error': str(e)}), 400
-    return jsonify({'error': 'Database connection failed'}), 500
+    try:
+        with db_session() as conn, transaction(conn):
+            sale_id = SaleRepository(conn).create(data, current_user.id)
+    except Error as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'success': True, 'sale_id': sale_id})
 
 @app.route('/api/sales', methods=['GET'])
+@query_budget(5)
 @login_required
 def get_sales():
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
-    
-    conn = get_db_connection()
-    if conn:
-        cursor = conn.cursor(dictionary=True)
-        query = """
-            SELECT s.*, e.username as employee_name,
-                   COUNT(si.id) as items_count
-            FROM sales s
-            LEFT JOIN employees e ON s.employee_id = e.id
-            LEFT JOIN sale_items si ON s.id = si.sale_id
-        """
-        params = []
-        
-        if start_date and end_date:
-            query += " WHERE DATE(s.created_at) BETWEEN %s AND %s"
-            params = [start_date, end_date]
-        
-        query += " GROUP BY s.id ORDER BY s.created_at DESC"
-        
-        cursor.execute(query, params)
-        sales = cursor.fetchall()
-        cursor.close()
-        conn.close()
-        return jsonify(sales)
-    return jsonify({'error': 'Database connection failed'}), 500
+    include_items = request.args.get('include') == 'items'
+    limit = request.args.get('limit', type=int)
+    if include_items:
+        # Embedded items are fetched for the whole page at once, so keep pages bounded
+        limit = min(limit or DEFAULT_ITEMS_PAGE, MAX_SALES_PER_BATCH)
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    try:
+        with db_session(replica=True) as conn:
+            sales_repo = SaleRepository(conn)
+            sales = sales_repo.list(start_date, end_date, limit, offset)
+            if include_items:
+                items = sales_repo.items_for(sale['id'] for sale in sales)
+    except ValueError:
+        return jsonify({'error': 'Dates must be in YYYY-MM-DD format'}), 400
+    if include_items:
+        for sale in sales:
+            sale['items'] = items.get(sale['id'], [])
+    return responses.list_response(sales)
+
+@app.route('/api/sales/items', methods=['GET'])
+@query_budget(4)
+@login_required
+def get_items_for_sales():
+    try:
+        sale_ids = [int(value) for value in request.args.get('ids', '').split(',') if value.strip()]
+    except ValueError:
+        return jsonify({'error': 'ids must be a comma-separated list of sale ids'}), 400
+    if not sale_ids:
+        return jsonify({'error': 'ids is required'}), 400
+    if len(sale_ids) > MAX_SALES_PER_BATCH:
+        return jsonify({'error': f'At most {MAX_SALES_PER_BATCH} sales per request'}), 400
+    with db_session(replica=True) as conn:
+        items = SaleRepository(conn).items_for(sale_ids)
+    return jsonify({str(sale_id): items.get(sale_id, []) for sale_id in sale_ids})
 
 @app.route('/api/sales/<int:sale_id>/items', methods=['GET'])
+@query_budget(4)
 @login_required
 def get_sale_items(sale_id):
-    conn = get_db_connection()
-    if conn:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("""
-            SELECT si.*, p.name as product_name
-            FROM sale_items si
-            JOIN products p ON si.product_id = p.id
-            WHERE si.sale_id = %s
-        """, (sale_id,))
-        items = cursor.fetchall()
-        cursor.close()
-        conn.close()
-        return jsonify(items)
-    return jsonify({'error': 'Database connection failed'}), 500
+    with db_session(replica=True) as conn:
+        items = SaleRepository(conn).items(sale_id)
+    return jsonify(items)
+
+# Customer APIs
+@app.route('/api/customers/<phone>/history', methods=['GET'])
+@query_budget(6)
+@login_required
+def get_customer_history(phone):
+    phone = customers.normalize_phone(phone)
+    if not phone:
+        return jsonify({'error': 'Phone number is required'}), 400
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = max(1, min(request.args.get('per_page', 20, type=int), 100))
+    with db_session(replica=True) as conn:
+        customers_repo = CustomerRepository(conn)
+        stats = customers_repo.stats(phone)
+        sales = customers_repo.history(phone, per_page, (page - 1) * per_page)
+        items = SaleRepository(conn).items_for(sale['id'] for sale in sales)
+    if stats is None and not sales:
+        return jsonify({'error': 'No purchases found for this phone number'}), 404
+
+    for sale in sales:
+        sale['items'] = items.get(sale['id'], [])
+    visits = stats['visits'] if stats else len(sales)
+    return jsonify({
+        'phone': phone,
+        'stats': stats,
+        'page': page,
+        'per_page': per_page,
+        'pages': math.ceil(visits / per_page),
+        'sales': sales
+    })
 
 # Supplier APIs
 @app.route('/api/suppliers', methods=['GET'])
+@query_budget(3)
 @login_required
 def get_suppliers():
-    conn = get_db_connection()
-    if conn:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM suppliers ORDER BY name")
-        suppliers = cursor.fetchall()
-        cursor.close()
-        conn.close()
-        return jsonify(suppliers)
-    return jsonify({'error': 'Database connection failed'}), 500
+    with db_session(replica=True) as conn:
+        suppliers = SupplierRepository(conn).list_all()
+    return responses.list_response(suppliers)
 
 @app.route('/api/suppliers', methods=['POST'])
 @login_required
 @role_required('admin', 'manager')
 def add_supplier():
     data = request.get_json()
-    conn = get_db_connection()
-    if conn:
-        cursor = conn.cursor()
-        try:
-            cursor.execute("""
-                INSERT INTO suppliers (name, contact_person, phone, email, address)
-                VALUES (%s, %s, %s, %s, %s)
-            """, (data['name'], data.get('contact_person', ''), 
-                  data.get('phone', ''), data.get('email', ''), data.get('address', '')))
-            conn.commit()
-            supplier_id = cursor.lastrowid
-            cursor.close()
-            conn.close()
-            return jsonify({'success': True, 'id': supplier_id})
-        except Error as e:
-            conn.rollback()
-            cursor.close()
-            conn.close()
-            return jsonify({'error': str(e)}), 400
-    return jsonify({'error': 'Database connection failed'}), 500
+    try:
+        with db_session() as conn, transaction(conn):
+            supplier_id = SupplierRepository(conn).create(data)
+    except Error as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'success': True, 'id': supplier_id})
 
 @app.route('/api/suppliers/<int:supplier_id>', methods=['PUT'])
 @login_required
 @role_required('admin', 'manager')
 def update_supplier(supplier_id):
     data = request.get_json()
-    conn = get_db_connection()
-    if conn:
-        cursor = conn.cursor()
-        try:
-            cursor.execute("""
-                UPDATE suppliers 
-                SET name=%s, contact_person=%s, phone=%s, email=%s, address=%s
-                WHERE id=%s
-            """, (data['name'], data.get('contact_person', ''), 
-                  data.get('phone', ''), data.get('email', ''), 
-                  data.get('address', ''), supplier_id))
-            conn.commit()
-            cursor.close()
-            conn.close()
-            return jsonify({'success': True})
-        except Error as e:
-            conn.rollback()
-            cursor.close()
-            conn.close()
-            return jsonify({'error': str(e)}), 400
-    return jsonify({'error': 'Database connection failed'}), 500
+    try:
+        with db_session() as conn, transaction(conn):
+            SupplierRepository(conn).update(supplier_id, data)
+    except Error as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'success': True})
 
 @app.route('/api/suppliers/<int:supplier_id>', methods=['DELETE'])
 @login_required
 @role_required('admin')
 def delete_supplier(supplier_id):
-    conn = get_db_connection()
-    if conn:
-        cursor = conn.cursor()
-        try:
-            cursor.execute("DELETE FROM suppliers WHERE id=%s", (supplier_id,))
-            conn.commit()
-            cursor.close()
-            conn.close()
-            return jsonify({'success': True})
-        except Error as e:
-            conn.rollback()
-            cursor.close()
-            conn.close()
-            return jsonify({'error': str(e)}), 400
-    return jsonify({'error': 'Database connection failed'}), 500
+    try:
+        with db_session() as conn, transaction(conn):
+            SupplierRepository(conn).delete(supplier_id)
+    except Error as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'success': True})
 
 # Dashboard Stats API
 @app.route('/api/dashboard/stats', methods=['GET'])
+@query_budget(7)
 @login_required
 def get_dashboard_stats():
-    conn = get_db_connection()
-    if conn:
-        cursor = conn.cursor(dictionary=True)
-        
-        # Today's sales
-        cursor.execute("""
-            SELECT COALESCE(SUM(total_amount), 0) as today_sales
-            FROM sales
-            WHERE DATE(created_at) = CURDATE()
-        """)
-        today_sales = cursor.fetchone()['today_sales']
-        
-        # Low stock products
-        cursor.execute("""
-            SELECT COUNT(*) as low_stock_count
-            FROM products
-            WHERE quantity <= min_stock_level
-        """)
-        low_stock_count = cursor.fetchone()['low_stock_count']
-        
-        # Total products
-        cursor.execute("SELECT COUNT(*) as total_products FROM products")
-        total_products = cursor.fetchone()['total_products']
-        
-        # Monthly sales
-        cursor.execute("""
-            SELECT COALESCE(SUM(total_amount), 0) as monthly_sales
-            FROM sales
-            WHERE MONTH(created_at) = MONTH(CURDATE()) 
-            AND YEAR(created_at) = YEAR(CURDATE())
-        """)
-        monthly_sales = cursor.fetchone()['monthly_sales']
-        
-        cursor.close()
-        conn.close()
-        
-        return jsonify({
-            'today_sales': float(today_sales),
-            'low_stock_count': low_stock_count,
-            'total_products': total_products,
-            'monthly_sales': float(monthly_sales)
-        })
-    return jsonify({'error': 'Database connection failed'}), 500
+    def load_stats():
+        sales = SaleRepository(conn)
+        products = ProductRepository(conn)
+        return {
+            'today_sales': float(sales.total_today()),
+            'low_stock_count': products.count_low_stock(),
+            'total_products': products.count(),
+            'monthly_sales': float(sales.total_this_month())
+        }
+
+    with db_session(replica=True) as conn:
+        # Keyed by day so the totals roll over at midnight without a write
+        stats = dashboard_cache.get_or_load(conn, date.today(), load_stats)
+    return jsonify(stats)
 
 # Low stock alerts
 @app.route('/api/inventory/low-stock', methods=['GET'])
+@query_budget(4)
 @login_required
 def get_low_stock():
-    conn = get_db_connection()
-    if conn:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("""
-            SELECT * FROM products 
-            WHERE quantity <= min_stock_level 
-            ORDER BY quantity ASC
-        """)
-        products = cursor.fetchall()
-        cursor.close()
-        conn.close()
-        return jsonify(products)
-    return jsonify({'error': 'Database connection failed'}), 500
+    with db_session(replica=True) as conn:
+        products = product_cache.get_or_load(conn, 'low_stock', ProductRepository(conn).list_low_stock)
+    return responses.list_response(products)
+
+# Stock ledger APIs
+@app.route('/api/inventory/adjust', methods=['POST'])
+@login_required
+@role_required('admin', 'manager')
+def adjust_stock():
+    data = request.get_json()
+    try:
+        change = int(data['change'])
+        product_id = int(data['product_id'])
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'error': 'product_id and a whole-number change are required'}), 400
+    if change == 0:
+        return jsonify({'error': 'change must not be zero'}), 400
+    try:
+        with db_session() as conn, transaction(conn):
+            quantity = ProductRepository(conn).adjust_stock(product_id, change, current_user.id,
+                                                            (data.get('note') or '')[:255] or None)
+    except Error as e:
+        return jsonify({'error': str(e)}), 400
+    if quantity is None:
+        return jsonify({'error': 'Product not found'}), 404
+    return jsonify({'success': True, 'quantity': quantity})
+
+@app.route('/api/inventory/stock-at', methods=['GET'])
+@query_budget(4)
+@login_required
+def get_stock_at():
+    try:
+        day = date.fromisoformat(request.args.get('date', ''))
+    except ValueError:
+        return jsonify({'error': 'date must be in YYYY-MM-DD format'}), 400
+    # Stock at the close of that day
+    at = datetime.combine(day, datetime.max.time()).replace(microsecond=0)
+    with db_session(replica=True) as conn:
+        stock = StockRepository(conn).stock_at(at, request.args.get('product_id', type=int))
+    return responses.list_response(stock)
+
+@app.route('/api/inventory/movements', methods=['GET'])
+@query_budget(3)
+@login_required
+def get_stock_movements():
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    try:
+        start = date.fromisoformat(start_date) if start_date else None
+        end = date.fromisoformat(end_date) + timedelta(days=1) if end_date else None
+    except ValueError:
+        return jsonify({'error': 'Dates must be in YYYY-MM-DD format'}), 400
+    limit = max(1, min(request.args.get('limit', 500, type=int), 5000))
+    with db_session(replica=True) as conn:
+        movements = StockRepository(conn).movements(start, end, request.args.get('product_id', type=int), limit)
+    return responses.list_response(movements)
+
+# Inventory analytics (margin, GMROI, days of cover, sell-through, ABC)
+@app.route('/api/analytics/inventory', methods=['GET'])
+@query_budget(5)
+@login_required
+@role_required('admin', 'manager')
+def get_inventory_analytics():
+    period_days = request.args.get('period_days', analytics.ANALYTICS_CONFIG['period_days'], type=int)
+    if not 1 <= period_days <= analytics.ANALYTICS_CONFIG['max_period_days']:
+        return jsonify({'error': f"period_days must be between 1 and {analytics.ANALYTICS_CONFIG['max_period_days']}"}), 400
+    with db_session(replica=True) as conn:
+        report = analytics_cache.get_or_load(conn, (period_days, date.today()),
+                                             lambda: analytics.inventory_report(conn, period_days))
+
+    products = report['products']
+    if request.args.get('category'):
+        products = products[products['category'] == request.args['category']]
+    if request.args.get('abc'):
+        products = products[products['abc'] == request.args['abc'].upper()]
+    limit = request.args.get('limit', type=int)
+    if limit:
+        products = products.head(limit)
+    if request.args.get('format') == 'columns':
+        products = {'count': len(products), 'columns': analytics.frame_columns(products)}
+    else:
+        products = analytics.frame_records(products)
+    return jsonify(dict(report, products=products))
+
+# Reorder suggestions (computed nightly by forecasting.py)
+@app.route('/api/reorder/drafts', methods=['GET'])
+@query_budget(3)
+@login_required
+@role_required('admin', 'manager')
+def get_reorder_drafts():
+    with db_session(replica=True) as conn:
+        drafts = ReorderRepository(conn).drafts()
+    return jsonify(drafts)
 
 # User Management APIs
 @app.route('/api/users', methods=['GET'])
+@query_budget(3)
 @login_required
 @role_required('admin')
 def get_users():
-    conn = get_db_connection()
-    if conn:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT id, username, role, created_at FROM employees ORDER BY username")
-        users = cursor.fetchall()
-        cursor.close()
-        conn.close()
-        return jsonify(users)
-    return jsonify({'error': 'Database connection failed'}), 500
+    with db_session() as conn:
+        users = EmployeeRepository(conn).list_all()
+    return jsonify(users)
 
 @app.route('/api/users', methods=['POST'])
 @login_required
 @role_required('admin')
 def add_user():
     data = request.get_json()
-    conn = get_db_connection()
-    if conn:
-        cursor = conn.cursor()
-        try:
-            hashed_password = generate_password_hash(data['password'])
-            cursor.execute("""
-                INSERT INTO employees (username, password, role)
-                VALUES (%s, %s, %s)
-            """, (data['username'], hashed_password, data['role']))
-            conn.commit()
-            user_id = cursor.lastrowid
-            cursor.close()
-            conn.close()
-            return jsonify({'success': True, 'id': user_id})
-        except Error as e:
-            conn.rollback()
-            cursor.close()
-            conn.close()
-            return jsonify({'error': str(e)}), 400
-    return jsonify({'error': 'Database connection failed'}), 500
+    try:
+        hashed_password = password_hashing.hash_password(data['password'])
+    except password_hashing.HashQueueFull:
+        return jsonify({'error': 'Server busy, please try again'}), 503
+    try:
+        with db_session() as conn, transaction(conn):
+            user_id = EmployeeRepository(conn).create(data['username'], hashed_password, data['role'])
+    except Error as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'success': True, 'id': user_id})
 
 @app.route('/api/users/<int:user_id>', methods=['DELETE'])
 @login_required
@@ -549,207 +712,166 @@ def delete_user(user_id):
     if user_id == current_user.id:
         return jsonify({'error': 'Cannot delete your own account'}), 400
     
-    conn = get_db_connection()
-    if conn:
-        cursor = conn.cursor()
-        try:
-            cursor.execute("DELETE FROM employees WHERE id=%s", (user_id,))
-            conn.commit()
-            cursor.close()
-            conn.close()
-            return jsonify({'success': True})
-        except Error as e:
-            conn.rollback()
-            cursor.close()
-            conn.close()
-            return jsonify({'error': str(e)}), 400
-    return jsonify({'error': 'Database connection failed'}), 500
+    try:
+        with db_session() as conn, transaction(conn):
+            EmployeeRepository(conn).delete(user_id)
+    except Error as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'success': True})
+
+# Query metrics
+@app.route('/api/metrics/queries', methods=['GET'])
+@login_required
+@role_required('admin')
+def get_query_metrics():
+    return jsonify({
+        'enabled': QUERY_TRACE_CONFIG['enabled'],
+        'queries': query_tracer.get_stats(),
+        'caches': cache_bus.get_stats(),
+        'replicas': storage.replica_status(),
+        'breaker': storage.breaker_status(),
+        'jobs': jobs.get_stats()
+    })
+
+# Readiness probe (polled by start_app.py before opening the browser)
+@app.route('/api/ready', methods=['GET'])
+@query_budget(1)
+def readiness():
+    try:
+        with db_session() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT 1")
+                cursor.fetchall()
+            finally:
+                cursor.close()
+    except (DatabaseUnavailable, Error):
+        return jsonify({'ready': False, 'error': 'Database connection failed'}), 503
+    return jsonify({'ready': True})
+
+# Receipt Printing
+@app.route('/api/sales/<int:sale_id>/receipt', methods=['GET'])
+@query_budget(6)
+@login_required
+def get_receipt(sale_id):
+    output = request.args.get('format', 'text')
+    if output not in receipts.FORMATS:
+        return jsonify({'error': f"format must be one of: {', '.join(receipts.FORMATS)}"}), 400
+    width = request.args.get('width', type=int)
+
+    with db_session() as conn:
+        sales = SaleRepository(conn)
+        sale = sales.get(sale_id)
+        items = sales.items(sale_id) if sale else []
+    if not sale:
+        return jsonify({'error': 'Sale not found'}), 404
+
+    if output == 'escpos':
+        return app.response_class(receipts.render_escpos(sale, items, width),
+                                  mimetype='application/octet-stream')
+    return app.response_class(receipts.render_text(sale, items, width),
+                              mimetype='text/plain')
 
 # Invoice Generation
 @app.route('/api/sales/<int:sale_id>/invoice', methods=['GET'])
+@query_budget(6)
 @login_required
 def generate_invoice(sale_id):
-    conn = get_db_connection()
-    if conn:
-        cursor = conn.cursor(dictionary=True)
-        
-        # Get sale details
-        cursor.execute("""
-            SELECT s.*, e.username as employee_name
-            FROM sales s
-            LEFT JOIN employees e ON s.employee_id = e.id
-            WHERE s.id = %s
-        """, (sale_id,))
-        sale = cursor.fetchone()
-        
-        # Get sale items
-        cursor.execute("""
-            SELECT si.*, p.name as product_name
-            FROM sale_items si
-            JOIN products p ON si.product_id = p.id
-            WHERE si.sale_id = %s
-        """, (sale_id,))
-        items = cursor.fetchall()
-        
-        cursor.close()
-        conn.close()
-        
-        # Generate Modern PDF
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter, 
-                              rightMargin=0.5*inch, leftMargin=0.5*inch,
-                              topMargin=0.5*inch, bottomMargin=0.5*inch)
-        
-        elements = []
-        styles = getSampleStyleSheet()
-        
-        # Custom styles - ALL BLACK
-        title_style = styles['Heading1']
-        title_style.alignment = TA_CENTER
-        title_style.textColor = colors.black
-        title_style.fontSize = 28
-        title_style.spaceAfter = 5
-        
-        subtitle_style = styles['Normal']
-        subtitle_style.alignment = TA_CENTER
-        subtitle_style.textColor = colors.black
-        subtitle_style.fontSize = 12
-        subtitle_style.spaceAfter = 20
-        
-        # Header
-        elements.append(Paragraph("OIL SHOP INVOICE", title_style))
-        elements.append(Spacer(1, 0.2*inch))
-        
-        # Company Info Box
-        company_data = [
-            ['Oil Shop Management System', '', f'Invoice #: INV-{sale_id:05d}'],
-            ['123 Business Street', '', f'Date: {sale["created_at"].strftime("%Y-%m-%d %H:%M") if isinstance(sale["created_at"], datetime) else sale["created_at"]}'],
-            ['City, State 12345', '', f'Cashier: {sale["employee_name"]}'],
-            ['Phone: (123) 456-7890', '', f'Payment: {sale["payment_method"].upper()}']
-        ]
-        
-        company_table = Table(company_data, colWidths=[2.5*inch, 2*inch, 2.5*inch])
-        company_table.setStyle(TableStyle([
-            ('FONT', (0, 0), (-1, -1), 'Helvetica', 9),
-            ('FONT', (2, 0), (2, 0), 'Helvetica-Bold', 11),
-            ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-            ('ALIGN', (0, 0), (1, -1), 'LEFT'),
-            ('ALIGN', (2, 0), (2, -1), 'RIGHT'),
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-            ('TOPPADDING', (0, 0), (-1, -1), 3),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
-        ]))
-        elements.append(company_table)
-        elements.append(Spacer(1, 0.3*inch))
-        
-        # Customer Info Section
-        if sale.get('customer_phone'):
-            customer_data = [
-                ['BILL TO:', ''],
-                [f"Phone: {sale['customer_phone']}", '']
-            ]
-            customer_table = Table(customer_data, colWidths=[3.5*inch, 3.5*inch])
-            customer_table.setStyle(TableStyle([
-                ('FONT', (0, 0), (0, 0), 'Helvetica-Bold', 10),
-                ('FONT', (0, 1), (-1, -1), 'Helvetica', 9),
-                ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-                ('TOPPADDING', (0, 0), (-1, -1), 5),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
-            ]))
-            elements.append(customer_table)
-            elements.append(Spacer(1, 0.2*inch))
-        
-        # Items Table Header
-        items_data = [['#', 'Product Name', 'Qty', 'Unit Price', 'Subtotal']]
-        
-        # Items rows
-        for idx, item in enumerate(items, 1):
-            items_data.append([
-                str(idx),
-                item['product_name'][:35],
-                str(item['quantity']),
-                f"${item['price']:.2f}",
-                f"${item['subtotal']:.2f}"
-            ])
-        
-        items_table = Table(items_data, colWidths=[0.5*inch, 3.5*inch, 1*inch, 1.2*inch, 1.3*inch])
-        items_table.setStyle(TableStyle([
-            # Header styling
-            ('BACKGROUND', (0, 0), (-1, 0), colors.black),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-            ('FONT', (0, 0), (-1, 0), 'Helvetica-Bold', 10),
-            ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-            
-            # Body styling
-            ('FONT', (0, 1), (-1, -1), 'Helvetica', 9),
-            ('ALIGN', (0, 1), (0, -1), 'CENTER'),
-            ('ALIGN', (1, 1), (1, -1), 'LEFT'),
-            ('ALIGN', (2, 1), (-1, -1), 'RIGHT'),
-            ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
-            
-            # Grid - ALL BLACK BORDERS
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('BOX', (0, 0), (-1, -1), 2, colors.black),
-            
-            # Padding
-            ('TOPPADDING', (0, 0), (-1, -1), 8),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-            ('LEFTPADDING', (0, 0), (-1, -1), 5),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 5),
-        ]))
-        elements.append(items_table)
-        elements.append(Spacer(1, 0.3*inch))
-        
-        # Calculate totals
-        subtotal = sum(item['subtotal'] for item in items)
-        
-        # Totals Table
-        totals_data = [
-            ['', '', 'Subtotal:', f"${subtotal:.2f}"],
-            ['', '', 'Discount:', f"-${sale['discount']:.2f}"],
-            ['', '', 'TOTAL:', f"${sale['total_amount']:.2f}"]
-        ]
-        
-        totals_table = Table(totals_data, colWidths=[2*inch, 2.5*inch, 1.5*inch, 1.5*inch])
-        totals_table.setStyle(TableStyle([
-            ('FONT', (2, 0), (2, 1), 'Helvetica', 10),
-            ('FONT', (2, 2), (2, 2), 'Helvetica-Bold', 12),
-            ('FONT', (3, 0), (3, 1), 'Helvetica', 10),
-            ('FONT', (3, 2), (3, 2), 'Helvetica-Bold', 12),
-            ('ALIGN', (2, 0), (-1, -1), 'RIGHT'),
-            ('TEXTCOLOR', (2, 0), (-1, -1), colors.black),
-            ('BACKGROUND', (2, 2), (3, 2), colors.white),
-            ('GRID', (2, 0), (3, -1), 1, colors.black),
-            ('BOX', (2, 0), (3, -1), 2, colors.black),
-            ('TOPPADDING', (2, 0), (3, -1), 5),
-            ('BOTTOMPADDING', (2, 0), (3, -1), 5),
-            ('RIGHTPADDING', (2, 0), (3, -1), 10),
-        ]))
-        elements.append(totals_table)
-        elements.append(Spacer(1, 0.5*inch))
-        
-        # Footer
-        footer_style = styles['Normal']
-        footer_style.alignment = TA_CENTER
-        footer_style.fontSize = 9
-        footer_style.textColor = colors.black
-        
-        elements.append(Paragraph("─" * 80, footer_style))
-        elements.append(Spacer(1, 0.1*inch))
-        elements.append(Paragraph("Thank you for your business!", footer_style))
-        elements.append(Paragraph("This is a computer-generated invoice.", footer_style))
-        elements.append(Spacer(1, 0.1*inch))
-        elements.append(Paragraph("For queries, contact: support@.com | www.temp.com", footer_style))
-        
-        # Build PDF
-        doc.build(elements)
-        
-        buffer.seek(0)
+    with db_session(replica=True) as conn:
+        sales = SaleRepository(conn)
+        sale = sales.get(sale_id)
+        items = sales.items(sale_id) if sale else []
+
+    if sale:
+        buffer = invoices.build_invoice_pdf(sale, items)
         return send_file(buffer, as_attachment=True, 
                         download_name=f'invoice_{sale_id}.pdf', 
                         mimetype='application/pdf')
     
     return jsonify({'error': 'Sale not found'}), 404
 
+# Background Jobs
+def job_visible(job):
+    return job is not None and (current_user.role == 'admin' or job['created_by'] == current_user.id)
+
+def job_status(job):
+    status = {key: job[key] for key in ('id', 'kind', 'status', 'progress', 'message', 'attempts',
+                                        'max_attempts', 'error', 'created_at', 'started_at', 'finished_at')}
+    if job['status'] == 'queued' and job['attempts']:
+        status['retry_at'] = job['run_after']
+    if job['status'] == 'done':
+        status['result'] = json.loads(job['result'] or 'null')
+        status['result_url'] = url_for('get_job_result', job_id=job['id'])
+    return status
+
+@app.route('/api/jobs', methods=['POST'])
+@query_budget(3)
+@login_required
+def submit_job():
+    data = request.json or {}
+    handler = jobs.HANDLERS.get(data.get('kind'))
+    if handler is None:
+        return jsonify({'error': f"kind must be one of: {', '.join(sorted(jobs.HANDLERS))}"}), 400
+    if handler.roles and current_user.role not in handler.roles:
+        return jsonify({'error': 'Unauthorized access'}), 403
+    params = data.get('params') or {}
+    if not isinstance(params, dict):
+        return jsonify({'error': 'params must be an object'}), 400
+
+    with db_session() as conn:
+        job_id = jobs.submit(conn, data['kind'], params, current_user.id)
+    return jsonify({'job_id': job_id, 'status': 'queued',
+                    'status_url': url_for('get_job', job_id=job_id)}), 202
+
+@app.route('/api/jobs', methods=['GET'])
+@query_budget(4)
+@login_required
+def get_jobs():
+    status = request.args.get('status')
+    if status and status not in jobs.STATUSES:
+        return jsonify({'error': f"status must be one of: {', '.join(jobs.STATUSES)}"}), 400
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 200)
+    created_by = None if current_user.role == 'admin' else current_user.id
+
+    with db_session() as conn:
+        repository = JobRepository(conn)
+        recent = repository.list_recent(status, created_by, limit)
+        counts = repository.counts() if current_user.role == 'admin' else None
+    response = {'jobs': recent}
+    if counts is not None:
+        response['counts'] = counts
+    return jsonify(response)
+
+@app.route('/api/jobs/<int:job_id>', methods=['GET'])
+@query_budget(3)
+@login_required
+def get_job(job_id):
+    with db_session() as conn:
+        job = JobRepository(conn).get(job_id)
+    if not job_visible(job):
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job_status(job))
+
+@app.route('/api/jobs/<int:job_id>/result', methods=['GET'])
+@query_budget(3)
+@login_required
+def get_job_result(job_id):
+    with db_session() as conn:
+        job = JobRepository(conn).get(job_id)
+    if not job_visible(job):
+        return jsonify({'error': 'Job not found'}), 404
+    if job['status'] != 'done':
+        return jsonify({'error': 'Job has not finished', 'status': job['status']}), 409
+
+    path = jobs.result_path(job)
+    if path is None:
+        return jsonify(json.loads(job['result'] or 'null'))
+    if not os.path.isfile(path):
+        return jsonify({'error': 'Result file no longer available'}), 410
+    return send_file(os.path.abspath(path), as_attachment=True, download_name=job['result_name'],
+                     mimetype=job['result_type'])
+
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    app.run(debug=os.environ.get('DEBUG', 'True') == 'True',
+            host=os.environ.get('HOST', '0.0.0.0'),
+            port=int(os.environ.get('PORT', 5000)))
\ No newline at end of file
@@ -0,0 +1,662 @@
+#!/usr/bin/env python3
+"""
+Oil Shop Management System - Online Backup and Restore
+Dumps the database into backups/ without stopping the shop.
+
+MySQL backups read every table inside one consistent InnoDB snapshot. Worker
+connections start their snapshots together under a very short global read
+lock (held only while the snapshots are opened, bounded by --lock-wait); if
+the lock cannot be taken a single snapshot connection is used instead. Tables
+are split into primary-key ranges, read with streaming cursors and written
+as gzip-compressed JSON lines, one file per range. Incremental backups only
+contain the rows with an updated_at (or, in the insert-only stock ledger, a
+created_at) after the previous backup's snapshot minus --safety-seconds: a
+transaction that stamped its rows before that snapshot but committed after
+it is still caught, and restoring the overlap again is harmless. Sales and
+their items are updated after the fact (phone normalization, product_id
+cleared when a product is deleted), so they carry an updated_at too; `migrate`
+adds it to databases created before it was in the schema. Small tables without
+either column (jobs, customer_stats, ...) are dumped in full every time;
+deleted rows are picked up by the next full backup. Restores replay a full
+backup and its incrementals with parallel batched upserts.
+
+SQLite databases are copied with the online backup API and compressed.
+
+Usage:
+    python backup.py backup                  Full backup
+    python backup.py backup --incremental    Rows changed since the last backup
+    python backup.py list
+    python backup.py migrate                 Add updated_at to the sales tables
+    python backup.py restore 20250101-020000-full --workers 4
+"""
+
+import argparse
+import gzip
+import json
+import os
+import queue
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import mysql.connector
+from mysql.connector import Error
+
+import storage
+
+BACKUP_DIR = 'backups'
+MANIFEST = 'manifest.json'
+COPY_BUFFER = 1024 * 1024
+
+# Rows are only ever inserted (and deleted), so created_at marks every change
+APPEND_ONLY_TABLES = ('stock_movements',)
+
+# Large tables whose rows are updated after insert; `migrate` gives them an updated_at
+CHANGE_TRACKED_TABLES = ('sales', 'sale_items', 'sales_archive', 'sale_items_archive')
+
+
+def _json_value(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ')
+    if isinstance(value, (date, timedelta)):
+        return str(value)
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode('utf-8')
+    if isinstance(value, set):
+        return ','.join(sorted(value))
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def connect(args, database=True):
+    settings = {'host': args.db_host, 'user': args.db_user, 'password': args.db_password,
+                'autocommit': False}
+    if database:
+        settings['database'] = args.db_name
+    return mysql.connector.connect(**settings)
+
+
+def run_parallel(connections, tasks, handler):
+    """Run handler(conn, task) for every task, one worker thread per connection"""
+    pending = queue.Queue()
+    for task in tasks:
+        pending.put(task)
+    results = []
+    failures = []
+    lock = threading.Lock()
+
+    def worker(conn):
+        while not failures:
+            try:
+                task = pending.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                result = handler(conn, task)
+            except Exception as e:
+                with lock:
+                    failures.append((task, e))
+                return
+            with lock:
+                results.append(result)
+
+    threads = [threading.Thread(target=worker, args=(conn,), daemon=True) for conn in connections]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if failures:
+        task, error = failures[0]
+        raise RuntimeError(f"{task}: {error}") from error
+    return results
+
+
+# ============================================
+# Backup catalog
+# ============================================
+
+def load_manifests(directory):
+    """Return completed backups in the directory, oldest first"""
+    manifests = []
+    if not os.path.isdir(directory):
+        return manifests
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name, MANIFEST)
+        if os.path.isfile(path):
+            with open(path, 'r') as f:
+                manifests.append(json.load(f))
+    manifests.sort(key=lambda m: m['started_at'])
+    return manifests
+
+
+def write_manifest(path, manifest):
+    # Written last and renamed into place: a directory without a manifest is
+    # an interrupted backup and is ignored by list/restore/incremental.
+    tmp_path = os.path.join(path, MANIFEST + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(path, MANIFEST))
+
+
+def restore_chain(directory, name):
+    """Return the full backup and incrementals needed to restore `name`"""
+    by_name = {m['name']: m for m in load_manifests(directory)}
+    if name not in by_name:
+        raise SystemExit(f"Backup not found: {name}")
+    chain = []
+    current = by_name[name]
+    while True:
+        chain.append(current)
+        if current['type'] == 'full':
+            break
+        base = by_name.get(current['base'])
+        if base is None:
+            raise SystemExit(f"Backup {current['name']} depends on missing backup {current['base']}")
+        current = base
+    chain.reverse()
+    return chain
+
+
+def list_backups(args):
+    manifests = load_manifests(args.dir)
+    if not manifests:
+        print(f"No backups in {args.dir}/")
+        return 0
+    print(f"{'name':<30}{'type':<13}{'backend':<9}{'rows':>12}{'size MB':>10}{'seconds':>9}")
+    for m in manifests:
+        rows = sum(t.get('rows', 0) for t in m.get('tables', {}).values())
+        print(f"{m['name']:<30}{m['type']:<13}{m['backend']:<9}{rows:>12}"
+              f"{m['bytes'] / 1048576:>10.1f}{m['elapsed_s']:>9.1f}")
+    return 0
+
+
+# ============================================
+# MySQL backup
+# ============================================
+
+def list_tables(cursor, only=None):
+    cursor.execute("""
+        SELECT TABLE_NAME FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_TYPE = 'BASE TABLE'
+        ORDER BY TABLE_NAME
+    """)
+    tables = [row[0] for row in cursor.fetchall()]
+    if only:
+        missing = set(only) - set(tables)
+        if missing:
+            raise SystemExit(f"Unknown tables: {', '.join(sorted(missing))}")
+        tables = [t for t in tables if t in only]
+    return tables
+
+
+def describe_table(cursor, table):
+    """Return the dumpable columns, integer chunking key and CREATE statement"""
+    cursor.execute("""
+        SELECT COLUMN_NAME FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND EXTRA NOT LIKE '%%GENERATED%%'
+        ORDER BY ORDINAL_POSITION
+    """, (table,))
+    columns = [row[0] for row in cursor.fetchall()]
+    cursor.execute("""
+        SELECT k.COLUMN_NAME, c.DATA_TYPE
+        FROM information_schema.KEY_COLUMN_USAGE k
+        JOIN information_schema.COLUMNS c
+          ON c.TABLE_SCHEMA = k.TABLE_SCHEMA AND c.TABLE_NAME = k.TABLE_NAME
+         AND c.COLUMN_NAME = k.COLUMN_NAME
+        WHERE k.TABLE_SCHEMA = DATABASE() AND k.TABLE_NAME = %s AND k.CONSTRAINT_NAME = 'PRIMARY'
+        ORDER BY k.ORDINAL_POSITION
+    """, (table,))
+    keys = cursor.fetchall()
+    chunk_key = None
+    if keys and keys[0][1] in ('tinyint', 'smallint', 'mediumint', 'int', 'bigint'):
+        chunk_key = keys[0][0]
+    cursor.execute(f"SHOW CREATE TABLE `{table}`")
+    create = cursor.fetchone()[1]
+    return columns, chunk_key, create
+
+
+def open_snapshots(args):
+    """Open worker connections that all read the same consistent snapshot"""
+    workers = max(1, args.workers)
+    lock_conn = None
+    if workers > 1 and not args.no_lock:
+        lock_conn = connect(args)
+        cursor = lock_conn.cursor()
+        try:
+            cursor.execute("SET SESSION lock_wait_timeout = %s", (args.lock_wait,))
+            cursor.execute("FLUSH TABLES WITH READ LOCK")
+        except Error as e:
+            print(f"⚠ Could not take the snapshot lock ({e}); using a single snapshot connection")
+            lock_conn.close()
+            lock_conn = None
+            workers = 1
+    elif workers > 1:
+        workers = 1
+
+    connections = []
+    try:
+        for _ in range(workers):
+            conn = connect(args)
+            connections.append(conn)
+        cursor = connections[0].cursor()
+        cursor.execute("SELECT NOW()")
+        snapshot_at = cursor.fetchone()[0]
+        cursor.close()
+        for conn in connections:
+            conn.start_transaction(consistent_snapshot=True, isolation_level='REPEATABLE READ',
+                                   readonly=True)
+    finally:
+        if lock_conn is not None:
+            lock_conn.cursor().execute("UNLOCK TABLES")
+            lock_conn.close()
+    return connections, snapshot_at, lock_conn is not None
+
+
+def plan_chunks(cursor, table, info, since, chunk_rows):
+    """Split a table into primary-key ranges"""
+    where, params = change_filter(table, info['columns'], since)
+    if info['chunk_key'] is None:
+        return [(table, None, None, where, params)]
+    key = info['chunk_key']
+    cursor.execute(f"SELECT MIN(`{key}`), MAX(`{key}`) FROM `{table}`" + (f" WHERE {where}" if where else ''),
+                   params)
+    low, high = cursor.fetchone()
+    if low is None:
+        return []
+    return [(table, start, min(start + chunk_rows - 1, high), where, params)
+            for start in range(low, high + 1, chunk_rows)]
+
+
+def change_filter(table, columns, since):
+    """WHERE clause selecting the rows changed since `since`; None dumps the whole table"""
+    if since is None:
+        return None, ()
+    if 'updated_at' in columns:
+        return "`updated_at` >= %s", (since,)
+    if table in APPEND_ONLY_TABLES and 'created_at' in columns:
+        return "`created_at` >= %s", (since,)
+    return None, ()
+
+
+def dump_chunk(conn, task, tables, path, level):
+    table, low, high, where, params = task
+    info = tables[table]
+    conditions = []
+    values = []
+    if low is not None:
+        conditions.append(f"`{info['chunk_key']}` BETWEEN %s AND %s")
+        values.extend([low, high])
+    if where:
+        conditions.append(where)
+        values.extend(params)
+    sql = f"SELECT {', '.join(f'`{c}`' for c in info['columns'])} FROM `{table}`"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    if info['chunk_key']:
+        sql += f" ORDER BY `{info['chunk_key']}`"
+
+    filename = f"{table}.{low if low is not None else 0:012d}.jsonl.gz"
+    filepath = os.path.join(path, filename)
+    rows = 0
+    cursor = conn.cursor()
+    try:
+        cursor.execute(sql, values)
+        with gzip.open(filepath, 'wt', encoding='utf-8', compresslevel=level) as out:
+            while True:
+                batch = cursor.fetchmany(1000)
+                if not batch:
+                    break
+                for row in batch:
+                    out.write(json.dumps(row, default=_json_value, separators=(',', ':')))
+                    out.write('\n')
+                rows += len(batch)
+    finally:
+        cursor.close()
+    if not rows:
+        os.remove(filepath)
+        return table, None, 0
+    return table, filename, rows
+
+
+def backup_mysql(args, path, manifest, base):
+    connections, snapshot_at, locked = open_snapshots(args)
+    manifest['snapshot_at'] = snapshot_at.isoformat(sep=' ')
+    manifest['parallel_snapshot'] = locked
+    since = None
+    if base:
+        since = datetime.fromisoformat(base['snapshot_at']) - timedelta(seconds=args.safety_seconds)
+        manifest['since'] = since.isoformat(sep=' ')
+    try:
+        cursor = connections[0].cursor()
+        tables = {}
+        tasks = []
+        for table in list_tables(cursor, args.tables):
+            columns, chunk_key, create = describe_table(cursor, table)
+            tables[table] = {'columns': columns, 'chunk_key': chunk_key, 'create': create}
+            tasks.extend(plan_chunks(cursor, table, tables[table], since, args.chunk_rows))
+            where, _ = change_filter(table, columns, since)
+            tables[table]['mode'] = 'full' if since is None or where is None else 'changed'
+            if since is not None and where is None and table in CHANGE_TRACKED_TABLES:
+                print(f"⚠ {table} has no updated_at and is dumped in full; run python backup.py migrate")
+            tables[table]['files'] = []
+            tables[table]['rows'] = 0
+        cursor.close()
+        print(f"Dumping {len(tables)} tables in {len(tasks)} chunks with {len(connections)} connection(s)")
+
+        results = run_parallel(connections, tasks,
+                               lambda conn, task: dump_chunk(conn, task, tables, path, args.compress_level))
+    finally:
+        for conn in connections:
+            try:
+                conn.rollback()
+            finally:
+                conn.close()
+
+    for table, filename, rows in results:
+        if filename:
+            tables[table]['files'].append(filename)
+            tables[table]['rows'] += rows
+    for info in tables.values():
+        info['files'].sort()
+    manifest['tables'] = tables
+
+
+# ============================================
+# MySQL restore
+# ============================================
+
+def upsert_sql(table, columns):
+    names = ', '.join(f'`{c}`' for c in columns)
+    placeholders = ', '.join(['%s'] * len(columns))
+    updates = ', '.join(f'`{c}` = VALUES(`{c}`)' for c in columns)
+    return f"INSERT INTO `{table}` ({names}) VALUES ({placeholders}) ON DUPLICATE KEY UPDATE {updates}"
+
+
+def restore_file(conn, task, batch_size):
+    path, table, columns = task
+    sql = upsert_sql(table, columns)
+    cursor = conn.cursor()
+    rows = 0
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            batch = []
+            for line in f:
+                batch.append(json.loads(line))
+                if len(batch) >= batch_size:
+                    cursor.executemany(sql, batch)
+                    conn.commit()
+                    rows += len(batch)
+                    batch = []
+            if batch:
+                cursor.executemany(sql, batch)
+                conn.commit()
+                rows += len(batch)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return rows
+
+
+def restore_mysql(args, chain):
+    conn = connect(args, database=False)
+    cursor = conn.cursor()
+    cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{args.db_name}`")
+    cursor.execute(f"USE `{args.db_name}`")
+    cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+    for table, info in chain[0]['tables'].items():
+        cursor.execute(info['create'].replace('CREATE TABLE', 'CREATE TABLE IF NOT EXISTS', 1))
+        if args.replace:
+            cursor.execute(f"TRUNCATE TABLE `{table}`")
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+    connections = []
+    try:
+        for _ in range(max(1, args.workers)):
+            worker = connect(args)
+            worker.cursor().execute("SET FOREIGN_KEY_CHECKS = 0")
+            connections.append(worker)
+        total = 0
+        for manifest in chain:
+            started = time.perf_counter()
+            tasks = [(os.path.join(args.dir, manifest['name'], filename), table, info['columns'])
+                     for table, info in manifest['tables'].items()
+                     for filename in info['files']]
+            # Largest files first so the workers finish together
+            tasks.sort(key=lambda task: os.path.getsize(task[0]), reverse=True)
+            rows = sum(run_parallel(connections, tasks,
+                                    lambda c, task: restore_file(c, task, args.batch_size)))
+            total += rows
+            print(f"✓ {manifest['name']}: {rows} rows in {time.perf_counter() - started:.1f}s")
+    finally:
+        for worker in connections:
+            worker.close()
+    return total
+
+
+# ============================================
+# SQLite backup and restore
+# ============================================
+
+def backup_sqlite(args, path, manifest):
+    filename = os.path.basename(args.sqlite_path) + '.gz'
+    snapshot = os.path.join(path, os.path.basename(args.sqlite_path))
+    # The online backup API copies a consistent snapshot; in WAL mode the
+    # read transaction it holds does not block the shop's writers.
+    source = sqlite3.connect(args.sqlite_path)
+    target = sqlite3.connect(snapshot)
+    try:
+        manifest['snapshot_at'] = datetime.now().isoformat(sep=' ', timespec='seconds')
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+    with open(snapshot, 'rb') as src, gzip.open(os.path.join(path, filename), 'wb',
+                                                compresslevel=args.compress_level) as dst:
+        shutil.copyfileobj(src, dst, COPY_BUFFER)
+    os.remove(snapshot)
+    manifest['tables'] = {}
+    manifest['files'] = [filename]
+
+
+def restore_sqlite(args, chain):
+    manifest = chain[-1]
+    snapshot = args.sqlite_path + '.restore'
+    with gzip.open(os.path.join(args.dir, manifest['name'], manifest['files'][0]), 'rb') as src, \
+            open(snapshot, 'wb') as dst:
+        shutil.copyfileobj(src, dst, COPY_BUFFER)
+    source = sqlite3.connect(snapshot)
+    target = sqlite3.connect(args.sqlite_path, timeout=30)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+        os.remove(snapshot)
+    print(f"✓ {manifest['name']} restored into {args.sqlite_path}")
+
+
+# ============================================
+# Schema migration
+# ============================================
+
+def migrate(conn):
+    """Add updated_at to the change-tracked tables that lack it; returns the tables changed"""
+    if storage.backend() == 'sqlite':
+        print("✓ SQLite backups copy the whole database file; nothing to migrate")
+        return []
+    changed = []
+    cursor = conn.cursor()
+    try:
+        for table in CHANGE_TRACKED_TABLES:
+            cursor.execute("""
+                SELECT COLUMN_NAME FROM information_schema.COLUMNS
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+            """, (table,))
+            columns = {row[0] for row in cursor.fetchall()}
+            if not columns:
+                continue
+            if 'updated_at' in columns:
+                print(f"✓ {table} already has updated_at")
+                continue
+            # Existing rows are stamped with the migration time, so the next incremental
+            # backup still contains them all once
+            started = time.perf_counter()
+            cursor.execute(f"ALTER TABLE `{table}` "
+                           f"ADD COLUMN updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP "
+                           f"ON UPDATE CURRENT_TIMESTAMP AFTER created_at, "
+                           f"ADD INDEX idx_updated (updated_at)")
+            print(f"✓ {table}: added updated_at ({time.perf_counter() - started:.1f}s)")
+            changed.append(table)
+    finally:
+        cursor.close()
+    return changed
+
+
+# ============================================
+# Commands
+# ============================================
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def run_backup(args):
+    incremental = args.incremental
+    if incremental and args.backend == 'sqlite':
+        print("⚠ Incremental backups need MySQL; taking a full SQLite backup instead")
+        incremental = False
+    database = args.sqlite_path if args.backend == 'sqlite' else args.db_name
+    base = None
+    if incremental:
+        previous = [m for m in load_manifests(args.dir)
+                    if m['backend'] == args.backend and m['database'] == database]
+        if not previous:
+            print("⚠ No previous backup found; taking a full backup instead")
+            incremental = False
+        else:
+            base = previous[-1]
+
+    started_at = datetime.now()
+    name = f"{started_at:%Y%m%d-%H%M%S}-{'incr' if incremental else 'full'}"
+    path = os.path.join(args.dir, name)
+    os.makedirs(path)
+    storage.print_header(f"Backing up {database} to {path}")
+    manifest = {
+        'name': name,
+        'type': 'incremental' if incremental else 'full',
+        'base': base['name'] if base else None,
+        'backend': args.backend,
+        'database': database,
+        'started_at': started_at.isoformat(sep=' ', timespec='seconds'),
+    }
+    started = time.perf_counter()
+    try:
+        if args.backend == 'sqlite':
+            backup_sqlite(args, path, manifest)
+        else:
+            backup_mysql(args, path, manifest, base)
+    except (Error, sqlite3.Error, RuntimeError, OSError) as e:
+        print(f"❌ Backup failed: {e}")
+        shutil.rmtree(path, ignore_errors=True)
+        return 1
+    manifest['elapsed_s'] = round(time.perf_counter() - started, 3)
+    manifest['bytes'] = directory_size(path)
+    write_manifest(path, manifest)
+
+    for table, info in sorted(manifest['tables'].items()):
+        print(f"  {table:<20}{info['rows']:>12} rows  ({info['mode']}, {len(info['files'])} files)")
+    print(f"\n✓ Backup {name} written ({manifest['bytes'] / 1048576:.1f} MB in {manifest['elapsed_s']:.1f}s)")
+    return 0
+
+
+def run_restore(args):
+    chain = restore_chain(args.dir, args.name)
+    storage.print_header(f"Restoring {args.name}")
+    if len(chain) > 1:
+        print(f"Applying {chain[0]['name']} and {len(chain) - 1} incremental backup(s)")
+    started = time.perf_counter()
+    try:
+        if chain[0]['backend'] == 'sqlite':
+            restore_sqlite(args, chain)
+        else:
+            rows = restore_mysql(args, chain)
+            print(f"\n✓ Restored {rows} rows into {args.db_name}")
+    except (Error, sqlite3.Error, RuntimeError, OSError) as e:
+        print(f"❌ Restore failed: {e}")
+        return 1
+    print(f"✓ Finished in {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Online backup and restore for the Oil Shop database")
+    parser.add_argument('--dir', default=BACKUP_DIR, help="Backup directory")
+    storage.add_cli_args(parser)
+    parser.add_argument('--workers', type=int, default=4, help="Parallel database connections")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    backup = commands.add_parser('backup', help="Take a full or incremental backup")
+    backup.add_argument('--incremental', action='store_true',
+                        help="Only rows created/updated since the previous backup")
+    backup.add_argument('--safety-seconds', type=int,
+                        default=int(os.environ.get('BACKUP_SAFETY_SECONDS', 300)),
+                        help="Overlap with the previous backup, longer than any write transaction")
+    backup.add_argument('--tables', nargs='+', help="Limit the backup to these tables")
+    backup.add_argument('--chunk-rows', type=int, default=100000, help="Primary-key range per file")
+    backup.add_argument('--compress-level', type=int, default=6, choices=range(1, 10), metavar='1-9')
+    backup.add_argument('--lock-wait', type=int, default=2,
+                        help="Seconds to wait for the snapshot lock before falling back")
+    backup.add_argument('--no-lock', action='store_true',
+                        help="Never take the snapshot lock; read through one connection")
+
+    restore = commands.add_parser('restore', help="Restore a backup and the backups it depends on")
+    restore.add_argument('name')
+    restore.add_argument('--batch-size', type=int, default=1000, help="Rows per upsert batch")
+    restore.add_argument('--replace', action='store_true',
+                         help="Empty the backed-up tables before loading (MySQL)")
+
+    commands.add_parser('list', help="List completed backups")
+    commands.add_parser('migrate', help="Add updated_at to sales and sale items for incremental backups")
+    return parser.parse_args(argv)
+
+
+def run_migrate(args):
+    conn = storage.connect_from_args(args)
+    if conn is None:
+        return 1
+    storage.print_header("Adding change tracking to the sales tables")
+    try:
+        changed = migrate(conn)
+    except Error as e:
+        print(f"❌ {e}")
+        return 1
+    finally:
+        conn.close()
+    if changed:
+        # Incrementals restore on top of the full backup's table definitions
+        print("\n⚠ Take a full backup next; older backups lack the new column")
+    return 0
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == 'backup':
+        return run_backup(args)
+    if args.command == 'restore':
+        return run_restore(args)
+    if args.command == 'migrate':
+        return run_migrate(args)
+    return list_backups(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
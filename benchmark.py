@@ -0,0 +1,561 @@
+#!/usr/bin/env python3
+"""
+Oil Shop Management System - Benchmark Harness
+Starts the app against a dedicated benchmark database (MySQL, or the embedded
+SQLite backend as a local stand-in), seeds it and drives a mixed POS workload
+(barcode scans, sales, dashboard polling, report ranges and invoice downloads)
+with configurable concurrency. Latency percentiles and
+throughput per endpoint are written to JSON so runs can be compared.
+
+Usage:
+    python benchmark.py --concurrency 8 --duration 60 --output results.json
+    python benchmark.py --backend sqlite --duration 20
+    python benchmark.py --url http://127.0.0.1:5000 --no-seed
+    python benchmark.py --baseline old.json --max-regression 0.2
+    python benchmark.py --login-storm 8   # scan latency without, then with failed-login load
+"""
+
+import argparse
+import http.client
+import json
+import math
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta
+from urllib.parse import urlsplit
+
+import storage
+
+BENCH_USERNAME = 'bench_admin'
+BENCH_PASSWORD = 'bench-password'
+
+# Relative frequency of each operation in the mixed workload
+DEFAULT_MIX = {
+    'scan': 50,
+    'create_sale': 20,
+    'dashboard': 15,
+    'report': 10,
+    'invoice': 5,
+}
+
+# Seeded accounts targeted by --login-storm, so every attempt makes the server verify a hash
+STORM_ACCOUNTS = 50
+STORM_USERNAME = 'bench_storm_{:02d}'
+
+# Basket sizes (number of lines per sale) and their weights
+BASKET_SIZES = [1, 2, 3, 4, 5, 8, 12]
+BASKET_WEIGHTS = [35, 25, 15, 10, 8, 5, 2]
+
+
+def seed_database(args):
+    """Recreate the benchmark database from database_init.sql and add bench data"""
+    from werkzeug.security import generate_password_hash
+
+    storage.print_header(f"Seeding benchmark database ({args.backend})")
+    if args.backend == 'sqlite':
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(args.sqlite_path + suffix):
+                os.remove(args.sqlite_path + suffix)
+        conn = storage.connect_from_args(args)
+        if conn is None:
+            raise RuntimeError(f"Could not open {args.sqlite_path}")
+        cursor = conn.cursor()
+    else:
+        # The database is dropped and recreated, so connect to the server without selecting it
+        import mysql.connector
+        conn = mysql.connector.connect(host=args.db_host, user=args.db_user, password=args.db_password)
+        cursor = conn.cursor()
+        cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+        with open('database_init.sql', 'r') as f:
+            sql_script = f.read().replace('oil_shop_db', args.db_name)
+        for statement in storage.split_sql_statements(sql_script):
+            cursor.execute(statement)
+
+    rng = random.Random(args.seed)
+    categories = ['Engine Oil', 'Diesel Oil', 'Motorcycle Oil', 'Gear Oil',
+                  'Hydraulic Oil', 'Transmission Oil', 'Brake Fluid']
+    rows = []
+    for i in range(args.products):
+        price = round(rng.uniform(8, 120), 2)
+        rows.append((f"Bench Product {i:05d}", f"9{i:012d}", rng.choice(categories),
+                     price, round(price * rng.uniform(0.55, 0.8), 2),
+                     10 ** 6, rng.randint(5, 20), rng.randint(1, 3), 'Benchmark product'))
+    cursor.executemany("""
+        INSERT INTO products (name, barcode, category, price, cost_price, quantity,
+                              min_stock_level, supplier_id, description)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+    """, rows)
+
+    cursor.execute("DELETE FROM employees WHERE username = %s", (BENCH_USERNAME,))
+    cursor.execute("INSERT INTO employees (username, password, role) VALUES (%s, %s, %s)",
+                   (BENCH_USERNAME, generate_password_hash(BENCH_PASSWORD), 'admin'))
+    cursor.execute("DELETE FROM employees WHERE username LIKE 'bench_storm_%'")
+    storm_hash = generate_password_hash(f"storm-{rng.random()}")
+    cursor.executemany("INSERT INTO employees (username, password, role) VALUES (%s, %s, %s)",
+                       [(STORM_USERNAME.format(i), storm_hash, 'staff') for i in range(STORM_ACCOUNTS)])
+    conn.commit()
+    cursor.close()
+    conn.close()
+    print(f"✓ Seeded {args.products} benchmark products, user '{BENCH_USERNAME}' "
+          f"and {STORM_ACCOUNTS} login storm accounts")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(args):
+    """Start app.py in a child process on a threaded Werkzeug server"""
+    port = free_port()
+    env = dict(os.environ)
+    env.update({
+        'DB_HOST': args.db_host,
+        'DB_USER': args.db_user,
+        'DB_PASSWORD': args.db_password,
+        'DB_NAME': args.db_name,
+        'DB_BACKEND': args.backend,
+        'SQLITE_PATH': args.sqlite_path,
+    })
+    if args.login_storm:
+        # The storm is meant to keep the hashing pool busy, not to measure the login throttle
+        env['MAX_LOGIN_ATTEMPTS'] = env['MAX_LOGIN_ATTEMPTS_PER_IP'] = str(10 ** 9)
+    code = ("from werkzeug.serving import run_simple; import app; "
+            f"run_simple('127.0.0.1', {port}, app.app, threaded=True)")
+    log = open(args.server_log, 'w')
+    proc = subprocess.Popen([sys.executable, '-c', code], env=env,
+                            stdout=log, stderr=subprocess.STDOUT)
+    log.close()
+    base_url = f"http://127.0.0.1:{port}"
+
+    deadline = time.time() + args.startup_timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"Server exited during startup, see {args.server_log}")
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.2):
+                return proc, base_url
+        except OSError:
+            time.sleep(0.05)
+    proc.terminate()
+    raise RuntimeError("Server did not start in time")
+
+
+class Client:
+    """Minimal keep-alive HTTP client sharing the session cookie"""
+
+    def __init__(self, base_url, cookie=None, timeout=30):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self.cookie = cookie
+        self.conn = None
+
+    def request(self, method, path, body=None):
+        headers = {'Accept': 'application/json'}
+        if self.cookie:
+            headers['Cookie'] = self.cookie
+        payload = None
+        if body is not None:
+            payload = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        for attempt in range(2):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                self.conn.request(method, path, body=payload, headers=headers)
+                response = self.conn.getresponse()
+                data = response.read()
+                cookie = response.getheader('Set-Cookie')
+                if cookie:
+                    self.cookie = cookie.split(';', 1)[0]
+                return response.status, data
+            except (http.client.HTTPException, OSError):
+                self.conn.close()
+                self.conn = None
+                if attempt:
+                    raise
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+
+
+def login(base_url):
+    client = Client(base_url)
+    status, data = client.request('POST', '/login',
+                                  {'username': BENCH_USERNAME, 'password': BENCH_PASSWORD})
+    if status != 200:
+        raise RuntimeError(f"Benchmark login failed ({status}): {data[:200]!r}")
+    client.close()
+    return client.cookie
+
+
+class Workload:
+    """Picks operations and builds requests for the mixed POS workload"""
+
+    def __init__(self, catalog, sale_ids, sale_ids_lock, mix, report_days, rng):
+        self.catalog = catalog
+        self.sale_ids = sale_ids
+        self.sale_ids_lock = sale_ids_lock
+        self.ops = list(mix)
+        self.weights = [mix[op] for op in self.ops]
+        self.report_days = report_days
+        self.rng = rng
+
+    def next_request(self):
+        op = self.rng.choices(self.ops, self.weights)[0]
+        return getattr(self, f"_{op}")()
+
+    def _scan(self):
+        product = self.rng.choice(self.catalog)
+        return 'scan', 'GET', f"/api/products/{product['barcode']}", None
+
+    def _create_sale(self):
+        size = self.rng.choices(BASKET_SIZES, BASKET_WEIGHTS)[0]
+        lines = self.rng.sample(self.catalog, min(size, len(self.catalog)))
+        items = []
+        for product in lines:
+            quantity = self.rng.randint(1, 3)
+            price = float(product['price'])
+            items.append({'product_id': product['id'], 'quantity': quantity,
+                          'price': price, 'subtotal': round(price * quantity, 2)})
+        total = round(sum(item['subtotal'] for item in items), 2)
+        body = {
+            'customer_phone': f"555-{self.rng.randint(0, 9999):04d}",
+            'total_amount': total,
+            'discount': 0,
+            'payment_method': self.rng.choice(['cash', 'card', 'online']),
+            'items': items,
+        }
+        return 'create_sale', 'POST', '/api/sales', body
+
+    def _dashboard(self):
+        return 'dashboard', 'GET', '/api/dashboard/stats', None
+
+    def _report(self):
+        days = self.rng.choice(self.report_days)
+        end = date.today()
+        start = end - timedelta(days=days)
+        return 'report', 'GET', f"/api/sales?start_date={start}&end_date={end}", None
+
+    def _invoice(self):
+        with self.sale_ids_lock:
+            sale_id = self.rng.choice(self.sale_ids) if self.sale_ids else None
+        if sale_id is None:
+            return self._scan()
+        return 'invoice', 'GET', f"/api/sales/{sale_id}/invoice", None
+
+    def record_sale(self, data):
+        try:
+            sale_id = json.loads(data).get('sale_id')
+        except ValueError:
+            return
+        if sale_id:
+            with self.sale_ids_lock:
+                self.sale_ids.append(sale_id)
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(pct / 100 * len(sorted_values))
+    return sorted_values[min(max(rank, 1), len(sorted_values)) - 1]
+
+
+def summarize(samples, errors, elapsed):
+    summary = {}
+    for name in sorted(set(samples) | set(errors)):
+        latencies = sorted(samples.get(name, []))
+        count = len(latencies)
+        summary[name] = {
+            'requests': count,
+            'errors': errors.get(name, 0),
+            'throughput_rps': round(count / elapsed, 2) if elapsed else 0.0,
+            'mean_ms': round(sum(latencies) / count, 3) if count else 0.0,
+            'p50_ms': round(percentile(latencies, 50), 3),
+            'p95_ms': round(percentile(latencies, 95), 3),
+            'p99_ms': round(percentile(latencies, 99), 3),
+            'max_ms': round(latencies[-1], 3) if count else 0.0,
+        }
+    return summary
+
+
+def login_storm(base_url, args, start_event, stop_event, counts, lock, index):
+    """Send wrong passwords for the storm accounts until the workload finishes"""
+    rng = random.Random(args.seed * 7919 + index)
+    client = Client(base_url, timeout=args.timeout)
+    local = {'attempts': 0, 'ok': 0, 'rejected': 0, 'throttled': 0, 'busy': 0, 'failed': 0}
+    start_event.wait()
+    while not stop_event.is_set():
+        username = STORM_USERNAME.format(rng.randrange(STORM_ACCOUNTS))
+        body = {'username': username, 'password': f"wrong-{rng.random()}"}
+        try:
+            status, _ = client.request('POST', '/login', body)
+        except (http.client.HTTPException, OSError):
+            status = None
+        local['attempts'] += 1
+        if status == 200:
+            local['ok'] += 1
+        elif status == 401:
+            local['rejected'] += 1
+        elif status == 429:
+            local['throttled'] += 1
+        elif status == 503:
+            local['busy'] += 1
+        else:
+            local['failed'] += 1
+    client.close()
+    with lock:
+        for key, value in local.items():
+            counts[key] = counts.get(key, 0) + value
+
+
+def run_workload(base_url, cookie, args, storm_threads=0):
+    """Drive the mixed workload from several threads, with storm_threads sending failed
+    logins alongside, and collect latencies"""
+    bootstrap = Client(base_url, cookie)
+    status, data = bootstrap.request('GET', '/api/products')
+    if status != 200:
+        raise RuntimeError(f"Could not load product catalog ({status})")
+    catalog = json.loads(data)
+    status, data = bootstrap.request('GET', '/api/sales')
+    sale_ids = [sale['id'] for sale in json.loads(data)] if status == 200 else []
+    bootstrap.close()
+    if not catalog:
+        raise RuntimeError("Product catalog is empty; run with seeding enabled")
+
+    mix = dict(DEFAULT_MIX)
+    for spec in args.mix or []:
+        name, _, weight = spec.partition('=')
+        if name not in DEFAULT_MIX:
+            raise SystemExit(f"Unknown operation in --mix: {name}")
+        mix[name] = float(weight)
+    mix = {name: weight for name, weight in mix.items() if weight > 0}
+
+    samples = {}
+    errors = {}
+    lock = threading.Lock()
+    sale_ids_lock = threading.Lock()
+    start_event = threading.Event()
+    measure_from = [0.0]
+    stop_at = [0.0]
+
+    def worker(index):
+        rng = random.Random(args.seed * 1000 + index)
+        workload = Workload(catalog, sale_ids, sale_ids_lock, mix, args.report_days, rng)
+        client = Client(base_url, cookie, timeout=args.timeout)
+        local_samples = {}
+        local_errors = {}
+        start_event.wait()
+        completed = 0
+        while True:
+            now = time.perf_counter()
+            if args.requests and completed >= args.requests:
+                break
+            if not args.requests and now >= stop_at[0]:
+                break
+            name, method, path, body = workload.next_request()
+            started = time.perf_counter()
+            try:
+                status, data = client.request(method, path, body)
+                ok = 200 <= status < 300
+            except (http.client.HTTPException, OSError):
+                ok = False
+                data = b''
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            completed += 1
+            if name == 'create_sale' and ok:
+                workload.record_sale(data)
+            if started < measure_from[0]:
+                continue
+            if ok:
+                local_samples.setdefault(name, []).append(elapsed_ms)
+            else:
+                local_errors[name] = local_errors.get(name, 0) + 1
+        client.close()
+        with lock:
+            for name, values in local_samples.items():
+                samples.setdefault(name, []).extend(values)
+            for name, count in local_errors.items():
+                errors[name] = errors.get(name, 0) + count
+
+    storm_counts = {}
+    storm_stop = threading.Event()
+    stormers = [threading.Thread(target=login_storm,
+                                 args=(base_url, args, start_event, storm_stop, storm_counts, lock, i),
+                                 daemon=True)
+                for i in range(storm_threads)]
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True)
+               for i in range(args.concurrency)]
+    for thread in threads + stormers:
+        thread.start()
+    began = time.perf_counter()
+    measure_from[0] = began + args.warmup
+    stop_at[0] = measure_from[0] + args.duration
+    start_event.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - max(measure_from[0], began)
+    storm_stop.set()
+    for thread in stormers:
+        thread.join()
+
+    all_latencies = [value for values in samples.values() for value in values]
+    endpoints = summarize(samples, errors, elapsed)
+    overall = summarize({'all': all_latencies}, {'all': sum(errors.values())}, elapsed)['all']
+    storm = dict(storm_counts, threads=storm_threads) if storm_threads else None
+    return endpoints, overall, round(elapsed, 3), mix, storm
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_to_baseline(results, baseline_path, max_regression):
+    """Return a list of endpoints whose p95 regressed beyond the allowed ratio"""
+    with open(baseline_path, 'r') as f:
+        baseline = json.load(f)
+    regressions = []
+    for name, current in results['endpoints'].items():
+        previous = baseline.get('endpoints', {}).get(name)
+        if not previous or not previous.get('p95_ms'):
+            continue
+        ratio = current['p95_ms'] / previous['p95_ms'] - 1
+        if ratio > max_regression:
+            regressions.append(f"{name}: p95 {previous['p95_ms']:.1f} ms -> "
+                               f"{current['p95_ms']:.1f} ms (+{ratio:.0%})")
+    return regressions
+
+
+def print_report(results):
+    storage.print_header("Benchmark Results")
+    print(f"{'endpoint':<14}{'req':>8}{'err':>6}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}")
+    rows = list(results['endpoints'].items()) + [('ALL', results['overall'])]
+    for name, stats in rows:
+        print(f"{name:<14}{stats['requests']:>8}{stats['errors']:>6}{stats['throughput_rps']:>9.1f}"
+              f"{stats['p50_ms']:>9.1f}{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}")
+    storm = results.get('login_storm')
+    if storm:
+        print(f"\nLogin storm ({storm['threads']} threads): {storm.get('attempts', 0)} attempts, "
+              f"{storm.get('rejected', 0)} hashed and rejected (401), {storm.get('throttled', 0)} throttled (429), "
+              f"{storm.get('busy', 0)} busy (503), {storm.get('ok', 0)} ok, {storm.get('failed', 0)} failed")
+        print(f"\n{'under storm':<14}{'p50':>9}{'p95':>9}{'p99':>9}{'p95 vs baseline':>18}")
+        baselines = dict(results['endpoints'], ALL=results['overall'])
+        for name, stats in list(storm['endpoints'].items()) + [('ALL', storm['overall'])]:
+            baseline = baselines.get(name)
+            change = (f"{stats['p95_ms'] / baseline['p95_ms'] - 1:>+17.0%}"
+                      if baseline and baseline['p95_ms'] else f"{'-':>17}")
+            print(f"{name:<14}{stats['p50_ms']:>9.1f}{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f} {change}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Oil Shop POS API")
+    parser.add_argument('--url', help="Benchmark an already running server instead of starting one")
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=30, help="Measured seconds per run")
+    parser.add_argument('--warmup', type=float, default=3, help="Seconds excluded from results")
+    parser.add_argument('--requests', type=int, default=0,
+                        help="Requests per worker (overrides --duration)")
+    parser.add_argument('--mix', nargs='*', metavar='OP=WEIGHT',
+                        help=f"Override workload weights ({', '.join(DEFAULT_MIX)})")
+    parser.add_argument('--report-days', type=int, nargs='+', default=[1, 7, 30, 90])
+    parser.add_argument('--products', type=int, default=500, help="Extra products to seed")
+    parser.add_argument('--login-storm', type=int, default=0, metavar='THREADS',
+                        help="After the measured run, repeat it with threads sending failed logins "
+                             "(the login throttle is lifted on the started server)")
+    parser.add_argument('--no-seed', action='store_true', help="Use the database as it is")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed for reproducibility")
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--startup-timeout', type=float, default=30)
+    parser.add_argument('--server-log', default='benchmark_server.log')
+    storage.add_cli_args(parser)
+    # Seeding recreates the database, so never default to the shop's own
+    parser.set_defaults(sqlite_path='benchmark.db',
+                        db_name=os.environ.get('BENCH_DB_NAME', 'oil_shop_bench'))
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--baseline', help="Previous results JSON to compare against")
+    parser.add_argument('--max-regression', type=float, default=0.2,
+                        help="Allowed p95 slowdown versus baseline (0.2 = 20%%)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    server = None
+    try:
+        if args.url:
+            base_url = args.url.rstrip('/')
+        else:
+            if not args.no_seed:
+                seed_database(args)
+            server, base_url = start_server(args)
+
+        storage.print_header(f"Running workload against {base_url}")
+        print(f"Concurrency: {args.concurrency}  Duration: {args.duration}s  Warmup: {args.warmup}s")
+        cookie = login(base_url)
+        endpoints, overall, elapsed, mix, _ = run_workload(base_url, cookie, args)
+        storm = None
+        if args.login_storm:
+            if args.url:
+                print("⚠ The server's login throttle stays on; most storm attempts may get 429")
+            print(f"Repeating the run with a {args.login_storm}-thread login storm...")
+            storm_endpoints, storm_overall, _, _, storm = run_workload(base_url, cookie, args, args.login_storm)
+            storm.update(endpoints=storm_endpoints, overall=storm_overall)
+
+        results = {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'config': {
+                'concurrency': args.concurrency,
+                'duration': args.duration,
+                'warmup': args.warmup,
+                'requests_per_worker': args.requests,
+                'mix': mix,
+                'report_days': args.report_days,
+                'seed': args.seed,
+                'target': base_url if args.url else 'local',
+                'backend': None if args.url else args.backend,
+                'login_storm': args.login_storm,
+            },
+            'elapsed_s': elapsed,
+            'overall': overall,
+            'endpoints': endpoints,
+            'login_storm': storm,
+        }
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print_report(results)
+        print(f"\n✓ Results written to {args.output}")
+
+        if args.baseline:
+            regressions = compare_to_baseline(results, args.baseline, args.max_regression)
+            if regressions:
+                print("\n❌ Regressions against baseline:")
+                for line in regressions:
+                    print(f"   {line}")
+                return 1
+            print(f"✓ No p95 regression above {args.max_regression:.0%} against {args.baseline}")
+        return 0
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""
+Oil Shop Management System - Cache Invalidation Bus
+Keeps per-process caches coherent across worker processes.
+
+Every write bumps the version of the entities it touched ('products',
+'sales', 'users', 'suppliers') in the small `cache_versions` table, inside
+the same transaction as the write. Readers fetch all versions with one
+primary-key scan of that table, at most once per request, and a cached
+value is only served while the versions it was loaded under are still
+current. A worker therefore never serves data older than the last
+committed write, whichever process made it. Entries also expire after
+CACHE_TTL_SECONDS as a safety net.
+
+Bumps should come last in a transaction: the version row stays locked
+until commit, so concurrent writers of the same entity queue on it.
+Databases created before this table existed need the cache_versions
+statements from database_init.sql.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from flask import g, has_request_context
+
+import storage
+
+logger = logging.getLogger('cache_bus')
+
+CACHE_CONFIG = {
+    'enabled': True,
+    'ttl_seconds': 300.0,
+    'max_entries': 1000,
+}
+
+ENTITIES = ('products', 'sales', 'users', 'suppliers')
+
+VERSIONS_SQL = "SELECT entity, version FROM cache_versions"
+
+_caches = []
+
+
+def configure(config):
+    CACHE_CONFIG.update(config)
+    for cache in _caches:
+        cache.clear()
+
+
+def _memo_key(conn):
+    # A replica may be behind the primary: its versions only describe its own data
+    return '_cache_versions_replica' if storage.is_replica(conn) else '_cache_versions'
+
+
+def current_versions(conn):
+    """Return {entity: version}, read once per request and connection kind"""
+    if has_request_context():
+        versions = g.get(_memo_key(conn))
+        if versions is not None:
+            return versions
+    cursor = conn.cursor()
+    try:
+        cursor.execute(VERSIONS_SQL)
+        versions = dict(cursor.fetchall())
+    finally:
+        cursor.close()
+    if has_request_context():
+        setattr(g, _memo_key(conn), versions)
+    return versions
+
+
+def bump(conn, *entities):
+    """Advance the versions of the given entities; call inside the write transaction"""
+    cursor = conn.cursor()
+    try:
+        marks = ', '.join(['%s'] * len(entities))
+        cursor.execute(f"UPDATE cache_versions SET version = version + 1 WHERE entity IN ({marks})",
+                       entities)
+        if cursor.rowcount < len(entities):
+            # First write of an entity on a database created without the seed rows
+            for entity in entities:
+                cursor.execute("INSERT IGNORE INTO cache_versions (entity, version) VALUES (%s, 1)",
+                               (entity,))
+    finally:
+        cursor.close()
+    if has_request_context():
+        g.pop('_cache_versions', None)
+        g.pop('_cache_versions_replica', None)
+
+
+class VersionedCache:
+    """LRU cache whose entries are valid while the versions of `depends_on` are unchanged"""
+
+    def __init__(self, name, depends_on):
+        self.name = name
+        self.depends_on = tuple(depends_on)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        _caches.append(self)
+
+    def get_or_load(self, conn, key, loader):
+        if not CACHE_CONFIG['enabled']:
+            return loader()
+        versions = current_versions(conn)
+        stamp = tuple(versions.get(entity, 0) for entity in self.depends_on)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stamp and now - entry[2] < CACHE_CONFIG['ttl_seconds']:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        # Stored under the versions read before loading: a write that lands
+        # in between makes the entry stale on the next request, never the
+        # other way round.
+        value = loader()
+        with self._lock:
+            self._entries[key] = (stamp, value, now)
+            self._entries.move_to_end(key)
+            while len(self._entries) > CACHE_CONFIG['max_entries']:
+                self._entries.popitem(last=False)
+        return value
+
+    def last_known(self, key):
+        """The cached value whatever its versions or age (for when the database is unreachable)"""
+        with self._lock:
+            entry = self._entries.get(key)
+        return entry[1] if entry is not None else None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            size = len(self._entries)
+        return {'name': self.name, 'depends_on': list(self.depends_on), 'entries': size,
+                'hits': self.hits, 'misses': self.misses}
+
+
+def get_stats():
+    return [cache.stats() for cache in _caches]
+
+
+def clear_all():
+    for cache in _caches:
+        cache.clear()
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Oil Shop Management System - Customer History
+Returning-customer lookups by phone number.
+
+Sales are indexed on (customer_phone, created_at), so a customer's history
+is an index range read. Lifetime aggregates (visits, spend, first and last
+visit, last oil grade bought) live in `customer_stats`, which create_sale
+updates incrementally. The oil grade is parsed from the product name
+(5W-30, 80W-90, SAE 40, ISO 68, ...).
+
+Phone numbers are stored and looked up without separators, so
+"077 123 4567" and "077-1234567" find the same customer.
+
+`migrate` adds the index and the table to an existing database, normalizes
+the phone numbers already stored and rebuilds the aggregates from the full
+sales history (hot and archived);
+`rebuild` only recomputes the aggregates.
+
+Usage:
+    python customers.py migrate
+    python customers.py rebuild
+"""
+
+import argparse
+import re
+import sys
+
+from mysql.connector import Error
+
+import storage
+
+OIL_GRADE_RE = re.compile(r'\b(?:(\d{1,2})W-?(\d{2,3})|SAE\s?(\d{2,3})|ISO(?:\s?VG)?\s?(\d{2,3}))\b',
+                          re.IGNORECASE)
+
+PHONE_SEPARATORS_RE = re.compile(r'[\s\-.()/]')
+
+INDEXED_TABLES = ('sales', 'sales_archive')
+
+# normalize_phone in SQL, for phones stored before numbers were normalized
+NORMALIZED_PHONE_SQL = ("REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(TRIM(customer_phone), "
+                        "' ', ''), '-', ''), '.', ''), '(', ''), ')', ''), '/', '')")
+
+
+def oil_grade(product_name):
+    """Normalized viscosity grade in a product name ('5W-40', 'SAE 40', 'ISO 68'), or None"""
+    match = OIL_GRADE_RE.search(product_name or '')
+    if match is None:
+        return None
+    winter, hot, sae, iso = match.groups()
+    if winter:
+        return f"{int(winter)}W-{hot}"
+    if sae:
+        return f"SAE {sae}"
+    return f"ISO {iso}"
+
+
+def normalize_phone(phone):
+    """Phone number without spaces, dashes, dots, slashes or brackets ('077 123-4567' -> '0771234567')"""
+    return PHONE_SEPARATORS_RE.sub('', phone or '')
+
+
+def ensure_schema(conn):
+    """Create customer_stats and the phone indexes when missing"""
+    storage.ensure_tables(conn, 'customer_stats')
+    cursor = conn.cursor()
+    try:
+        for table in INDEXED_TABLES:
+            if storage.backend() == 'sqlite':
+                cursor.execute(f"CREATE INDEX IF NOT EXISTS {table}_idx_customer_phone "
+                               f"ON {table} (customer_phone, created_at)")
+                continue
+            cursor.execute("""
+                SELECT COUNT(*) FROM information_schema.STATISTICS
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = 'idx_customer_phone'
+            """, (table,))
+            if cursor.fetchone()[0] == 0:
+                print(f"  adding idx_customer_phone to {table}...")
+                cursor.execute(f"ALTER TABLE {table} ADD INDEX idx_customer_phone (customer_phone, created_at)")
+        conn.commit()
+    finally:
+        cursor.close()
+
+
+def normalize_stored_phones(conn):
+    """Rewrite customer_phone on existing sales in normalized form; returns the rows changed"""
+    changed = 0
+    cursor = conn.cursor()
+    try:
+        for table in INDEXED_TABLES:
+            cursor.execute(f"UPDATE {table} SET customer_phone = {NORMALIZED_PHONE_SQL} "
+                           f"WHERE customer_phone <> {NORMALIZED_PHONE_SQL}")
+            changed += cursor.rowcount
+        conn.commit()
+    except Error:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return changed
+
+
+def rebuild_stats(conn, batch_size=1000):
+    """Recompute customer_stats from all sales; returns the number of customers"""
+    stats = {}
+    cursor = conn.cursor()
+    try:
+        for sales, items in (('sales_archive', 'sale_items_archive'), ('sales', 'sale_items')):
+            cursor.execute(f"""
+                SELECT customer_phone, customer_name, total_amount, created_at
+                FROM {sales}
+                WHERE customer_phone IS NOT NULL AND customer_phone <> ''
+                ORDER BY created_at, id
+            """)
+            for phone, name, amount, created_at in iter(cursor.fetchone, None):
+                phone = normalize_phone(phone)
+                entry = stats.setdefault(phone, [phone, name, 0, 0, created_at, created_at, None])
+                entry[1] = name or entry[1]
+                entry[2] += 1
+                entry[3] += amount
+                entry[4] = min(entry[4], created_at)
+                entry[5] = max(entry[5], created_at)
+            cursor.execute(f"""
+                SELECT s.customer_phone, si.product_name
+                FROM {sales} s
+                JOIN {items} si ON si.sale_id = s.id
+                WHERE s.customer_phone IS NOT NULL AND s.customer_phone <> ''
+                ORDER BY s.created_at, s.id, si.id
+            """)
+            last_sale_grades = {}
+            for phone, product_name in iter(cursor.fetchone, None):
+                grade = oil_grade(product_name)
+                if grade:
+                    last_sale_grades[normalize_phone(phone)] = grade
+            for phone, grade in last_sale_grades.items():
+                stats[phone][6] = grade
+
+        cursor.execute("DELETE FROM customer_stats")
+        rows = list(stats.values())
+        for offset in range(0, len(rows), batch_size):
+            batch = rows[offset:offset + batch_size]
+            cursor.execute(
+                "INSERT INTO customer_stats (customer_phone, customer_name, visits, total_spent, "
+                "first_visit, last_visit, last_oil_grade) VALUES "
+                + ', '.join(['(%s, %s, %s, %s, %s, %s, %s)'] * len(batch)),
+                [value for row in batch for value in row])
+        conn.commit()
+    except Error:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return len(stats)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain the customer history index and aggregates")
+    storage.add_cli_args(parser)
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('migrate', help="Add the phone index and customer_stats, then rebuild it")
+    commands.add_parser('rebuild', help="Recompute customer_stats from the sales history")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    conn = storage.connect_from_args(args)
+    if conn is None:
+        return 1
+
+    try:
+        if args.command == 'migrate':
+            storage.print_header("Customer history")
+            ensure_schema(conn)
+            print("✓ Index and customer_stats ready")
+            print(f"✓ {normalize_stored_phones(conn)} phone numbers normalized")
+        customers = rebuild_stats(conn)
+        print(f"✓ Stats rebuilt for {customers} customers")
+    except Error as e:
+        print(f"❌ {e}")
+        return 1
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
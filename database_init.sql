@@ -3,6 +3,14 @@ CREATE DATABASE IF NOT EXISTS oil_shop_db;
 USE oil_shop_db;
 
 -- Drop tables if they exist (for fresh installation)
+DROP TABLE IF EXISTS jobs;
+DROP TABLE IF EXISTS customer_stats;
+DROP TABLE IF EXISTS reorder_suggestions;
+DROP TABLE IF EXISTS stock_snapshots;
+DROP TABLE IF EXISTS stock_movements;
+DROP TABLE IF EXISTS cache_versions;
+DROP TABLE IF EXISTS sale_items_archive;
+DROP TABLE IF EXISTS sales_archive;
 DROP TABLE IF EXISTS sale_items;
 DROP TABLE IF EXISTS sales;
 DROP TABLE IF EXISTS products;
@@ -61,26 +69,152 @@ CREATE TABLE sales (
     payment_method ENUM('cash', 'card', 'online') DEFAULT 'cash',
     employee_id INT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     FOREIGN KEY (employee_id) REFERENCES employees(id) ON DELETE SET NULL,
     INDEX idx_date (created_at),
-    INDEX idx_employee (employee_id)
+    INDEX idx_employee (employee_id),
+    INDEX idx_customer_phone (customer_phone, created_at),
+    INDEX idx_updated (updated_at)
 );
 
 -- Create Sale Items Table
 CREATE TABLE sale_items (
     id INT PRIMARY KEY AUTO_INCREMENT,
     sale_id INT NOT NULL,
-    product_id INT NOT NULL,
+    product_id INT,
+    product_name VARCHAR(255),
+    barcode VARCHAR(100),
     quantity INT NOT NULL,
     price DECIMAL(10, 2) NOT NULL,
+    cost_price DECIMAL(10, 2),
     subtotal DECIMAL(10, 2) NOT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     FOREIGN KEY (sale_id) REFERENCES sales(id) ON DELETE CASCADE,
-    FOREIGN KEY (product_id) REFERENCES products(id) ON DELETE RESTRICT,
+    FOREIGN KEY (product_id) REFERENCES products(id) ON DELETE SET NULL,
     INDEX idx_sale (sale_id),
-    INDEX idx_product (product_id)
+    INDEX idx_product (product_id),
+    INDEX idx_updated (updated_at)
+);
+
+-- Stock Movement Ledger (append-only; every change to products.quantity, see stock_ledger.py)
+CREATE TABLE stock_movements (
+    id BIGINT PRIMARY KEY AUTO_INCREMENT,
+    product_id INT NOT NULL,
+    change_qty INT NOT NULL,
+    reason ENUM('initial', 'sale', 'adjustment', 'edit') NOT NULL,
+    reference_id INT,
+    employee_id INT,
+    note VARCHAR(255),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_product_created (product_id, created_at),
+    INDEX idx_created (created_at)
+);
+
+-- Periodic Stock Snapshots (products.quantity after movement last_movement_id)
+CREATE TABLE stock_snapshots (
+    taken_at DATETIME NOT NULL,
+    product_id INT NOT NULL,
+    quantity INT NOT NULL,
+    last_movement_id BIGINT NOT NULL,
+    PRIMARY KEY (taken_at, product_id)
+);
+
+-- Reorder Suggestions (rebuilt nightly by forecasting.py; one row per product)
+CREATE TABLE reorder_suggestions (
+    product_id INT PRIMARY KEY,
+    supplier_id INT,
+    current_stock INT NOT NULL,
+    daily_forecast DECIMAL(10, 3) NOT NULL,
+    safety_stock INT NOT NULL,
+    reorder_point INT NOT NULL,
+    suggested_qty INT NOT NULL,
+    estimated_cost DECIMAL(12, 2) NOT NULL,
+    days_of_cover DECIMAL(10, 1),
+    needs_reorder TINYINT(1) NOT NULL DEFAULT 0,
+    computed_at DATETIME NOT NULL,
+    INDEX idx_supplier_reorder (needs_reorder, supplier_id)
+);
+
+-- Customer Lifetime Stats (updated by every sale with a phone number; see customers.py)
+CREATE TABLE customer_stats (
+    customer_phone VARCHAR(20) PRIMARY KEY,
+    customer_name VARCHAR(255),
+    visits INT NOT NULL DEFAULT 0,
+    total_spent DECIMAL(12, 2) NOT NULL DEFAULT 0,
+    first_visit DATETIME,
+    last_visit DATETIME,
+    last_oil_grade VARCHAR(20)
+);
+
+-- Background Jobs (queued through /api/jobs and run by the worker pool in jobs.py)
+CREATE TABLE jobs (
+    id INT PRIMARY KEY AUTO_INCREMENT,
+    kind VARCHAR(50) NOT NULL,
+    params TEXT,
+    priority TINYINT NOT NULL DEFAULT 5,
+    status ENUM('queued', 'running', 'done', 'failed') NOT NULL DEFAULT 'queued',
+    progress TINYINT NOT NULL DEFAULT 0,
+    message VARCHAR(255),
+    attempts INT NOT NULL DEFAULT 0,
+    max_attempts INT NOT NULL DEFAULT 3,
+    run_after DATETIME NOT NULL,
+    result TEXT,
+    result_file VARCHAR(255),
+    result_name VARCHAR(255),
+    result_type VARCHAR(100),
+    error TEXT,
+    created_by INT,
+    created_at DATETIME NOT NULL,
+    started_at DATETIME,
+    heartbeat_at DATETIME,
+    finished_at DATETIME,
+    INDEX idx_queue (status, priority, run_after),
+    INDEX idx_finished (finished_at)
 );
 
+-- Cache Versions (bumped by every write so all workers can validate their caches; see cache_bus.py)
+CREATE TABLE cache_versions (
+    entity VARCHAR(50) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT INTO cache_versions (entity, version) VALUES
+('products', 0), ('sales', 0), ('users', 0), ('suppliers', 0);
+
+-- Archived Sales History (filled by sales_archive.py; same columns as sales / sale_items)
+CREATE TABLE sales_archive (
+    id INT PRIMARY KEY,
+    customer_name VARCHAR(255) DEFAULT 'Walk-in',
+    customer_phone VARCHAR(20),
+    total_amount DECIMAL(10, 2) NOT NULL,
+    discount DECIMAL(10, 2) DEFAULT 0,
+    payment_method ENUM('cash', 'card', 'online') DEFAULT 'cash',
+    employee_id INT,
+    created_at TIMESTAMP NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    INDEX idx_date (created_at),
+    INDEX idx_customer_phone (customer_phone, created_at),
+    INDEX idx_updated (updated_at)
+) ROW_FORMAT=COMPRESSED KEY_BLOCK_SIZE=8;
+
+CREATE TABLE sale_items_archive (
+    id INT PRIMARY KEY,
+    sale_id INT NOT NULL,
+    product_id INT,
+    product_name VARCHAR(255),
+    barcode VARCHAR(100),
+    quantity INT NOT NULL,
+    price DECIMAL(10, 2) NOT NULL,
+    cost_price DECIMAL(10, 2),
+    subtotal DECIMAL(10, 2) NOT NULL,
+    created_at TIMESTAMP NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    INDEX idx_sale (sale_id),
+    INDEX idx_product (product_id),
+    INDEX idx_updated (updated_at)
+) ROW_FORMAT=COMPRESSED KEY_BLOCK_SIZE=8;
+
 -- Insert Default Admin User will be created by fix_admin_password.py script
 -- This ensures the password hash is compatible with your Werkzeug version
 
@@ -110,13 +244,17 @@ INSERT INTO products (name, barcode, category, price, cost_price, quantity, min_
 
 -- Insert Sample Sales (for demonstration)
 INSERT INTO sales (customer_name, customer_phone, total_amount, discount, payment_method, employee_id) VALUES
-('John Customer', '555-1234', 91.98, 0, 'cash', 1),
-('Jane Smith', '555-5678', 135.97, 5.00, 'card', 1);
+('John Customer', '5551234', 91.98, 0, 'cash', 1),
+('Jane Smith', '5555678', 135.97, 5.00, 'card', 1);
+
+INSERT INTO sale_items (sale_id, product_id, product_name, barcode, quantity, price, cost_price, subtotal) VALUES
+(1, 1, 'Shell Helix Ultra 5W-40', '1234567890123', 2, 45.99, 32.00, 91.98),
+(2, 4, 'Shell Rimula R6 LM', '1234567890126', 1, 89.99, 65.00, 89.99),
+(2, 1, 'Shell Helix Ultra 5W-40', '1234567890123', 1, 45.99, 32.00, 45.99);
 
-INSERT INTO sale_items (sale_id, product_id, quantity, price, subtotal) VALUES
-(1, 1, 2, 45.99, 91.98),
-(2, 4, 1, 89.99, 89.99),
-(2, 1, 1, 45.99, 45.99);
+INSERT INTO customer_stats (customer_phone, customer_name, visits, total_spent, first_visit, last_visit, last_oil_grade) VALUES
+('5551234', 'John Customer', 1, 91.98, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, '5W-40'),
+('5555678', 'Jane Smith', 1, 135.97, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, '5W-40');
 
 -- Create Views for Reporting
 
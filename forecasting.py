@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Oil Shop Management System - Demand Forecasting and Reorder Suggestions
+Nightly job that replaces the hand-entered min_stock_level with reorder
+points derived from each product's sales.
+
+Daily units sold per product over the last FORECAST_HISTORY_DAYS are loaded
+in one aggregate query into a products x days matrix, and additive
+exponential smoothing with weekly seasonality runs over it one day at a
+time for all products at once. From the forecast and the spread of its
+one-day-ahead errors:
+
+  safety stock    z * error std * sqrt(lead time)
+  reorder point   forecast demand over the lead time + safety stock
+  order quantity  forecast demand over lead time + review period
+                  + safety stock - stock on hand, when at the reorder point
+
+Products without sales in the window keep min_stock_level as their reorder
+point. Results replace the `reorder_suggestions` table in one transaction;
+the API groups the products to reorder into draft purchase orders per
+supplier.
+
+Usage:
+    python forecasting.py migrate
+    python forecasting.py run [--history-days 182] [--lead-time-days 7]
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+from mysql.connector import Error
+
+import storage
+from repositories import transaction
+
+FORECAST_CONFIG = {
+    'history_days': 182,
+    'alpha': 0.3,
+    'gamma': 0.2,
+    'season_length': 7,
+    'lead_time_days': 7,
+    'review_days': 7,
+    'service_z': 1.65,
+    'batch_size': 1000,
+}
+
+PRODUCTS_SQL = """
+    SELECT id, supplier_id, quantity, min_stock_level, cost_price + 0E0
+    FROM products
+"""
+
+DAILY_SALES_SQL = """
+    SELECT product_id, DATE(created_at) AS day, SUM(quantity)
+    FROM sale_items
+    WHERE created_at >= %s
+    GROUP BY product_id, DATE(created_at)
+"""
+
+SUGGESTION_COLUMNS = ('product_id', 'supplier_id', 'current_stock', 'daily_forecast', 'safety_stock',
+                      'reorder_point', 'suggested_qty', 'estimated_cost', 'days_of_cover',
+                      'needs_reorder', 'computed_at')
+
+
+def configure(config):
+    FORECAST_CONFIG.update(config)
+
+
+def _fetch(conn, sql, params=()):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def demand_matrix(conn, product_ids, start, days):
+    """Units sold per product (rows, in product_ids order) and day since `start` (columns)"""
+    import numpy as np
+    import pandas as pd
+
+    rows = _fetch(conn, DAILY_SALES_SQL, (start.isoformat(),))
+    matrix = np.zeros((len(product_ids), days))
+    if not rows:
+        return matrix
+    sales = pd.DataFrame.from_records(rows, columns=['product_id', 'day', 'units'])
+    product_index = pd.Index(product_ids).get_indexer(sales['product_id'])
+    day_index = (pd.to_datetime(sales['day']) - pd.Timestamp(start)).dt.days.to_numpy()
+    keep = (product_index >= 0) & (day_index >= 0) & (day_index < days)
+    np.add.at(matrix, (product_index[keep], day_index[keep]), sales['units'].to_numpy(dtype='float64')[keep])
+    return matrix
+
+
+def seasonal_smoothing(matrix, start_weekday, horizon, config=None):
+    """Vectorized additive level + weekly season smoothing
+
+    Returns (forecast, error_std): the forecast for each of the next `horizon`
+    days (products x horizon) and the std of the one-step-ahead errors.
+    """
+    import numpy as np
+
+    config = config or FORECAST_CONFIG
+    alpha = config['alpha']
+    gamma = config['gamma']
+    m = config['season_length']
+    n_products, days = matrix.shape
+    warmup = min(days, 2 * m)
+
+    # Start from the first two weeks: their mean, and each weekday's offset from it
+    level = matrix[:, :warmup].mean(axis=1) if warmup else np.zeros(n_products)
+    season = np.zeros((n_products, m))
+    for offset in range(warmup):
+        season[:, (start_weekday + offset) % m] += (matrix[:, offset] - level) / (warmup / m)
+
+    squared_errors = np.zeros(n_products)
+    for t in range(days):
+        s = (start_weekday + t) % m
+        y = matrix[:, t]
+        if t >= warmup:
+            squared_errors += (y - (level + season[:, s])) ** 2
+        new_level = alpha * (y - season[:, s]) + (1 - alpha) * level
+        season[:, s] = gamma * (y - new_level) + (1 - gamma) * season[:, s]
+        level = new_level
+
+    steps = np.arange(horizon)
+    future_slots = (start_weekday + days + steps) % m
+    forecast = np.clip(level[:, None] + season[:, future_slots], 0, None)
+    error_std = np.sqrt(squared_errors / max(days - warmup, 1))
+    return forecast, error_std
+
+
+def compute_suggestions(conn, today=None, config=None):
+    """Forecast every product; returns the reorder_suggestions rows.
+
+    `config` overrides FORECAST_CONFIG for this run.
+    """
+    import numpy as np
+
+    settings = dict(FORECAST_CONFIG, **(config or {}))
+    today = today or date.today()
+    days = settings['history_days']
+    start = today - timedelta(days=days)
+    products = _fetch(conn, PRODUCTS_SQL)
+    if not products:
+        return []
+    product_ids = [row[0] for row in products]
+    supplier_ids = [row[1] for row in products]
+    stock = np.array([row[2] or 0 for row in products], dtype='float64')
+    min_levels = np.array([row[3] or 0 for row in products], dtype='float64')
+    costs = np.array([row[4] or 0.0 for row in products], dtype='float64')
+
+    lead = settings['lead_time_days']
+    cover = lead + settings['review_days']
+    matrix = demand_matrix(conn, product_ids, start, days)
+    forecast, error_std = seasonal_smoothing(matrix, start.weekday(), cover, settings)
+
+    has_history = matrix.sum(axis=1) > 0
+    daily = forecast.mean(axis=1)
+    safety = np.ceil(settings['service_z'] * error_std * np.sqrt(lead))
+    reorder_point = np.where(has_history, np.ceil(forecast[:, :lead].sum(axis=1)) + safety, min_levels)
+    target = np.where(has_history, np.ceil(forecast.sum(axis=1)) + safety, 2 * min_levels)
+    needs_reorder = (stock <= reorder_point) & (target > stock)
+    suggested = np.where(needs_reorder, target - np.clip(stock, 0, None), 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        days_of_cover = np.where(daily > 0, np.clip(stock, 0, None) / daily, np.nan)
+
+    computed_at = datetime.now().replace(microsecond=0)
+    return [
+        (product_ids[i], supplier_ids[i], int(stock[i]), round(float(daily[i]), 3),
+         int(safety[i]) if has_history[i] else 0, int(reorder_point[i]), int(suggested[i]),
+         round(float(suggested[i] * costs[i]), 2),
+         None if np.isnan(days_of_cover[i]) else round(float(days_of_cover[i]), 1),
+         int(needs_reorder[i]), computed_at)
+        for i in range(len(product_ids))
+    ]
+
+
+def save_suggestions(conn, rows):
+    """Replace the reorder_suggestions table in one transaction"""
+    batch_size = FORECAST_CONFIG['batch_size']
+    placeholders = '(' + ', '.join(['%s'] * len(SUGGESTION_COLUMNS)) + ')'
+    cursor = conn.cursor()
+    try:
+        with transaction(conn):
+            cursor.execute("DELETE FROM reorder_suggestions")
+            for offset in range(0, len(rows), batch_size):
+                batch = rows[offset:offset + batch_size]
+                cursor.execute(
+                    f"INSERT INTO reorder_suggestions ({', '.join(SUGGESTION_COLUMNS)}) "
+                    f"VALUES {', '.join([placeholders] * len(batch))}",
+                    [value for row in batch for value in row])
+    finally:
+        cursor.close()
+
+
+def run_forecast(conn, config=None):
+    started = time.perf_counter()
+    rows = compute_suggestions(conn, config=config)
+    save_suggestions(conn, rows)
+    return {
+        'products': len(rows),
+        'to_reorder': sum(row[9] for row in rows),
+        'elapsed_s': round(time.perf_counter() - started, 3),
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Forecast demand and suggest reorders")
+    storage.add_cli_args(parser)
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('migrate', help="Create the reorder_suggestions table")
+    run = commands.add_parser('run', help="Recompute the forecasts and reorder suggestions")
+    run.add_argument('--history-days', type=int,
+                     default=int(os.environ.get('FORECAST_HISTORY_DAYS', FORECAST_CONFIG['history_days'])))
+    run.add_argument('--lead-time-days', type=int,
+                     default=int(os.environ.get('FORECAST_LEAD_TIME_DAYS', FORECAST_CONFIG['lead_time_days'])))
+    run.add_argument('--review-days', type=int,
+                     default=int(os.environ.get('FORECAST_REVIEW_DAYS', FORECAST_CONFIG['review_days'])))
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    conn = storage.connect_from_args(args)
+    if conn is None:
+        return 1
+
+    try:
+        if args.command == 'migrate':
+            storage.ensure_tables(conn, 'reorder_suggestions')
+            print("✓ reorder_suggestions table ready")
+        else:
+            storage.print_header(f"Forecasting demand from {args.history_days} days of sales")
+            result = run_forecast(conn, {'history_days': args.history_days,
+                                         'lead_time_days': args.lead_time_days,
+                                         'review_days': args.review_days})
+            print(f"✓ {result['products']} products forecast, {result['to_reorder']} to reorder "
+                  f"({result['elapsed_s']:.1f}s)")
+    except Error as e:
+        print(f"❌ {e}")
+        return 1
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Oil Shop Management System - Import-Time Profile
+Measures what importing app.py costs and writes the report to build/.
+
+Runs `python -X importtime -c "import app"` in a fresh interpreter, ranks
+packages by cumulative and self import time and fails when the start-up
+path pulls in modules that should only load on first use (ReportLab,
+pandas, ...) or when the total exceeds --max-ms.
+
+Usage:
+    python import_profile.py
+    python import_profile.py --max-ms 800 --top 30
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime
+
+DEFERRED_MODULES = ['reportlab', 'pandas', 'numpy', 'PIL', 'openpyxl', 'qrcode', 'barcode', 'pyzbar']
+
+
+def profile_imports(module):
+    """Return (name, depth, self_us, cumulative_us) for every import of a fresh interpreter"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        stripped = name.lstrip()
+        depth = (len(name) - len(stripped) - 1) // 2
+        entries.append((stripped, depth, int(self_us), int(cumulative_us)))
+    return entries
+
+
+def build_report(module, entries, top):
+    total_us = sum(self_us for _, _, self_us, _ in entries)
+    packages = {}
+    for name, _, self_us, _ in entries:
+        root = name.split('.', 1)[0]
+        packages[root] = packages.get(root, 0) + self_us
+    slowest = sorted(entries, key=lambda e: e[3], reverse=True)
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'module': module,
+        'total_ms': round(total_us / 1000, 1),
+        'modules_imported': len(entries),
+        'packages': [{'package': name, 'ms': round(us / 1000, 1)}
+                     for name, us in sorted(packages.items(), key=lambda p: p[1], reverse=True)[:top]],
+        'slowest_cumulative': [{'module': name, 'depth': depth, 'self_ms': round(self_us / 1000, 1),
+                                'cumulative_ms': round(cum_us / 1000, 1)}
+                               for name, depth, self_us, cum_us in slowest[:top]],
+    }
+
+
+def write_text_report(path, report, loaded_deferred):
+    with open(path, 'w') as f:
+        f.write(f"Import profile for '{report['module']}' ({report['timestamp']}, Python {report['python']})\n")
+        f.write(f"Total: {report['total_ms']:.1f} ms across {report['modules_imported']} modules\n\n")
+        f.write(f"{'package':<32}{'self ms':>10}\n")
+        for entry in report['packages']:
+            f.write(f"{entry['package']:<32}{entry['ms']:>10.1f}\n")
+        f.write(f"\n{'module':<48}{'self ms':>10}{'cumul ms':>10}\n")
+        for entry in report['slowest_cumulative']:
+            name = '  ' * entry['depth'] + entry['module']
+            f.write(f"{name[:47]:<48}{entry['self_ms']:>10.1f}{entry['cumulative_ms']:>10.1f}\n")
+        if loaded_deferred:
+            f.write(f"\nLoaded at start-up but should be deferred: {', '.join(loaded_deferred)}\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profile the import time of the application")
+    parser.add_argument('--module', default='app')
+    parser.add_argument('--output-dir', default='build')
+    parser.add_argument('--top', type=int, default=25)
+    parser.add_argument('--max-ms', type=float, help="Fail when the total import time is higher")
+    parser.add_argument('--deferred', nargs='*', default=DEFERRED_MODULES,
+                        help="Packages that must not be imported at start-up")
+    args = parser.parse_args(argv)
+
+    entries = profile_imports(args.module)
+    report = build_report(args.module, entries, args.top)
+    imported = {name.split('.', 1)[0] for name, _, _, _ in entries}
+    loaded_deferred = sorted(imported & set(args.deferred))
+    report['loaded_deferred'] = loaded_deferred
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    json_path = os.path.join(args.output_dir, 'import_profile.json')
+    text_path = os.path.join(args.output_dir, 'import_profile.txt')
+    with open(json_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    write_text_report(text_path, report, loaded_deferred)
+
+    print(f"Import of '{args.module}': {report['total_ms']:.1f} ms, {report['modules_imported']} modules")
+    print(f"✓ Report written to {text_path} and {json_path}")
+    failed = False
+    if loaded_deferred:
+        print(f"❌ Loaded at start-up: {', '.join(loaded_deferred)}")
+        failed = True
+    if args.max_ms is not None and report['total_ms'] > args.max_ms:
+        print(f"❌ Import time {report['total_ms']:.1f} ms exceeds {args.max_ms:.1f} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+"""
+Oil Shop Management System - PDF Invoices
+Builds the Letter-size invoice for a sale.
+
+ReportLab is imported inside build_invoice_pdf so that the server (and the
+desktop launcher waiting for it) does not pay for it at start-up; the first
+invoice request loads it.
+"""
+
+import io
+from datetime import datetime
+
+
+def build_invoice_pdf(sale, items):
+    """Render the invoice for a sale and its items; returns a BytesIO at offset 0"""
+    from reportlab.lib import colors
+    from reportlab.lib.enums import TA_CENTER
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import inch
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+
+    sale_id = sale['id']
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter, 
+                          rightMargin=0.5*inch, leftMargin=0.5*inch,
+                          topMargin=0.5*inch, bottomMargin=0.5*inch)
+
+    elements = []
+    styles = getSampleStyleSheet()
+
+    # Custom styles - ALL BLACK
+    title_style = styles['Heading1']
+    title_style.alignment = TA_CENTER
+    title_style.textColor = colors.black
+    title_style.fontSize = 28
+    title_style.spaceAfter = 5
+
+    subtitle_style = styles['Normal']
+    subtitle_style.alignment = TA_CENTER
+    subtitle_style.textColor = colors.black
+    subtitle_style.fontSize = 12
+    subtitle_style.spaceAfter = 20
+
+    # Header
+    elements.append(Paragraph("OIL SHOP INVOICE", title_style))
+    elements.append(Spacer(1, 0.2*inch))
+
+    # Company Info Box
+    company_data = [
+        ['Oil Shop Management System', '', f'Invoice #: INV-{sale_id:05d}'],
+        ['123 Business Street', '', f'Date: {sale["created_at"].strftime("%Y-%m-%d %H:%M") if isinstance(sale["created_at"], datetime) else sale["created_at"]}'],
+        ['City, State 12345', '', f'Cashier: {sale["employee_name"]}'],
+        ['Phone: (123) 456-7890', '', f'Payment: {sale["payment_method"].upper()}']
+    ]
+
+    company_table = Table(company_data, colWidths=[2.5*inch, 2*inch, 2.5*inch])
+    company_table.setStyle(TableStyle([
+        ('FONT', (0, 0), (-1, -1), 'Helvetica', 9),
+        ('FONT', (2, 0), (2, 0), 'Helvetica-Bold', 11),
+        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+        ('ALIGN', (0, 0), (1, -1), 'LEFT'),
+        ('ALIGN', (2, 0), (2, -1), 'RIGHT'),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('TOPPADDING', (0, 0), (-1, -1), 3),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
+    ]))
+    elements.append(company_table)
+    elements.append(Spacer(1, 0.3*inch))
+
+    # Customer Info Section
+    if sale.get('customer_phone'):
+        customer_data = [
+            ['BILL TO:', ''],
+            [f"Phone: {sale['customer_phone']}", '']
+        ]
+        customer_table = Table(customer_data, colWidths=[3.5*inch, 3.5*inch])
+        customer_table.setStyle(TableStyle([
+            ('FONT', (0, 0), (0, 0), 'Helvetica-Bold', 10),
+            ('FONT', (0, 1), (-1, -1), 'Helvetica', 9),
+            ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+            ('TOPPADDING', (0, 0), (-1, -1), 5),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
+        ]))
+        elements.append(customer_table)
+        elements.append(Spacer(1, 0.2*inch))
+
+    # Items Table Header
+    items_data = [['#', 'Product Name', 'Qty', 'Unit Price', 'Subtotal']]
+
+    # Items rows
+    for idx, item in enumerate(items, 1):
+        items_data.append([
+            str(idx),
+            item['product_name'][:35],
+            str(item['quantity']),
+            f"${item['price']:.2f}",
+            f"${item['subtotal']:.2f}"
+        ])
+
+    items_table = Table(items_data, colWidths=[0.5*inch, 3.5*inch, 1*inch, 1.2*inch, 1.3*inch])
+    items_table.setStyle(TableStyle([
+        # Header styling
+        ('BACKGROUND', (0, 0), (-1, 0), colors.black),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('FONT', (0, 0), (-1, 0), 'Helvetica-Bold', 10),
+        ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+
+        # Body styling
+        ('FONT', (0, 1), (-1, -1), 'Helvetica', 9),
+        ('ALIGN', (0, 1), (0, -1), 'CENTER'),
+        ('ALIGN', (1, 1), (1, -1), 'LEFT'),
+        ('ALIGN', (2, 1), (-1, -1), 'RIGHT'),
+        ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
+
+        # Grid - ALL BLACK BORDERS
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('BOX', (0, 0), (-1, -1), 2, colors.black),
+
+        # Padding
+        ('TOPPADDING', (0, 0), (-1, -1), 8),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+        ('LEFTPADDING', (0, 0), (-1, -1), 5),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 5),
+    ]))
+    elements.append(items_table)
+    elements.append(Spacer(1, 0.3*inch))
+
+    # Calculate totals
+    subtotal = sum(item['subtotal'] for item in items)
+
+    # Totals Table
+    totals_data = [
+        ['', '', 'Subtotal:', f"${subtotal:.2f}"],
+        ['', '', 'Discount:', f"-${sale['discount']:.2f}"],
+        ['', '', 'TOTAL:', f"${sale['total_amount']:.2f}"]
+    ]
+
+    totals_table = Table(totals_data, colWidths=[2*inch, 2.5*inch, 1.5*inch, 1.5*inch])
+    totals_table.setStyle(TableStyle([
+        ('FONT', (2, 0), (2, 1), 'Helvetica', 10),
+        ('FONT', (2, 2), (2, 2), 'Helvetica-Bold', 12),
+        ('FONT', (3, 0), (3, 1), 'Helvetica', 10),
+        ('FONT', (3, 2), (3, 2), 'Helvetica-Bold', 12),
+        ('ALIGN', (2, 0), (-1, -1), 'RIGHT'),
+        ('TEXTCOLOR', (2, 0), (-1, -1), colors.black),
+        ('BACKGROUND', (2, 2), (3, 2), colors.white),
+        ('GRID', (2, 0), (3, -1), 1, colors.black),
+        ('BOX', (2, 0), (3, -1), 2, colors.black),
+        ('TOPPADDING', (2, 0), (3, -1), 5),
+        ('BOTTOMPADDING', (2, 0), (3, -1), 5),
+        ('RIGHTPADDING', (2, 0), (3, -1), 10),
+    ]))
+    elements.append(totals_table)
+    elements.append(Spacer(1, 0.5*inch))
+
+    # Footer
+    footer_style = styles['Normal']
+    footer_style.alignment = TA_CENTER
+    footer_style.fontSize = 9
+    footer_style.textColor = colors.black
+
+    elements.append(Paragraph("─" * 80, footer_style))
+    elements.append(Spacer(1, 0.1*inch))
+    elements.append(Paragraph("Thank you for your business!", footer_style))
+    elements.append(Paragraph("This is a computer-generated invoice.", footer_style))
+    elements.append(Spacer(1, 0.1*inch))
+    elements.append(Paragraph("For queries, contact: support@.com | www.temp.com", footer_style))
+
+    # Build PDF
+    doc.build(elements)
+
+    buffer.seek(0)
+    return buffer
@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+"""
+Oil Shop Management System - Background Jobs
+Runs slow work (PDF invoices, backups, archiving, forecasts, stock
+snapshots) on a small worker pool instead of the request threads.
+
+Jobs are rows in the `jobs` table, so they survive a restart and any app
+process can run them: a worker claims the next due job with a conditional
+UPDATE from 'queued' to 'running' that only one process can win. Jobs are
+taken strictly by priority (high, then normal, then low), and
+`reserved_workers` of the pool only ever take high-priority jobs, so a
+backup or a long report never holds up the invoice a customer is waiting
+for.
+
+A failed attempt is retried after an exponential backoff until the job's
+max_attempts; handlers raise JobFailed for errors a retry cannot fix. While
+a job runs the pool's maintenance thread refreshes its heartbeat, and jobs
+whose heartbeat stops (their process died) are queued again. A job's result
+is a small JSON summary plus, optionally, a file in `result_dir`; both are
+deleted with the job after `keep_days`.
+
+The pool uses threads: the handlers spend their time in the database, in
+ReportLab or in NumPy, and share the app's connection pools.
+
+Usage:
+    python jobs.py migrate
+    python jobs.py purge [--keep-days 7]
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from mysql.connector import Error
+
+import backup
+import forecasting
+import invoices
+import sales_archive
+import stock_ledger
+import storage
+from repositories import transaction, JobRepository, SaleRepository
+
+JOBS_CONFIG = {
+    'workers': 2,
+    'reserved_workers': 1,
+    'poll_interval': 2.0,
+    'max_attempts': 3,
+    'retry_base_seconds': 10.0,
+    'retry_max_seconds': 600.0,
+    'heartbeat_seconds': 15.0,
+    'stale_after_seconds': 120.0,
+    'keep_days': 7,
+    'result_dir': 'job_results',
+    'forecast': {},
+}
+
+PRIORITIES = {'high': 1, 'normal': 5, 'low': 9}
+STATUSES = ('queued', 'running', 'done', 'failed')
+
+Handler = namedtuple('Handler', ['func', 'priority', 'roles', 'max_attempts'])
+HANDLERS = {}
+
+_threads = []
+_start_lock = threading.Lock()
+_wakeup = threading.Event()
+_running = {}
+_state_lock = threading.Lock()
+_stats = {'completed': 0, 'failed': 0, 'retried': 0, 'requeued': 0, 'errors': 0}
+
+
+class JobFailed(Exception):
+    """Raised by a handler for a failure that retrying will not fix"""
+
+
+def configure(config):
+    JOBS_CONFIG.update(config)
+
+
+def register(kind, func, priority='normal', roles=None, max_attempts=None):
+    """Make func(ctx) available as job `kind`; `roles` limits who may submit it (None: anyone)"""
+    HANDLERS[kind] = Handler(func, PRIORITIES[priority], roles, max_attempts)
+
+
+def _now():
+    return datetime.now().replace(microsecond=0)
+
+
+@contextmanager
+def connection(replica=False, batch=False):
+    conn = storage.connect_replica() if replica else storage.connect(batch=batch)
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+# ============================================
+# Queue
+# ============================================
+
+def submit(conn, kind, params=None, created_by=None):
+    """Queue a job and wake the local workers; returns the job id"""
+    handler = HANDLERS[kind]
+    with transaction(conn):
+        job_id = JobRepository(conn).create(kind, json.dumps(params or {}), handler.priority,
+                                            handler.max_attempts or JOBS_CONFIG['max_attempts'],
+                                            created_by, _now())
+    _wakeup.set()
+    return job_id
+
+
+def retry_delay(attempts):
+    """Seconds before attempt `attempts + 1`: base, 2 x base, 4 x base... up to the maximum"""
+    return min(JOBS_CONFIG['retry_base_seconds'] * 2 ** (attempts - 1), JOBS_CONFIG['retry_max_seconds'])
+
+
+def result_path(job):
+    return os.path.join(JOBS_CONFIG['result_dir'], job['result_file']) if job['result_file'] else None
+
+
+class JobContext:
+    """What a handler gets: its parameters, database access, progress reporting and a result file"""
+
+    def __init__(self, job):
+        self.job_id = job['id']
+        self.kind = job['kind']
+        self.attempt = job['attempts']
+        self.params = json.loads(job['params'] or '{}')
+        self.result_file = None
+        self.result_name = None
+        self.result_type = None
+        self._last_progress = 0.0
+
+    def connect(self, replica=False):
+        return connection(replica, batch=not replica)
+
+    def progress(self, percent, message=None):
+        """Record progress (0-100); writes at most once a second unless the job is at 100%"""
+        now = time.monotonic()
+        if percent < 100 and now - self._last_progress < 1.0:
+            return
+        self._last_progress = now
+        with self.connect() as conn, transaction(conn):
+            JobRepository(conn).progress(self.job_id, int(percent), (message or '')[:255] or None, _now())
+
+    def save_file(self, data, name, mimetype):
+        """Store the job's downloadable result (bytes or a file-like object)"""
+        os.makedirs(JOBS_CONFIG['result_dir'], exist_ok=True)
+        self.result_file = f"{self.job_id}-{name}"
+        with open(os.path.join(JOBS_CONFIG['result_dir'], self.result_file), 'wb') as f:
+            f.write(data if isinstance(data, bytes) else data.read())
+        self.result_name = name
+        self.result_type = mimetype
+
+
+# ============================================
+# Worker pool
+# ============================================
+
+def start():
+    """Start the pool once per process (without waiting for the database)"""
+    if _threads:
+        return
+    with _start_lock:
+        if _threads:
+            return
+        thread = threading.Thread(target=_maintain, daemon=True, name='job-maintenance')
+        _threads.append(thread)
+        thread.start()
+
+
+def _start_workers():
+    workers = max(JOBS_CONFIG['workers'], 1)
+    reserved = min(JOBS_CONFIG['reserved_workers'], workers - 1)
+    for index in range(workers):
+        max_priority = PRIORITIES['high'] if index < reserved else PRIORITIES['low']
+        thread = threading.Thread(target=_work, args=(max_priority,), daemon=True,
+                                  name=f"job-worker-{index + 1}")
+        _threads.append(thread)
+        thread.start()
+
+
+def _work(max_priority):
+    while True:
+        try:
+            with connection() as conn, transaction(conn):
+                job = JobRepository(conn).claim(max_priority, _now())
+        except Error as e:
+            with _state_lock:
+                _stats['errors'] += 1
+            if not isinstance(e, storage.CircuitOpenError):
+                print(f"Job queue error: {e}")
+            job = None
+        if job is None:
+            _wakeup.wait(JOBS_CONFIG['poll_interval'])
+            _wakeup.clear()
+            continue
+        with _state_lock:
+            _running[job['id']] = job['kind']
+        try:
+            run(job)
+        except Error as e:
+            # The outcome could not be saved; the job is picked up again once its heartbeat expires
+            with _state_lock:
+                _stats['errors'] += 1
+            print(f"Job {job['id']} error: {e}")
+        finally:
+            with _state_lock:
+                _running.pop(job['id'], None)
+
+
+def run(job):
+    """Run a claimed job and record its outcome: done, queued again for a retry, or failed"""
+    handler = HANDLERS.get(job['kind'])
+    ctx = JobContext(job)
+    outcome = 'completed'
+    try:
+        if handler is None:
+            raise JobFailed(f"Unknown job kind '{job['kind']}'")
+        result = handler.func(ctx)
+    except Exception as e:
+        error = str(e) or type(e).__name__
+        permanent = isinstance(e, JobFailed) or job['attempts'] >= job['max_attempts']
+        if not isinstance(e, JobFailed):
+            traceback.print_exc()
+        outcome = 'failed' if permanent else 'retried'
+        with connection() as conn, transaction(conn):
+            if permanent:
+                JobRepository(conn).fail(job['id'], error, _now())
+            else:
+                JobRepository(conn).retry(job['id'], error,
+                                          _now() + timedelta(seconds=retry_delay(job['attempts'])))
+    else:
+        with connection() as conn, transaction(conn):
+            JobRepository(conn).finish(job['id'], json.dumps(result, default=str), ctx.result_file,
+                                       ctx.result_name, ctx.result_type, _now())
+    with _state_lock:
+        _stats[outcome] += 1
+    return outcome
+
+
+def _maintain():
+    """Create the jobs table, start the workers, then send heartbeats for the jobs running
+    here, recover stale jobs and purge old ones daily"""
+    while True:
+        try:
+            with connection() as conn:
+                storage.ensure_tables(conn, 'jobs')
+            break
+        except Error as e:
+            print(f"Job queue unavailable: {e}")
+            time.sleep(JOBS_CONFIG['heartbeat_seconds'])
+    _start_workers()
+    next_purge = 0.0
+    while True:
+        time.sleep(JOBS_CONFIG['heartbeat_seconds'])
+        now = _now()
+        with _state_lock:
+            running = list(_running)
+        try:
+            with connection() as conn, transaction(conn):
+                jobs = JobRepository(conn)
+                if running:
+                    jobs.heartbeat(running, now)
+                requeued, failed = jobs.requeue_stale(
+                    now - timedelta(seconds=JOBS_CONFIG['stale_after_seconds']), now)
+            with _state_lock:
+                _stats['requeued'] += requeued
+                _stats['failed'] += failed
+            if time.monotonic() >= next_purge:
+                purge()
+                next_purge = time.monotonic() + 24 * 3600
+        except Error as e:
+            with _state_lock:
+                _stats['errors'] += 1
+            print(f"Job maintenance error: {e}")
+
+
+def purge(keep_days=None):
+    """Delete jobs finished more than keep_days ago and their result files; returns how many files"""
+    keep_days = JOBS_CONFIG['keep_days'] if keep_days is None else keep_days
+    with connection() as conn, transaction(conn):
+        files = JobRepository(conn).purge(_now() - timedelta(days=keep_days))
+    for name in files:
+        try:
+            os.remove(os.path.join(JOBS_CONFIG['result_dir'], name))
+        except FileNotFoundError:
+            pass
+    return len(files)
+
+
+def get_stats():
+    with _state_lock:
+        return dict(_stats, workers=sum(1 for t in _threads if t.name.startswith('job-worker')),
+                    running=sorted(_running.items()))
+
+
+# ============================================
+# Handlers
+# ============================================
+
+def invoice_job(ctx):
+    try:
+        sale_id = int(ctx.params['sale_id'])
+    except (KeyError, TypeError, ValueError):
+        raise JobFailed('sale_id is required')
+    with ctx.connect() as conn:
+        sales = SaleRepository(conn)
+        sale = sales.get(sale_id)
+        items = sales.items(sale_id) if sale else []
+    if not sale:
+        raise JobFailed('Sale not found')
+    ctx.progress(50, 'Rendering PDF')
+    ctx.save_file(invoices.build_invoice_pdf(sale, items), f'invoice_{sale_id}.pdf', 'application/pdf')
+    return {'sale_id': sale_id, 'items': len(items)}
+
+
+def backup_job(ctx):
+    mysql_config = storage.STORAGE_CONFIG['mysql']
+    argv = ['--backend', storage.backend(), '--sqlite-path', storage.STORAGE_CONFIG['sqlite']['path'],
+            '--db-host', mysql_config.get('host', 'localhost'), '--db-user', mysql_config.get('user', 'root'),
+            '--db-password', mysql_config.get('password', ''), '--db-name', mysql_config.get('database', ''),
+            'backup']
+    if ctx.params.get('incremental'):
+        argv.append('--incremental')
+    args = backup.parse_args(argv)
+    ctx.progress(0, 'Backing up')
+    if backup.run_backup(args) != 0:
+        raise RuntimeError('Backup failed; see the server log')
+    manifest = backup.load_manifests(args.dir)[-1]
+    return {key: manifest.get(key) for key in ('name', 'type', 'bytes', 'elapsed_s')}
+
+
+def archive_job(ctx):
+    with ctx.connect() as conn:
+        return sales_archive.run_archive(conn, dry_run=bool(ctx.params.get('dry_run')))
+
+
+def forecast_job(ctx):
+    with ctx.connect() as conn:
+        return forecasting.run_forecast(conn, JOBS_CONFIG['forecast'])
+
+
+def stock_snapshot_job(ctx):
+    with ctx.connect() as conn:
+        taken_at, products, pruned = stock_ledger.take_snapshot(conn)
+    return {'taken_at': taken_at.isoformat(sep=' '), 'products': products, 'pruned': pruned}
+
+
+register('invoice', invoice_job, priority='high')
+register('backup', backup_job, priority='low', roles=('admin',), max_attempts=2)
+register('archive', archive_job, priority='low', roles=('admin',))
+register('forecast', forecast_job, priority='normal', roles=('admin', 'manager'))
+register('stock_snapshot', stock_snapshot_job, priority='normal', roles=('admin', 'manager'))
+
+
+# ============================================
+# Commands
+# ============================================
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain the background jobs table")
+    storage.add_cli_args(parser)
+    parser.add_argument('--result-dir', default=os.environ.get('JOB_RESULT_DIR', JOBS_CONFIG['result_dir']))
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('migrate', help="Create the jobs table")
+    purge_parser = commands.add_parser('purge', help="Delete finished jobs and their result files")
+    purge_parser.add_argument('--keep-days', type=int,
+                              default=int(os.environ.get('JOB_KEEP_DAYS', JOBS_CONFIG['keep_days'])))
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    JOBS_CONFIG['result_dir'] = args.result_dir
+    conn = storage.connect_from_args(args)
+    if conn is None:
+        return 1
+
+    try:
+        if args.command == 'migrate':
+            storage.ensure_tables(conn, 'jobs')
+            print("✓ jobs table ready")
+        else:
+            removed = purge(args.keep_days)
+            print(f"✓ Finished jobs older than {args.keep_days} days purged ({removed} result files)")
+    except Error as e:
+        print(f"❌ {e}")
+        return 1
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""
+Oil Shop Management System - Password Hashing
+Keeps slow KDF work off the request threads and throttles login attempts.
+
+Password hashes are computed and verified on a small dedicated thread pool
+with a bounded queue; when it is full callers get HashQueueFull immediately
+instead of tying up a worker. Login attempts pass per-username and per-IP
+token buckets before any hashing happens. Hashes produced with an older
+method or cost are reported by needs_rehash so they can be upgraded on the
+next successful login.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+PASSWORD_CONFIG = {
+    'hash_method': 'scrypt',
+    'workers': 2,
+    'queue_limit': 8,
+    'timeout': 10.0,
+    'user_attempts': 5,
+    'user_refill_seconds': 60.0,
+    'ip_attempts': 30,
+    'ip_refill_seconds': 2.0,
+    'max_tracked_keys': 10000,
+}
+
+_executor = None
+_slots = None
+_executor_lock = threading.Lock()
+_target_prefix = None
+
+
+class HashQueueFull(Exception):
+    """Raised when the hashing executor cannot accept more work"""
+
+
+class TokenBucketLimiter:
+    """Keyed token buckets: `capacity` attempts, one token back every `refill_seconds`"""
+
+    def __init__(self, capacity, refill_seconds, max_keys=10000):
+        self.capacity = capacity
+        self.refill_seconds = refill_seconds
+        self.max_keys = max_keys
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def consume(self, key):
+        """Take a token; return 0 when allowed, otherwise seconds until the next token"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - updated) / self.refill_seconds)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now)
+                return (1 - tokens) * self.refill_seconds
+            self._buckets[key] = (tokens - 1, now)
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+            return 0
+
+    def refund(self, key):
+        """Give back a token taken by an attempt that could not be judged"""
+        with self._lock:
+            if key in self._buckets:
+                tokens, updated = self._buckets[key]
+                self._buckets[key] = (min(self.capacity, tokens + 1), updated)
+
+    def reset(self, key):
+        with self._lock:
+            self._buckets.pop(key, None)
+
+    def _prune(self, now):
+        full_after = self.capacity * self.refill_seconds
+        for key in [k for k, (_, updated) in self._buckets.items() if now - updated >= full_after]:
+            del self._buckets[key]
+        if len(self._buckets) > self.max_keys:
+            oldest = sorted(self._buckets.items(), key=lambda item: item[1][1])
+            for key, _ in oldest[:len(self._buckets) - self.max_keys]:
+                del self._buckets[key]
+
+
+user_limiter = TokenBucketLimiter(PASSWORD_CONFIG['user_attempts'], PASSWORD_CONFIG['user_refill_seconds'])
+ip_limiter = TokenBucketLimiter(PASSWORD_CONFIG['ip_attempts'], PASSWORD_CONFIG['ip_refill_seconds'])
+
+
+def configure(config):
+    """Apply settings and rebuild the limiters; the executor starts on first use"""
+    global user_limiter, ip_limiter, _target_prefix
+    PASSWORD_CONFIG.update(config)
+    user_limiter = TokenBucketLimiter(PASSWORD_CONFIG['user_attempts'], PASSWORD_CONFIG['user_refill_seconds'],
+                                      PASSWORD_CONFIG['max_tracked_keys'])
+    ip_limiter = TokenBucketLimiter(PASSWORD_CONFIG['ip_attempts'], PASSWORD_CONFIG['ip_refill_seconds'],
+                                    PASSWORD_CONFIG['max_tracked_keys'])
+    _target_prefix = None
+
+
+def throttle_login(username, ip):
+    """Return 0 if the attempt may proceed, otherwise the seconds to wait"""
+    wait = ip_limiter.consume(ip)
+    if wait:
+        return wait
+    return user_limiter.consume((username or '').lower())
+
+
+def login_succeeded(username):
+    user_limiter.reset((username or '').lower())
+
+
+def login_unchecked(username, ip):
+    """Refund an attempt whose password was never checked (database down, hash pool busy)"""
+    ip_limiter.refund(ip)
+    user_limiter.refund((username or '').lower())
+
+
+def _get_executor():
+    global _executor, _slots
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = PASSWORD_CONFIG['workers']
+                _slots = threading.BoundedSemaphore(workers + PASSWORD_CONFIG['queue_limit'])
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-kdf')
+    return _executor
+
+
+def _run(func, *args):
+    executor = _get_executor()
+    if not _slots.acquire(blocking=False):
+        raise HashQueueFull()
+    try:
+        future = executor.submit(func, *args)
+    except RuntimeError:
+        _slots.release()
+        raise HashQueueFull()
+    future.add_done_callback(lambda _: _slots.release())
+    try:
+        return future.result(timeout=PASSWORD_CONFIG['timeout'])
+    except FutureTimeout:
+        raise HashQueueFull()
+
+
+def hash_password(password):
+    return _run(generate_password_hash, password, PASSWORD_CONFIG['hash_method'])
+
+
+def check_password(pwhash, password):
+    return _run(check_password_hash, pwhash, password)
+
+
+def needs_rehash(pwhash):
+    """True when a stored hash was made with a different method or cost"""
+    global _target_prefix
+    if _target_prefix is None:
+        _target_prefix = hash_password('').split('$', 1)[0]
+    return pwhash.split('$', 1)[0] != _target_prefix
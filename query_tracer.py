@@ -0,0 +1,297 @@
+"""
+Oil Shop Management System - Query Tracer
+Opt-in instrumentation for the data access layer.
+
+Every cursor handed out by a traced connection records the statement
+fingerprint, duration and row count of each execute. Statements slower
+than the configured threshold are logged together with their EXPLAIN
+plan, and a fingerprint executed more than N times within one request
+is reported as a suspected N+1 pattern. Routes can declare a query
+budget; in enforcing (test) mode exceeding it raises QueryBudgetExceeded.
+"""
+
+import logging
+import re
+import threading
+import time
+from collections import Counter
+
+from flask import g, has_request_context, request
+
+logger = logging.getLogger('query_tracer')
+
+TRACE_CONFIG = {
+    'enabled': False,
+    'slow_query_ms': 100.0,
+    'n_plus_one_threshold': 5,
+    'enforce_budgets': False,
+    'max_fingerprints': 500,
+}
+
+_stats_lock = threading.Lock()
+_fingerprint_stats = {}
+
+_COMMENT_RE = re.compile(r'(--[^\n]*|/\*.*?\*/)', re.DOTALL)
+_STRING_RE = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_RE = re.compile(r'%s|%\([^)]+\)s|\?')
+_IN_LIST_RE = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+_VALUES_LIST_RE = re.compile(r'(\(\s*\?(?:\s*,\s*\?)*\s*\))(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))+')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised in enforcing mode when a route runs more queries than its budget"""
+
+
+def fingerprint(sql):
+    """Normalize a SQL statement so that executions differing only in literals match"""
+    if isinstance(sql, (bytes, bytearray)):
+        sql = sql.decode('utf-8', 'replace')
+    sql = _COMMENT_RE.sub(' ', sql)
+    sql = _STRING_RE.sub('?', sql)
+    sql = _PLACEHOLDER_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _WHITESPACE_RE.sub(' ', sql).strip()
+    sql = _IN_LIST_RE.sub('IN (...)', sql)
+    sql = _VALUES_LIST_RE.sub(r'\1, ...', sql)
+    return sql
+
+
+def query_budget(max_queries):
+    """Declare the maximum number of queries a route may run per request"""
+    def decorator(f):
+        f._query_budget = max_queries
+        return f
+    return decorator
+
+
+def _request_trace():
+    if not has_request_context():
+        return None
+    trace = g.get('_query_trace')
+    if trace is None:
+        trace = {'count': 0, 'time_ms': 0.0, 'fingerprints': Counter(), 'budget': None}
+        g._query_trace = trace
+    return trace
+
+
+def _record(fp, duration_ms, rows):
+    with _stats_lock:
+        entry = _fingerprint_stats.get(fp)
+        if entry is None:
+            if len(_fingerprint_stats) >= TRACE_CONFIG['max_fingerprints']:
+                return
+            entry = {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0}
+            _fingerprint_stats[fp] = entry
+        entry['count'] += 1
+        entry['total_ms'] += duration_ms
+        entry['max_ms'] = max(entry['max_ms'], duration_ms)
+        entry['rows'] += max(rows, 0)
+
+
+def get_stats():
+    """Return process-wide per-fingerprint statistics, slowest total first"""
+    with _stats_lock:
+        items = [dict(fingerprint=fp, **entry) for fp, entry in _fingerprint_stats.items()]
+    for item in items:
+        item['avg_ms'] = round(item['total_ms'] / item['count'], 3) if item['count'] else 0.0
+        item['total_ms'] = round(item['total_ms'], 3)
+        item['max_ms'] = round(item['max_ms'], 3)
+    items.sort(key=lambda item: item['total_ms'], reverse=True)
+    return items
+
+
+def reset_stats():
+    with _stats_lock:
+        _fingerprint_stats.clear()
+
+
+class TracedCursor:
+    """Cursor proxy that times execute and fetch calls"""
+
+    def __init__(self, cursor, raw_conn, shared=False):
+        self._cursor = cursor
+        self._raw_conn = raw_conn
+        self._shared = shared
+        self._pending = None
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def _begin(self, operation, params):
+        self._finish()
+        trace = _request_trace()
+        if trace is not None:
+            trace['count'] += 1
+            budget = trace['budget']
+            if budget is not None and trace['count'] > budget:
+                message = (f"{request.method} {request.path} exceeded its query budget "
+                           f"of {budget} (query #{trace['count']})")
+                if TRACE_CONFIG['enforce_budgets']:
+                    raise QueryBudgetExceeded(message)
+                if trace['count'] == budget + 1:
+                    logger.warning(message)
+        self._pending = {
+            'sql': operation,
+            'params': params,
+            'fingerprint': fingerprint(operation),
+            'duration_ms': 0.0,
+            'rows': 0,
+        }
+
+    def _timed(self, func, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            if self._pending is not None:
+                self._pending['duration_ms'] += (time.perf_counter() - start) * 1000
+
+    def _finish(self):
+        pending = self._pending
+        if pending is None:
+            return
+        self._pending = None
+        rowcount = getattr(self._cursor, 'rowcount', -1)
+        rows = max(pending['rows'], rowcount if rowcount is not None else 0)
+        _record(pending['fingerprint'], pending['duration_ms'], rows)
+
+        trace = _request_trace()
+        if trace is not None:
+            trace['time_ms'] += pending['duration_ms']
+            trace['fingerprints'][pending['fingerprint']] += 1
+
+        if pending['duration_ms'] >= TRACE_CONFIG['slow_query_ms']:
+            logger.warning("Slow query (%.1f ms, %d rows): %s%s",
+                           pending['duration_ms'], rows, pending['fingerprint'],
+                           self._explain(pending['sql'], pending['params']))
+
+    def _explain(self, sql, params):
+        if isinstance(sql, (bytes, bytearray)):
+            sql = sql.decode('utf-8', 'replace')
+        if not sql.lstrip().upper().startswith('SELECT'):
+            return ''
+        try:
+            cursor = self._raw_conn.cursor(buffered=True)
+            try:
+                cursor.execute('EXPLAIN ' + sql, params or ())
+                columns = cursor.column_names
+                plan = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            finally:
+                cursor.close()
+        except Exception as e:
+            return f"\n  EXPLAIN failed: {e}"
+        return ''.join(f"\n  {row}" for row in plan)
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        self._begin(operation, params)
+        return self._timed(self._cursor.execute, operation, params, *args, **kwargs)
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        self._begin(operation, None)
+        return self._timed(self._cursor.executemany, operation, seq_params, *args, **kwargs)
+
+    def fetchone(self):
+        row = self._timed(self._cursor.fetchone)
+        if row is not None and self._pending is not None:
+            self._pending['rows'] += 1
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = self._timed(self._cursor.fetchmany, *args, **kwargs)
+        if self._pending is not None:
+            self._pending['rows'] += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(self._cursor.fetchall)
+        if self._pending is not None:
+            self._pending['rows'] += len(rows)
+        return rows
+
+    def close(self):
+        self._finish()
+        if self._shared:
+            return None
+        return self._cursor.close()
+
+
+class TracedConnection:
+    """Connection proxy whose cursors are TracedCursor instances"""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    @property
+    def wrapped(self):
+        return self._conn
+
+    def cursor(self, *args, **kwargs):
+        return TracedCursor(self._conn.cursor(*args, **kwargs), self._conn)
+
+
+def wrap_connection(conn):
+    """Wrap a connection for tracing when tracing is enabled"""
+    if conn is None or not TRACE_CONFIG['enabled']:
+        return conn
+    return TracedConnection(conn)
+
+
+def untraced(conn):
+    """Return the connection behind a TracedConnection"""
+    return conn._conn if isinstance(conn, TracedConnection) else conn
+
+
+def wrap_cursor(conn, cursor):
+    """Trace a long-lived cursor (e.g. a cached prepared cursor) without owning it"""
+    if isinstance(conn, TracedConnection):
+        return TracedCursor(cursor, conn._conn, shared=True)
+    return cursor
+
+
+def finish(cursor):
+    """Record the pending statement of a shared traced cursor"""
+    if isinstance(cursor, TracedCursor):
+        cursor.close()
+
+
+def init_app(app, config=None):
+    """Install per-request hooks for N+1 detection and query budgets"""
+    if config:
+        TRACE_CONFIG.update(config)
+    if not TRACE_CONFIG['enabled']:
+        return
+
+    @app.before_request
+    def _start_query_trace():
+        trace = _request_trace()
+        view = app.view_functions.get(request.endpoint)
+        trace['budget'] = getattr(view, '_query_budget', None)
+
+    @app.after_request
+    def _finish_query_trace(response):
+        trace = g.get('_query_trace')
+        if trace is None:
+            return response
+        threshold = TRACE_CONFIG['n_plus_one_threshold']
+        for fp, count in trace['fingerprints'].items():
+            if count > threshold:
+                logger.warning("Possible N+1 on %s %s: executed %d times: %s",
+                               request.method, request.path, count, fp)
+        response.headers['X-Query-Count'] = str(trace['count'])
+        response.headers['X-Query-Time-Ms'] = f"{trace['time_ms']:.2f}"
+        return response
@@ -0,0 +1,125 @@
+"""
+Oil Shop Management System - Receipt Renderer
+Fixed-width text and ESC/POS receipts for the counter's thermal printers.
+
+Everything that does not depend on the sale (shop header, rules, footer,
+printer commands and the per-width line formats) is built once per
+width/format and cached, so rendering a receipt is a handful of string
+formats and one join.
+"""
+
+from datetime import datetime
+from functools import lru_cache
+
+RECEIPT_CONFIG = {
+    'shop_name': 'OIL SHOP',
+    'header_lines': ['123 Business Street', 'City, State 12345', 'Phone: (123) 456-7890'],
+    'footer_lines': ['Thank you for your business!'],
+    'width': 42,
+    'min_width': 24,
+    'max_width': 64,
+    'encoding': 'cp437',
+}
+
+FORMATS = ('text', 'escpos')
+
+# ESC/POS commands (7-bit, so they survive encoding to the printer code page)
+ESC_INIT = '\x1b@'
+ESC_ALIGN_LEFT = '\x1ba\x00'
+ESC_ALIGN_CENTER = '\x1ba\x01'
+ESC_BOLD_ON = '\x1bE\x01'
+ESC_BOLD_OFF = '\x1bE\x00'
+ESC_DOUBLE_ON = '\x1d!\x11'
+ESC_DOUBLE_OFF = '\x1d!\x00'
+ESC_FEED_AND_CUT = '\x1bd\x03\x1dVB\x00'
+
+
+def configure(config):
+    RECEIPT_CONFIG.update(config)
+    get_template.cache_clear()
+
+
+class ReceiptTemplate:
+    """Precompiled layout for one paper width and output format"""
+
+    __slots__ = ('width', 'escpos', 'header', 'footer', 'rule', 'item_fmt', 'unit_fmt',
+                 'total_fmt', 'pair_fmt', 'grand_total_prefix', 'grand_total_suffix')
+
+    def __init__(self, width, escpos):
+        self.width = width
+        self.escpos = escpos
+        name_width = width - 14
+        self.rule = '-' * width
+        self.item_fmt = f"{{:>3}} {{:<{name_width}.{name_width}}} {{:>9.2f}}"
+        self.unit_fmt = "    @ {:.2f}"
+        self.total_fmt = f"{{:<{width - 12}}}{{:>12}}"
+        self.pair_fmt = f"{{:<{width // 2}.{width // 2}}}{{:>{width - width // 2}.{width - width // 2}}}"
+
+        shop_lines = [line[:width].center(width).rstrip() for line in RECEIPT_CONFIG['header_lines']]
+        footer = [line[:width].center(width).rstrip() for line in RECEIPT_CONFIG['footer_lines']]
+        name = RECEIPT_CONFIG['shop_name']
+        if escpos:
+            # The printer centers and doubles the shop name itself
+            self.header = (ESC_INIT + ESC_ALIGN_CENTER + ESC_DOUBLE_ON + name[:width // 2] + '\n'
+                           + ESC_DOUBLE_OFF + '\n'.join(line.strip() for line in shop_lines) + '\n'
+                           + ESC_ALIGN_LEFT + self.rule)
+            self.footer = (self.rule + '\n' + ESC_ALIGN_CENTER
+                           + '\n'.join(line.strip() for line in footer) + '\n' + ESC_FEED_AND_CUT)
+            self.grand_total_prefix = ESC_BOLD_ON
+            self.grand_total_suffix = ESC_BOLD_OFF
+        else:
+            self.header = '\n'.join([name[:width].center(width).rstrip()] + shop_lines + [self.rule])
+            self.footer = '\n'.join([self.rule] + footer) + '\n'
+            self.grand_total_prefix = ''
+            self.grand_total_suffix = ''
+
+    def render(self, sale, items):
+        created_at = sale['created_at']
+        if isinstance(created_at, datetime):
+            created_at = created_at.strftime('%Y-%m-%d %H:%M')
+        lines = [
+            self.header,
+            self.pair_fmt.format(f"INV-{sale['id']:05d}", str(created_at)),
+            self.pair_fmt.format(f"Cashier: {sale.get('employee_name') or '-'}",
+                                 f"Payment: {(sale.get('payment_method') or '').upper()}"),
+        ]
+        if sale.get('customer_phone'):
+            lines.append(f"Customer: {sale['customer_phone']}"[:self.width])
+        lines.append(self.rule)
+
+        subtotal = 0
+        for item in items:
+            lines.append(self.item_fmt.format(item['quantity'], item['product_name'], item['subtotal']))
+            if item['quantity'] != 1:
+                lines.append(self.unit_fmt.format(item['price']))
+            subtotal += item['subtotal']
+
+        lines.append(self.rule)
+        lines.append(self.total_fmt.format('Subtotal', f"{subtotal:.2f}"))
+        if sale.get('discount'):
+            lines.append(self.total_fmt.format('Discount', f"-{sale['discount']:.2f}"))
+        lines.append(self.grand_total_prefix
+                     + self.total_fmt.format('TOTAL', f"${sale['total_amount']:.2f}")
+                     + self.grand_total_suffix)
+        lines.append(self.footer)
+        return '\n'.join(lines)
+
+
+@lru_cache(maxsize=32)
+def get_template(width, escpos):
+    return ReceiptTemplate(width, escpos)
+
+
+def clamp_width(width):
+    if width is None:
+        return RECEIPT_CONFIG['width']
+    return max(RECEIPT_CONFIG['min_width'], min(RECEIPT_CONFIG['max_width'], width))
+
+
+def render_text(sale, items, width=None):
+    return get_template(clamp_width(width), False).render(sale, items)
+
+
+def render_escpos(sale, items, width=None):
+    text = get_template(clamp_width(width), True).render(sale, items)
+    return text.encode(RECEIPT_CONFIG['encoding'], errors='replace')
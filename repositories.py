@@ -0,0 +1,750 @@
+"""
+Oil Shop Management System - Data Access Layer
+Repositories for products, stock, sales, suppliers and employees.
+
+Hot statements (barcode lookup, user load, sale insert, stock decrement) run
+on server-side prepared cursors that are cached per pooled connection, so the
+server parses them once per connection instead of once per request. Their
+rows come back as tuples and are wrapped in lightweight named tuples. The
+remaining statements use ordinary dictionary cursors.
+"""
+
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+from mysql.connector import IntegrityError
+
+import cache_bus
+import customers
+import query_tracer
+import sales_archive
+import storage
+
+_row_types = {}
+
+
+def row_type(columns):
+    """Return a cached namedtuple class for a column list"""
+    columns = tuple(columns)
+    cls = _row_types.get(columns)
+    if cls is None:
+        cls = namedtuple('Row', columns)
+        _row_types[columns] = cls
+    return cls
+
+
+def in_list(values):
+    """Placeholders for an IN (...) list of len(values) parameters"""
+    return ', '.join(['%s'] * len(values))
+
+
+@contextmanager
+def transaction(conn):
+    """Commit on success, roll back on any exception"""
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+class Repository:
+    """Base class holding a connection and its prepared statement cache"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def _prepared(self, sql):
+        # The driver only re-prepares when handed a different string object,
+        # so statements are module constants and the cursor stays open for the
+        # lifetime of the underlying (pooled) connection.
+        cache = storage.statement_cache(self.conn)
+        cursor = cache.get(sql)
+        if cursor is None:
+            cursor = query_tracer.untraced(self.conn).cursor(prepared=True)
+            cache[sql] = cursor
+        return query_tracer.wrap_cursor(self.conn, cursor)
+
+    def _fetch_one(self, sql, params):
+        cursor = self._prepared(sql)
+        try:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+            if not rows:
+                return None
+            return row_type(cursor.column_names)(*rows[0])
+        finally:
+            query_tracer.finish(cursor)
+
+    def _execute(self, sql, params):
+        cursor = self._prepared(sql)
+        try:
+            cursor.execute(sql, params)
+            return cursor.lastrowid
+        finally:
+            query_tracer.finish(cursor)
+
+    def _query(self, sql, params=None, one=False):
+        cursor = self.conn.cursor(dictionary=True)
+        try:
+            cursor.execute(sql, params or ())
+            return cursor.fetchone() if one else cursor.fetchall()
+        finally:
+            cursor.close()
+
+    def _write(self, sql, params=None):
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(sql, params or ())
+            return cursor.lastrowid
+        finally:
+            cursor.close()
+
+
+# ============================================
+# Products
+# ============================================
+
+PRODUCT_BY_BARCODE_SQL = """
+    SELECT p.*, s.name as supplier_name
+    FROM products p
+    LEFT JOIN suppliers s ON p.supplier_id = s.id
+    WHERE p.barcode = %s
+"""
+
+DECREMENT_STOCK_SQL = "UPDATE products SET quantity = quantity - %s WHERE id = %s"
+
+
+STOCK_FOR_UPDATE_SQL = "SELECT quantity FROM products WHERE id = %s FOR UPDATE"
+
+
+class ProductRepository(Repository):
+
+    def list_all(self):
+        return self._query("""
+            SELECT p.*, s.name as supplier_name
+            FROM products p
+            LEFT JOIN suppliers s ON p.supplier_id = s.id
+            ORDER BY p.name
+        """)
+
+    def get_by_barcode(self, barcode):
+        return self._fetch_one(PRODUCT_BY_BARCODE_SQL, (barcode,))
+
+    def list_low_stock(self):
+        return self._query("""
+            SELECT * FROM products
+            WHERE quantity <= min_stock_level
+            ORDER BY quantity ASC
+        """)
+
+    def count(self):
+        return self._query("SELECT COUNT(*) as total_products FROM products", one=True)['total_products']
+
+    def count_low_stock(self):
+        return self._query("""
+            SELECT COUNT(*) as low_stock_count
+            FROM products
+            WHERE quantity <= min_stock_level
+        """, one=True)['low_stock_count']
+
+    def create(self, data, employee_id=None):
+        product_id = self._write("""
+            INSERT INTO products (name, barcode, category, price, cost_price, quantity,
+                                min_stock_level, supplier_id, description)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, (data['name'], data['barcode'], data['category'], data['price'],
+              data.get('cost_price', 0), data['quantity'], data.get('min_stock_level', 10),
+              data.get('supplier_id'), data.get('description', '')))
+        if int(data['quantity']):
+            StockRepository(self.conn).record([
+                (product_id, int(data['quantity']), 'initial', None, employee_id, None)])
+        cache_bus.bump(self.conn, 'products')
+        return product_id
+
+    def update(self, product_id, data, employee_id=None):
+        """Overwrite a product; a changed quantity is recorded as an 'edit' movement"""
+        current = self._query(STOCK_FOR_UPDATE_SQL, (product_id,), one=True)
+        self._write("""
+            UPDATE products
+            SET name=%s, barcode=%s, category=%s, price=%s, cost_price=%s,
+                quantity=%s, min_stock_level=%s, supplier_id=%s, description=%s
+            WHERE id=%s
+        """, (data['name'], data['barcode'], data['category'], data['price'],
+              data.get('cost_price', 0), data['quantity'], data.get('min_stock_level', 10),
+              data.get('supplier_id'), data.get('description', ''), product_id))
+        if current is not None and int(data['quantity']) != current['quantity']:
+            StockRepository(self.conn).record([
+                (product_id, int(data['quantity']) - current['quantity'], 'edit', None, employee_id, None)])
+        cache_bus.bump(self.conn, 'products')
+
+    def adjust_stock(self, product_id, change, employee_id=None, note=None):
+        """Add `change` (may be negative) to the stock; returns the new quantity or None"""
+        current = self._query(STOCK_FOR_UPDATE_SQL, (product_id,), one=True)
+        if current is None:
+            return None
+        self._write("UPDATE products SET quantity = quantity + %s WHERE id = %s", (change, product_id))
+        StockRepository(self.conn).record([(product_id, change, 'adjustment', None, employee_id, note)])
+        cache_bus.bump(self.conn, 'products')
+        return current['quantity'] + change
+
+    def delete(self, product_id):
+        # Sale lines keep their own copy of the name, barcode and cost. The
+        # foreign key sets product_id to NULL, but partitioned and archived
+        # sale_items have no foreign key, so clear the references here too.
+        for table in ('sale_items', 'sale_items_archive'):
+            self._write(f"UPDATE {table} SET product_id = NULL WHERE product_id = %s", (product_id,))
+        self._write("DELETE FROM products WHERE id=%s", (product_id,))
+        cache_bus.bump(self.conn, 'products')
+
+    def sale_snapshots(self, product_ids):
+        """{product_id: row} with the fields copied onto sale lines, in one query"""
+        ids = list(set(product_ids))
+        if not ids:
+            return {}
+        rows = self._query(f"SELECT id, name, barcode, cost_price FROM products WHERE id IN ({in_list(ids)})",
+                           ids)
+        return {row['id']: row for row in rows}
+
+    def decrement_stock(self, product_id, quantity):
+        """Caller records the movements and bumps the cache version once for the whole batch"""
+        self._execute(DECREMENT_STOCK_SQL, (quantity, product_id))
+
+
+# ============================================
+# Stock ledger
+# ============================================
+
+MOVEMENT_COLUMNS = "(product_id, change_qty, reason, reference_id, employee_id, note)"
+
+LATEST_SNAPSHOT_SQL = """
+    SELECT taken_at, last_movement_id FROM stock_snapshots
+    WHERE taken_at <= %s
+    ORDER BY taken_at DESC
+    LIMIT 1
+"""
+
+# Snapshot quantity plus the movements recorded after it, up to the moment asked for
+STOCK_FROM_SNAPSHOT_SQL = """
+    SELECT p.id AS product_id, p.name, p.barcode,
+           COALESCE(ss.quantity, 0) + COALESCE(d.delta, 0) AS quantity
+    FROM products p
+    LEFT JOIN stock_snapshots ss ON ss.product_id = p.id AND ss.taken_at = %s
+    LEFT JOIN (
+        SELECT product_id, SUM(change_qty) AS delta
+        FROM stock_movements
+        WHERE id > %s AND created_at <= %s
+        GROUP BY product_id
+    ) d ON d.product_id = p.id
+    WHERE p.created_at <= %s {product_filter}
+    ORDER BY p.name
+"""
+
+# No snapshot that early: walk back from the current stock instead
+STOCK_FROM_CURRENT_SQL = """
+    SELECT p.id AS product_id, p.name, p.barcode,
+           p.quantity - COALESCE(d.delta, 0) AS quantity
+    FROM products p
+    LEFT JOIN (
+        SELECT product_id, SUM(change_qty) AS delta
+        FROM stock_movements
+        WHERE created_at > %s
+        GROUP BY product_id
+    ) d ON d.product_id = p.id
+    WHERE p.created_at <= %s {product_filter}
+    ORDER BY p.name
+"""
+
+
+class StockRepository(Repository):
+    """Append-only stock movements and the snapshots that bound their replay"""
+
+    def record(self, movements):
+        """Insert (product_id, change_qty, reason, reference_id, employee_id, note) rows in one statement"""
+        if not movements:
+            return
+        values = ', '.join(['(%s, %s, %s, %s, %s, %s)'] * len(movements))
+        params = [value for movement in movements for value in movement]
+        self._write(f"INSERT INTO stock_movements {MOVEMENT_COLUMNS} VALUES {values}", params)
+
+    def stock_at(self, at, product_id=None):
+        """Stock of every product (or one) at datetime `at`"""
+        product_filter = "AND p.id = %s" if product_id is not None else ""
+        extra = [product_id] if product_id is not None else []
+        snapshot = self._query(LATEST_SNAPSHOT_SQL, (at,), one=True)
+        if snapshot is None:
+            return self._query(STOCK_FROM_CURRENT_SQL.format(product_filter=product_filter),
+                               [at, at] + extra)
+        return self._query(STOCK_FROM_SNAPSHOT_SQL.format(product_filter=product_filter),
+                           [snapshot['taken_at'], snapshot['last_movement_id'], at, at] + extra)
+
+    def movements(self, start=None, end=None, product_id=None, limit=500):
+        """Movements between two datetimes (end exclusive), newest first"""
+        conditions = []
+        params = []
+        if start is not None:
+            conditions.append("m.created_at >= %s")
+            params.append(start)
+        if end is not None:
+            conditions.append("m.created_at < %s")
+            params.append(end)
+        if product_id is not None:
+            conditions.append("m.product_id = %s")
+            params.append(product_id)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return self._query(f"""
+            SELECT m.*, p.name AS product_name, e.username AS employee_name
+            FROM stock_movements m
+            LEFT JOIN products p ON m.product_id = p.id
+            LEFT JOIN employees e ON m.employee_id = e.id
+            {where}
+            ORDER BY m.id DESC
+            LIMIT %s
+        """, params + [limit])
+
+    def take_snapshot(self, taken_at):
+        """Record every product's stock; caller commits. Returns the number of products"""
+        # Locking the product rows waits for in-flight sales and keeps new ones
+        # out until commit, so the quantities match the last movement id read
+        # below exactly.
+        self._query("SELECT id FROM products FOR UPDATE")
+        last = self._query("SELECT COALESCE(MAX(id), 0) AS last_id FROM stock_movements", one=True)
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute("""
+                INSERT INTO stock_snapshots (taken_at, product_id, quantity, last_movement_id)
+                SELECT %s, id, quantity, %s FROM products
+            """, (taken_at, last['last_id']))
+            return cursor.rowcount
+        finally:
+            cursor.close()
+
+    def prune_snapshots(self, before):
+        """Delete snapshots older than `before`, keeping the newest of them as a replay base"""
+        keep = self._query(LATEST_SNAPSHOT_SQL, (before,), one=True)
+        if keep is None:
+            return 0
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute("DELETE FROM stock_snapshots WHERE taken_at < %s", (keep['taken_at'],))
+            return cursor.rowcount
+        finally:
+            cursor.close()
+
+
+# ============================================
+# Sales
+# ============================================
+
+INSERT_SALE_SQL = """
+    INSERT INTO sales (customer_name, customer_phone, total_amount,
+                       discount, payment_method, employee_id)
+    VALUES (%s, %s, %s, %s, %s, %s)
+"""
+
+INSERT_SALE_ITEM_SQL = """
+    INSERT INTO sale_items (sale_id, product_id, product_name, barcode, quantity,
+                            price, cost_price, subtotal)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+
+SALES_LIST_SQL = """
+    SELECT s.*, e.username as employee_name,
+           COUNT(si.id) as items_count
+    FROM {sales} s
+    LEFT JOIN employees e ON s.employee_id = e.id
+    LEFT JOIN {sale_items} si ON s.id = si.sale_id
+    {where}
+    GROUP BY s.id, s.created_at
+"""
+
+SALE_SQL = """
+    SELECT s.*, e.username as employee_name
+    FROM {sales} s
+    LEFT JOIN employees e ON s.employee_id = e.id
+    WHERE s.id = %s
+"""
+
+# Sale lines carry the product name, barcode and cost as sold: no join needed
+SALE_ITEMS_SQL = """
+    SELECT * FROM {sale_items}
+    WHERE sale_id = %s
+    ORDER BY id
+"""
+
+SALE_ITEMS_IN_SQL = """
+    SELECT * FROM {sale_items}
+    WHERE sale_id IN ({ids})
+    ORDER BY sale_id, id
+"""
+
+HOT_TABLES = {'sales': 'sales', 'sale_items': 'sale_items'}
+
+
+class SaleRepository(Repository):
+    """Sales in the hot tables, falling back to the archive for older periods"""
+
+    def create(self, data, employee_id):
+        """Insert a sale with its items, decrement stock and record the movements; caller commits"""
+        phone = customers.normalize_phone(data.get('customer_phone'))
+        sale_id = self._execute(INSERT_SALE_SQL, (
+            data.get('customer_name', 'Walk-in'), phone,
+            data['total_amount'], data.get('discount', 0),
+            data.get('payment_method', 'cash'), employee_id))
+
+        products = ProductRepository(self.conn)
+        snapshots = products.sale_snapshots(item['product_id'] for item in data['items'])
+        movements = []
+        for item in data['items']:
+            product = snapshots.get(item['product_id'])
+            if product is None:
+                raise IntegrityError(msg=f"Product {item['product_id']} does not exist")
+            self._execute(INSERT_SALE_ITEM_SQL, (sale_id, item['product_id'], product['name'],
+                                                 product['barcode'], item['quantity'], item['price'],
+                                                 product['cost_price'], item['subtotal']))
+            products.decrement_stock(item['product_id'], item['quantity'])
+            movements.append((item['product_id'], -item['quantity'], 'sale', sale_id, employee_id, None))
+        StockRepository(self.conn).record(movements)
+
+        if phone:
+            grades = [customers.oil_grade(snapshots[item['product_id']]['name']) for item in data['items']]
+            CustomerRepository(self.conn).record_sale(
+                phone, data.get('customer_name', 'Walk-in'), data['total_amount'],
+                next((grade for grade in grades if grade), None))
+        cache_bus.bump(self.conn, 'sales', 'products')
+        return sale_id
+
+    def list(self, start_date=None, end_date=None, limit=None, offset=0):
+        """Sales between two ISO dates (inclusive), newest first; raises ValueError on bad dates"""
+        where = ''
+        params = []
+        start = None
+        if start_date and end_date:
+            # A plain range on created_at lets MySQL prune partitions
+            start = date.fromisoformat(start_date)
+            end = date.fromisoformat(end_date) + timedelta(days=1)
+            where = "WHERE s.created_at >= %s AND s.created_at < %s"
+            params = [start.isoformat(), end.isoformat()]
+
+        query = SALES_LIST_SQL.format(where=where, **HOT_TABLES)
+        if start is None or start < sales_archive.archive_cutoff():
+            archived = SALES_LIST_SQL.format(where=where, **sales_archive.ARCHIVE_TABLES)
+            query = f"SELECT * FROM ({query} UNION ALL {archived}) all_sales"
+            params = params * 2
+        query += " ORDER BY created_at DESC, id DESC"
+        if limit is not None:
+            query += " LIMIT %s OFFSET %s"
+            params = params + [limit, offset]
+        return self._query(query, params)
+
+    def get(self, sale_id):
+        sale = self._query(SALE_SQL.format(**HOT_TABLES), (sale_id,), one=True)
+        if sale is None:
+            sale = self._query(SALE_SQL.format(**sales_archive.ARCHIVE_TABLES), (sale_id,), one=True)
+        return sale
+
+    def items(self, sale_id):
+        items = self._query(SALE_ITEMS_SQL.format(**HOT_TABLES), (sale_id,))
+        if not items:
+            items = self._query(SALE_ITEMS_SQL.format(**sales_archive.ARCHIVE_TABLES), (sale_id,))
+        return items
+
+    def items_for(self, sale_ids):
+        """{sale_id: [items]} for many sales in one query (plus one for archived sales)"""
+        ids = list(dict.fromkeys(sale_ids))
+        if not ids:
+            return {}
+        grouped = {}
+        for item in self._query(SALE_ITEMS_IN_SQL.format(ids=in_list(ids), **HOT_TABLES), ids):
+            grouped.setdefault(item['sale_id'], []).append(item)
+        missing = [sale_id for sale_id in ids if sale_id not in grouped]
+        if missing:
+            query = SALE_ITEMS_IN_SQL.format(ids=in_list(missing), **sales_archive.ARCHIVE_TABLES)
+            for item in self._query(query, missing):
+                grouped.setdefault(item['sale_id'], []).append(item)
+        return grouped
+
+    def total_today(self):
+        return self._query("""
+            SELECT COALESCE(SUM(total_amount), 0) as today_sales
+            FROM sales
+            WHERE created_at >= CURDATE()
+        """, one=True)['today_sales']
+
+    def total_this_month(self):
+        return self._query("""
+            SELECT COALESCE(SUM(total_amount), 0) as monthly_sales
+            FROM sales
+            WHERE created_at >= %s
+        """, (date.today().replace(day=1).isoformat(),), one=True)['monthly_sales']
+
+
+# ============================================
+# Customers
+# ============================================
+
+CUSTOMER_HISTORY_SQL = """
+    SELECT s.*, e.username as employee_name
+    FROM {sales} s
+    LEFT JOIN employees e ON s.employee_id = e.id
+    WHERE s.customer_phone = %s
+"""
+
+
+class CustomerRepository(Repository):
+    """Purchase history by phone number and the lifetime aggregates kept in customer_stats"""
+
+    def record_sale(self, phone, name, amount, oil_grade, at=None):
+        """Add one visit to the customer's aggregates; caller commits"""
+        at = at or datetime.now().replace(microsecond=0)
+        update = ("UPDATE customer_stats SET visits = visits + 1, total_spent = total_spent + %s, "
+                  "customer_name = %s, last_visit = %s, last_oil_grade = COALESCE(%s, last_oil_grade) "
+                  "WHERE customer_phone = %s")
+        params = (amount, name, at, oil_grade, phone)
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(update, params)
+            if cursor.rowcount == 0:
+                cursor.execute("INSERT IGNORE INTO customer_stats (customer_phone, customer_name, visits, "
+                               "total_spent, first_visit, last_visit, last_oil_grade) "
+                               "VALUES (%s, %s, 1, %s, %s, %s, %s)",
+                               (phone, name, amount, at, at, oil_grade))
+                if cursor.rowcount == 0:
+                    # Another sale for the same new customer inserted the row first
+                    cursor.execute(update, params)
+        finally:
+            cursor.close()
+
+    def stats(self, phone):
+        return self._query("SELECT * FROM customer_stats WHERE customer_phone = %s", (phone,), one=True)
+
+    def history(self, phone, limit, offset=0):
+        """One page of the customer's sales, newest first, hot and archived"""
+        query = (CUSTOMER_HISTORY_SQL.format(**HOT_TABLES) + " UNION ALL "
+                 + CUSTOMER_HISTORY_SQL.format(**sales_archive.ARCHIVE_TABLES))
+        return self._query(f"SELECT * FROM ({query}) history ORDER BY created_at DESC, id DESC "
+                           f"LIMIT %s OFFSET %s", (phone, phone, limit, offset))
+
+
+# ============================================
+# Reorder suggestions
+# ============================================
+
+class ReorderRepository(Repository):
+    """Nightly forecasts and reorder suggestions written by forecasting.py"""
+
+    def to_reorder(self):
+        return self._query("""
+            SELECT r.*, p.name AS product_name, p.barcode, p.min_stock_level,
+                   p.cost_price + 0E0 AS cost_price, s.name AS supplier_name
+            FROM reorder_suggestions r
+            JOIN products p ON r.product_id = p.id
+            LEFT JOIN suppliers s ON r.supplier_id = s.id
+            WHERE r.needs_reorder = 1
+            ORDER BY s.name, p.name
+        """)
+
+    def drafts(self):
+        """Products to reorder grouped into one draft purchase order per supplier"""
+        drafts = {}
+        for row in self.to_reorder():
+            draft = drafts.get(row['supplier_id'])
+            if draft is None:
+                draft = drafts[row['supplier_id']] = {
+                    'supplier_id': row['supplier_id'],
+                    'supplier_name': row['supplier_name'] or 'No supplier',
+                    'computed_at': row['computed_at'],
+                    'total_cost': 0,
+                    'items': [],
+                }
+            draft['items'].append({key: row[key] for key in (
+                'product_id', 'product_name', 'barcode', 'current_stock', 'reorder_point',
+                'suggested_qty', 'cost_price', 'estimated_cost', 'daily_forecast', 'days_of_cover')})
+            draft['total_cost'] += row['estimated_cost']
+        return list(drafts.values())
+
+
+# ============================================
+# Suppliers
+# ============================================
+
+class SupplierRepository(Repository):
+
+    def list_all(self):
+        return self._query("SELECT * FROM suppliers ORDER BY name")
+
+    def create(self, data):
+        supplier_id = self._write("""
+            INSERT INTO suppliers (name, contact_person, phone, email, address)
+            VALUES (%s, %s, %s, %s, %s)
+        """, (data['name'], data.get('contact_person', ''),
+              data.get('phone', ''), data.get('email', ''), data.get('address', '')))
+        cache_bus.bump(self.conn, 'suppliers')
+        return supplier_id
+
+    def update(self, supplier_id, data):
+        self._write("""
+            UPDATE suppliers
+            SET name=%s, contact_person=%s, phone=%s, email=%s, address=%s
+            WHERE id=%s
+        """, (data['name'], data.get('contact_person', ''),
+              data.get('phone', ''), data.get('email', ''),
+              data.get('address', ''), supplier_id))
+        cache_bus.bump(self.conn, 'suppliers')
+
+    def delete(self, supplier_id):
+        self._write("DELETE FROM suppliers WHERE id=%s", (supplier_id,))
+        # Products show the supplier name and lose the reference (ON DELETE SET NULL)
+        cache_bus.bump(self.conn, 'suppliers', 'products')
+
+
+# ============================================
+# Employees
+# ============================================
+
+EMPLOYEE_BY_ID_SQL = "SELECT id, username, role FROM employees WHERE id = %s"
+EMPLOYEE_BY_USERNAME_SQL = "SELECT id, username, password, role FROM employees WHERE username = %s"
+
+
+class EmployeeRepository(Repository):
+
+    def get(self, user_id):
+        return self._fetch_one(EMPLOYEE_BY_ID_SQL, (user_id,))
+
+    def get_by_username(self, username):
+        return self._fetch_one(EMPLOYEE_BY_USERNAME_SQL, (username,))
+
+    def list_all(self):
+        return self._query("SELECT id, username, role, created_at FROM employees ORDER BY username")
+
+    def create(self, username, password_hash, role):
+        user_id = self._write("""
+            INSERT INTO employees (username, password, role)
+            VALUES (%s, %s, %s)
+        """, (username, password_hash, role))
+        cache_bus.bump(self.conn, 'users')
+        return user_id
+
+    def update_password(self, user_id, password_hash):
+        self._write("UPDATE employees SET password=%s WHERE id=%s", (password_hash, user_id))
+
+    def delete(self, user_id):
+        self._write("DELETE FROM employees WHERE id=%s", (user_id,))
+        cache_bus.bump(self.conn, 'users')
+
+
+# ============================================
+# Background jobs
+# ============================================
+
+INSERT_JOB_SQL = """
+    INSERT INTO jobs (kind, params, priority, status, max_attempts, run_after, created_by, created_at)
+    VALUES (%s, %s, %s, 'queued', %s, %s, %s, %s)
+"""
+
+NEXT_JOBS_SQL = """
+    SELECT id FROM jobs
+    WHERE status = 'queued' AND run_after <= %s AND priority <= %s
+    ORDER BY priority, id
+    LIMIT 5
+"""
+
+# Only one worker (in any process) can move a given job out of 'queued'
+CLAIM_JOB_SQL = """
+    UPDATE jobs SET status = 'running', attempts = attempts + 1, progress = 0, message = NULL,
+                    started_at = %s, heartbeat_at = %s
+    WHERE id = %s AND status = 'queued'
+"""
+
+JOB_COLUMNS = """
+    id, kind, priority, status, progress, message, attempts, max_attempts, run_after,
+    result_name, result_type, error, created_by, created_at, started_at, finished_at
+"""
+
+
+class JobRepository(Repository):
+    """The jobs table behind the background worker pool (see jobs.py)"""
+
+    def _changed(self, sql, params):
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(sql, params)
+            return cursor.rowcount
+        finally:
+            cursor.close()
+
+    def create(self, kind, params, priority, max_attempts, created_by, now):
+        return self._write(INSERT_JOB_SQL, (kind, params, priority, max_attempts, now, created_by, now))
+
+    def get(self, job_id):
+        return self._query("SELECT * FROM jobs WHERE id = %s", (job_id,), one=True)
+
+    def list_recent(self, status=None, created_by=None, limit=50):
+        conditions, params = [], []
+        if status:
+            conditions.append("status = %s")
+            params.append(status)
+        if created_by is not None:
+            conditions.append("created_by = %s")
+            params.append(created_by)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return self._query(f"SELECT {JOB_COLUMNS} FROM jobs {where} ORDER BY id DESC LIMIT %s",
+                           params + [limit])
+
+    def counts(self):
+        rows = self._query("SELECT status, COUNT(*) AS jobs FROM jobs GROUP BY status")
+        return {row['status']: row['jobs'] for row in rows}
+
+    def claim(self, max_priority, now):
+        """Mark the next runnable job as running and return it; None when nothing is due"""
+        for row in self._query(NEXT_JOBS_SQL, (now, max_priority)):
+            if self._changed(CLAIM_JOB_SQL, (now, now, row['id'])):
+                return self.get(row['id'])
+        return None
+
+    def progress(self, job_id, percent, message, now):
+        self._write("UPDATE jobs SET progress = %s, message = %s, heartbeat_at = %s WHERE id = %s",
+                    (percent, message, now, job_id))
+
+    def heartbeat(self, job_ids, now):
+        self._write(f"UPDATE jobs SET heartbeat_at = %s WHERE id IN ({in_list(job_ids)})",
+                    [now] + list(job_ids))
+
+    def finish(self, job_id, result, result_file, result_name, result_type, now):
+        self._write("""
+            UPDATE jobs SET status = 'done', progress = 100, message = NULL, error = NULL, result = %s,
+                            result_file = %s, result_name = %s, result_type = %s, finished_at = %s
+            WHERE id = %s
+        """, (result, result_file, result_name, result_type, now, job_id))
+
+    def fail(self, job_id, error, now):
+        self._write("UPDATE jobs SET status = 'failed', error = %s, finished_at = %s WHERE id = %s",
+                    (error, now, job_id))
+
+    def retry(self, job_id, error, run_after):
+        self._write("UPDATE jobs SET status = 'queued', error = %s, run_after = %s WHERE id = %s",
+                    (error, run_after, job_id))
+
+    def requeue_stale(self, before, now):
+        """Jobs whose worker stopped sending heartbeats: queue them again, or fail them when
+        out of attempts; returns (requeued, failed)"""
+        failed = self._changed("""
+            UPDATE jobs SET status = 'failed', error = 'The worker running this job stopped',
+                            finished_at = %s
+            WHERE status = 'running' AND heartbeat_at < %s AND attempts >= max_attempts
+        """, (now, before))
+        requeued = self._changed("""
+            UPDATE jobs SET status = 'queued', run_after = %s
+            WHERE status = 'running' AND heartbeat_at < %s
+        """, (now, before))
+        return requeued, failed
+
+    def purge(self, before):
+        """Delete jobs finished before `before`; returns their result files"""
+        rows = self._query("SELECT result_file FROM jobs WHERE finished_at < %s AND result_file IS NOT NULL",
+                           (before,))
+        self._write("DELETE FROM jobs WHERE finished_at < %s", (before,))
+        return [row['result_file'] for row in rows]
@@ -0,0 +1,98 @@
+"""
+Oil Shop Management System - Response Encoding
+Compression and compact list encodings for the JSON API.
+
+JSON responses above a size threshold are compressed with brotli (when the
+optional `brotli` package is installed) or gzip, following the client's
+Accept-Encoding. List endpoints also accept `?format=columns`, which sends
+one array per column instead of repeating every key on every row, with
+decimals as JSON numbers and datetimes as compact ISO strings.
+"""
+
+import gzip
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from flask import jsonify, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSION_CONFIG = {
+    'enabled': True,
+    'min_size': 1024,
+    'gzip_level': 5,
+    'brotli_quality': 4,
+}
+
+COMPRESSIBLE_TYPES = ('application/json', 'text/plain', 'text/csv')
+
+
+def _column_value(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.isoformat(timespec='seconds')
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, timedelta):
+        return str(value)
+    return value
+
+
+def to_columns(rows):
+    """Turn a list of row dicts into {'count': n, 'columns': {name: [values]}}"""
+    if not rows:
+        return {'count': 0, 'columns': {}}
+    names = list(rows[0].keys())
+    columns = {name: [_column_value(row[name]) for row in rows] for name in names}
+    return {'count': len(rows), 'columns': columns}
+
+
+def list_response(rows):
+    """jsonify a list of rows, honouring ?format=columns"""
+    if request.args.get('format') == 'columns':
+        return jsonify(to_columns(rows))
+    return jsonify(rows)
+
+
+def _choose_encoding():
+    accepted = request.accept_encodings
+    if brotli is not None and accepted.quality('br') > 0:
+        return 'br'
+    if accepted.quality('gzip') > 0:
+        return 'gzip'
+    return None
+
+
+def compress_response(response):
+    """after_request hook: compress large text responses the client can decode"""
+    if (response.status_code < 200 or response.status_code >= 300 or response.direct_passthrough
+            or response.is_streamed or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_TYPES):
+        return response
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    if len(data) < COMPRESSION_CONFIG['min_size']:
+        return response
+    encoding = _choose_encoding()
+    if encoding is None:
+        return response
+    if encoding == 'br':
+        data = brotli.compress(data, quality=COMPRESSION_CONFIG['brotli_quality'])
+    else:
+        data = gzip.compress(data, compresslevel=COMPRESSION_CONFIG['gzip_level'], mtime=0)
+    response.set_data(data)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def init_app(app, config=None):
+    if config:
+        COMPRESSION_CONFIG.update(config)
+    # Never pretty-print API responses, even when running with debug=True
+    app.json.compact = True
+    if COMPRESSION_CONFIG['enabled']:
+        app.after_request(compress_response)
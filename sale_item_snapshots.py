@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Oil Shop Management System - Sale Line Snapshots Migration
+Copies the product name, barcode and cost price onto every sale line.
+
+create_sale stores these fields on sale_items when the sale is made, so
+item lists, invoices, receipts and margin reports read sale_items alone
+and keep showing what was actually sold after a product is renamed,
+repriced or deleted. This migration brings an existing database to that
+schema:
+
+  1. adds product_name, barcode and cost_price to sale_items and
+     sale_items_archive and makes product_id nullable
+  2. replaces the ON DELETE RESTRICT foreign key to products with
+     ON DELETE SET NULL (partitioned tables have no foreign keys; product
+     deletes clear their references instead)
+  3. backfills the new columns from products in committed id-range batches,
+     so it can run while the shop is open and resume after an interruption
+
+On SQLite only steps 1 (without the nullability change) and 3 apply;
+products with sales history can be deleted once the database is recreated.
+
+Usage:
+    python sale_item_snapshots.py migrate [--batch-size 5000]
+"""
+
+import argparse
+import sys
+import time
+
+from mysql.connector import Error
+
+import storage
+from sales_archive import _columns
+
+ITEM_TABLES = ('sale_items', 'sale_items_archive')
+
+NEW_COLUMNS = (
+    ('product_name', 'VARCHAR(255)', 'product_id'),
+    ('barcode', 'VARCHAR(100)', 'product_name'),
+    ('cost_price', 'DECIMAL(10, 2)', 'price'),
+)
+
+BACKFILL_SQL = """
+    UPDATE {table} SET
+        product_name = (SELECT p.name FROM products p WHERE p.id = {table}.product_id),
+        barcode = (SELECT p.barcode FROM products p WHERE p.id = {table}.product_id),
+        cost_price = (SELECT p.cost_price FROM products p WHERE p.id = {table}.product_id)
+    WHERE id >= %s AND id < %s AND product_name IS NULL AND product_id IS NOT NULL
+"""
+
+
+def add_columns(conn):
+    cursor = conn.cursor()
+    try:
+        for table in ITEM_TABLES:
+            existing = _columns(cursor, table)
+            missing = [column for column in NEW_COLUMNS if column[0] not in existing]
+            if storage.backend() == 'sqlite':
+                for name, sql_type, _ in missing:
+                    cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {sql_type}")
+            elif missing:
+                changes = [f"ADD COLUMN {name} {sql_type} AFTER {after}" for name, sql_type, after in missing]
+                changes.append("MODIFY product_id INT NULL")
+                cursor.execute(f"ALTER TABLE `{table}` {', '.join(changes)}")
+            if missing:
+                print(f"✓ {table}: added {', '.join(column[0] for column in missing)}")
+            else:
+                print(f"✓ {table} already has the snapshot columns")
+        conn.commit()
+    finally:
+        cursor.close()
+
+
+def relax_foreign_key(conn):
+    """Turn sale_items.product_id RESTRICT into SET NULL (MySQL)"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT CONSTRAINT_NAME, DELETE_RULE FROM information_schema.REFERENTIAL_CONSTRAINTS
+            WHERE CONSTRAINT_SCHEMA = DATABASE() AND TABLE_NAME = 'sale_items'
+              AND REFERENCED_TABLE_NAME = 'products'
+        """)
+        constraints = cursor.fetchall()
+        if not constraints:
+            print("✓ sale_items has no foreign key to products (partitioned)")
+            return
+        for name, rule in constraints:
+            if rule == 'SET NULL':
+                print(f"✓ {name} already sets product_id to NULL")
+                continue
+            cursor.execute(f"ALTER TABLE sale_items DROP FOREIGN KEY `{name}`, "
+                           f"ADD CONSTRAINT `{name}` FOREIGN KEY (product_id) "
+                           f"REFERENCES products(id) ON DELETE SET NULL")
+            print(f"✓ {name}: ON DELETE {rule} -> SET NULL")
+        conn.commit()
+    finally:
+        cursor.close()
+
+
+def backfill(conn, batch_size):
+    """Fill the snapshot columns of old sale lines; returns the number of lines updated"""
+    cursor = conn.cursor()
+    updated = 0
+    try:
+        for table in ITEM_TABLES:
+            cursor.execute(f"SELECT MIN(id), MAX(id) FROM {table} "
+                           f"WHERE product_name IS NULL AND product_id IS NOT NULL")
+            low, high = cursor.fetchone()
+            if low is None:
+                continue
+            started = time.perf_counter()
+            for start in range(low, high + 1, batch_size):
+                try:
+                    cursor.execute(BACKFILL_SQL.format(table=table), (start, start + batch_size))
+                    updated += cursor.rowcount
+                    conn.commit()
+                except Error:
+                    conn.rollback()
+                    raise
+            print(f"✓ {table}: backfilled ids {low}-{high} ({time.perf_counter() - started:.1f}s)")
+    finally:
+        cursor.close()
+    return updated
+
+
+def migrate(conn, batch_size):
+    add_columns(conn)
+    if storage.backend() == 'mysql':
+        relax_foreign_key(conn)
+    return backfill(conn, batch_size)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Store product name, barcode and cost on sale lines")
+    storage.add_cli_args(parser)
+    commands = parser.add_subparsers(dest='command', required=True)
+    migrate_parser = commands.add_parser('migrate', help="Add the columns and backfill them")
+    migrate_parser.add_argument('--batch-size', type=int, default=5000)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    conn = storage.connect_from_args(args)
+    if conn is None:
+        return 1
+
+    try:
+        storage.print_header("Snapshotting product details onto sale lines")
+        updated = migrate(conn, args.batch_size)
+        print(f"✓ {updated} sale lines backfilled")
+    except Error as e:
+        print(f"❌ {e}")
+        return 1
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Oil Shop Management System - Sales History Partitioning and Archive
+Keeps the hot sales tables limited to recent months.
+
+`migrate` range-partitions `sales` and `sale_items` by month on MySQL.
+Partitioned InnoDB tables cannot take part in foreign keys and every unique
+key must contain the partitioning column, so the migration drops the foreign
+keys of both tables and changes their primary keys to (id, created_at). The
+table rebuild blocks writes while it runs; schedule it outside opening hours.
+Deleting a product clears product_id on its sale_items and
+sale_items_archive rows in ProductRepository, in place of the ON DELETE
+SET NULL constraint; the lines keep the product name, barcode and cost
+recorded at sale time, so archived sales and reports read those instead of
+joining products. On SQLite only the archive tables are created.
+
+`archive` moves sales (with their items) from closed months older than
+ARCHIVE_HORIZON_MONTHS into the compressed `sales_archive` and
+`sale_items_archive` tables in small committed batches, then drops the
+emptied partitions and adds partitions for the coming months. Reads for
+older sales fall back to the archive tables (see SaleRepository).
+
+Usage:
+    python sales_archive.py migrate [--months-ahead 3]
+    python sales_archive.py archive [--horizon 24] [--dry-run]
+    python sales_archive.py partitions
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import date, datetime
+
+from mysql.connector import Error
+
+import backup
+import storage
+
+ARCHIVE_CONFIG = {
+    'horizon_months': 24,
+    'batch_size': 1000,
+    'months_ahead': 3,
+}
+
+PARTITIONED_TABLES = ('sales', 'sale_items')
+ARCHIVE_TABLES = {'sales': 'sales_archive', 'sale_items': 'sale_items_archive'}
+FUTURE_PARTITION = 'p_future'
+
+
+def configure(config):
+    ARCHIVE_CONFIG.update(config)
+
+
+def add_months(day, months):
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def archive_cutoff(today=None):
+    """First day of the oldest month kept in the hot tables"""
+    return add_months(today or date.today(), -ARCHIVE_CONFIG['horizon_months'])
+
+
+# ============================================
+# Partitioning (MySQL)
+# ============================================
+
+def partition_name(month):
+    return f"p{month:%Y%m}"
+
+
+def partition_clause(month):
+    upper = add_months(month, 1)
+    return f"PARTITION {partition_name(month)} VALUES LESS THAN (UNIX_TIMESTAMP('{upper:%Y-%m-%d} 00:00:00'))"
+
+
+def list_partitions(cursor, table):
+    """Return the named monthly partitions of a table, oldest first"""
+    cursor.execute("""
+        SELECT PARTITION_NAME FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL
+        ORDER BY PARTITION_ORDINAL_POSITION
+    """, (table,))
+    return [row[0] for row in cursor.fetchall()]
+
+
+def _partition_month(name):
+    return datetime.strptime(name[1:], '%Y%m').date()
+
+
+def migrate(conn, months_ahead):
+    """Partition sales and sale_items by month of created_at"""
+    storage.ensure_tables(conn, *ARCHIVE_TABLES.values())
+    if storage.backend() == 'sqlite':
+        print("✓ Archive tables ready (SQLite tables are not partitioned)")
+        return
+    # Reads UNION the hot and archive tables, so both need the same columns
+    backup.migrate(conn)
+
+    cursor = conn.cursor()
+    try:
+        for table in PARTITIONED_TABLES:
+            if list_partitions(cursor, table):
+                print(f"✓ {table} is already partitioned")
+                continue
+
+            cursor.execute("""
+                SELECT TABLE_NAME, CONSTRAINT_NAME FROM information_schema.REFERENTIAL_CONSTRAINTS
+                WHERE CONSTRAINT_SCHEMA = DATABASE() AND (TABLE_NAME = %s OR REFERENCED_TABLE_NAME = %s)
+            """, (table, table))
+            for owner, constraint in cursor.fetchall():
+                cursor.execute(f"ALTER TABLE `{owner}` DROP FOREIGN KEY `{constraint}`")
+                print(f"  dropped foreign key {owner}.{constraint}")
+
+            cursor.execute(f"SELECT MIN(created_at) FROM `{table}`")
+            oldest = cursor.fetchone()[0] or datetime.now()
+            month = date(oldest.year, oldest.month, 1)
+            last = add_months(date.today(), months_ahead)
+            clauses = []
+            while month <= last:
+                clauses.append(partition_clause(month))
+                month = add_months(month, 1)
+            clauses.append(f"PARTITION {FUTURE_PARTITION} VALUES LESS THAN MAXVALUE")
+
+            started = time.perf_counter()
+            cursor.execute(f"""
+                ALTER TABLE `{table}`
+                MODIFY created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                DROP PRIMARY KEY,
+                ADD PRIMARY KEY (id, created_at)
+                PARTITION BY RANGE (UNIX_TIMESTAMP(created_at)) (
+                    {', '.join(clauses)}
+                )
+            """)
+            print(f"✓ {table} partitioned into {len(clauses)} partitions "
+                  f"({time.perf_counter() - started:.1f}s)")
+    finally:
+        cursor.close()
+
+
+def ensure_partitions(conn, months_ahead):
+    """Split the catch-all partition so the coming months have their own"""
+    if storage.backend() == 'sqlite':
+        return 0
+    added = 0
+    cursor = conn.cursor()
+    try:
+        for table in PARTITIONED_TABLES:
+            names = [name for name in list_partitions(cursor, table) if name != FUTURE_PARTITION]
+            if not names:
+                continue
+            month = add_months(_partition_month(names[-1]), 1)
+            last = add_months(date.today(), months_ahead)
+            clauses = []
+            while month <= last:
+                clauses.append(partition_clause(month))
+                month = add_months(month, 1)
+            if not clauses:
+                continue
+            clauses.append(f"PARTITION {FUTURE_PARTITION} VALUES LESS THAN MAXVALUE")
+            cursor.execute(f"ALTER TABLE `{table}` REORGANIZE PARTITION {FUTURE_PARTITION} "
+                           f"INTO ({', '.join(clauses)})")
+            added += len(clauses) - 1
+    finally:
+        cursor.close()
+    return added
+
+
+def drop_empty_partitions(conn, cutoff):
+    """Drop partitions that end on or before the cutoff once they are empty"""
+    if storage.backend() == 'sqlite':
+        return []
+    dropped = []
+    cursor = conn.cursor()
+    try:
+        for table in PARTITIONED_TABLES:
+            names = [name for name in list_partitions(cursor, table) if name != FUTURE_PARTITION]
+            # Always keep one partition; RANGE tables cannot lose their last one
+            for name in names[:-1]:
+                if add_months(_partition_month(name), 1) > cutoff:
+                    break
+                cursor.execute(f"SELECT 1 FROM `{table}` PARTITION ({name}) LIMIT 1")
+                if cursor.fetchall():
+                    break
+                cursor.execute(f"ALTER TABLE `{table}` DROP PARTITION {name}")
+                dropped.append(f"{table}.{name}")
+    finally:
+        cursor.close()
+    return dropped
+
+
+# ============================================
+# Archive job
+# ============================================
+
+def _columns(cursor, table):
+    cursor.execute(f"SELECT * FROM {table} LIMIT 0")
+    cursor.fetchall()
+    return list(cursor.column_names)
+
+
+def archive_sales(conn, cutoff, batch_size, dry_run=False):
+    """Move sales created before the cutoff, with their items, into the archive"""
+    cursor = conn.cursor()
+    moved_sales = moved_items = 0
+    try:
+        # updated_at is left to its default, so incremental backups pick up the archived copies
+        sale_columns = ', '.join(c for c in _columns(cursor, 'sales') if c != 'updated_at')
+        item_columns = ', '.join(c for c in _columns(cursor, 'sale_items') if c != 'updated_at')
+        if dry_run:
+            cursor.execute("SELECT COUNT(*) FROM sales WHERE created_at < %s", (cutoff,))
+            return cursor.fetchone()[0], None
+
+        while True:
+            cursor.execute("SELECT id FROM sales WHERE created_at < %s ORDER BY id LIMIT %s",
+                           (cutoff, batch_size))
+            ids = [row[0] for row in cursor.fetchall()]
+            if not ids:
+                break
+            marks = ', '.join(['%s'] * len(ids))
+            try:
+                cursor.execute(f"INSERT IGNORE INTO sales_archive ({sale_columns}) "
+                               f"SELECT {sale_columns} FROM sales WHERE id IN ({marks})", ids)
+                cursor.execute(f"INSERT IGNORE INTO sale_items_archive ({item_columns}) "
+                               f"SELECT {item_columns} FROM sale_items WHERE sale_id IN ({marks})", ids)
+                cursor.execute(f"DELETE FROM sale_items WHERE sale_id IN ({marks})", ids)
+                moved_items += cursor.rowcount
+                cursor.execute(f"DELETE FROM sales WHERE id IN ({marks}) AND created_at < %s",
+                               ids + [cutoff])
+                moved_sales += cursor.rowcount
+                conn.commit()
+            except Error:
+                conn.rollback()
+                raise
+    finally:
+        cursor.close()
+    return moved_sales, moved_items
+
+
+def run_archive(conn, horizon_months=None, dry_run=False):
+    """Archive closed months beyond the horizon and maintain partitions"""
+    if horizon_months is not None:
+        ARCHIVE_CONFIG['horizon_months'] = horizon_months
+    cutoff = archive_cutoff()
+    started = time.perf_counter()
+    moved_sales, moved_items = archive_sales(conn, cutoff, ARCHIVE_CONFIG['batch_size'], dry_run)
+    result = {'cutoff': cutoff.isoformat(), 'sales': moved_sales, 'items': moved_items}
+    if not dry_run:
+        result['dropped_partitions'] = drop_empty_partitions(conn, cutoff)
+        result['added_partitions'] = ensure_partitions(conn, ARCHIVE_CONFIG['months_ahead'])
+    result['elapsed_s'] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Partition and archive the sales history")
+    storage.add_cli_args(parser)
+    parser.add_argument('--months-ahead', type=int,
+                        default=int(os.environ.get('ARCHIVE_MONTHS_AHEAD', ARCHIVE_CONFIG['months_ahead'])))
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('migrate', help="Partition sales/sale_items and create the archive tables")
+    archive = commands.add_parser('archive', help="Move old sales into the archive tables")
+    archive.add_argument('--horizon', type=int,
+                         default=int(os.environ.get('ARCHIVE_HORIZON_MONTHS', ARCHIVE_CONFIG['horizon_months'])),
+                         help="Months of history kept in the hot tables")
+    archive.add_argument('--batch-size', type=int, default=ARCHIVE_CONFIG['batch_size'])
+    archive.add_argument('--dry-run', action='store_true', help="Only count the sales to move")
+    commands.add_parser('partitions', help="Add partitions for the coming months")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    ARCHIVE_CONFIG['months_ahead'] = args.months_ahead
+    conn = storage.connect_from_args(args)
+    if conn is None:
+        return 1
+
+    try:
+        if args.command == 'migrate':
+            storage.print_header("Partitioning sales history")
+            migrate(conn, args.months_ahead)
+        elif args.command == 'partitions':
+            added = ensure_partitions(conn, args.months_ahead)
+            print(f"✓ {added} partitions added")
+        else:
+            ARCHIVE_CONFIG['batch_size'] = args.batch_size
+            storage.print_header(f"Archiving sales older than {args.horizon} months")
+            result = run_archive(conn, args.horizon, args.dry_run)
+            if args.dry_run:
+                print(f"{result['sales']} sales before {result['cutoff']} would be archived")
+            else:
+                print(f"✓ Archived {result['sales']} sales and {result['items']} items "
+                      f"before {result['cutoff']} in {result['elapsed_s']:.1f}s")
+                for name in result['dropped_partitions']:
+                    print(f"  dropped partition {name}")
+    except Error as e:
+        print(f"❌ {e}")
+        return 1
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
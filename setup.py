@@ -2,6 +2,11 @@
 """
 Oil Shop Management System - Setup Script
 This script helps automate the initial setup process
+
+Usage:
+    python setup.py                 Interactive installation
+    python setup.py generate --help Generate a large synthetic dataset
+    python setup.py generate --backend sqlite --sqlite-path oil_shop.db
 """
 
 import os
@@ -11,14 +16,11 @@ import getpass
 import mysql.connector
 from mysql.connector import Error
 
-def print_header(text):
-    print("\n" + "="*60)
-    print(f"  {text}")
-    print("="*60 + "\n")
+import storage
 
 def check_python_version():
     """Check if Python version is 3.8 or higher"""
-    print_header("Checking Python Version")
+    storage.print_header("Checking Python Version")
     version = sys.version_info
     print(f"Python version: {version.major}.{version.minor}.{version.micro}")
     
@@ -30,7 +32,7 @@ def check_python_version():
 
 def install_requirements():
     """Install required Python packages"""
-    print_header("Installing Python Dependencies")
+    storage.print_header("Installing Python Dependencies")
     
     try:
         print("Installing packages from requirements.txt...")
@@ -56,7 +58,7 @@ def test_mysql_connection(host, user, password):
 
 def setup_database():
     """Setup MySQL database"""
-    print_header("Database Setup")
+    storage.print_header("Database Setup")
     
     print("Please provide your MySQL credentials:")
     db_host = input("MySQL Host [localhost]: ").strip() or "localhost"
@@ -86,9 +88,8 @@ def setup_database():
             sql_script = f.read()
         
         # Execute SQL statements
-        for statement in sql_script.split(';'):
-            if statement.strip():
-                cursor.execute(statement)
+        for statement in storage.split_sql_statements(sql_script):
+            cursor.execute(statement)
         
         conn.commit()
         cursor.close()
@@ -110,7 +111,7 @@ def setup_database():
 
 def create_env_file(db_config):
     """Create .env file with configuration"""
-    print_header("Creating Configuration File")
+    storage.print_header("Creating Configuration File")
     
     if db_config is None:
         print("Skipping .env creation due to database setup issues.")
@@ -141,7 +142,7 @@ PORT=5000
 
 def update_app_config(db_config):
     """Update app.py with database configuration"""
-    print_header("Updating Application Configuration")
+    storage.print_header("Updating Application Configuration")
     
     if db_config is None:
         print("⚠ Warning: Please manually update DB_CONFIG in app.py")
@@ -156,7 +157,9 @@ def update_app_config(db_config):
     'host': '{db_config['host']}',
     'user': '{db_config['user']}',
     'password': '{db_config['password']}',
-    'database': 'oil_shop_db'
+    'database': 'oil_shop_db',
+    # Bounds the connect and handshake only; the driver clears it once connected
+    'connection_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', 3)),
 }}"""
         
         # Replace the DB_CONFIG section
@@ -174,7 +177,7 @@ def update_app_config(db_config):
 
 def create_directories():
     """Create required directories"""
-    print_header("Creating Required Directories")
+    storage.print_header("Creating Required Directories")
     
     directories = ['templates', 'static', 'static/uploads']
     
@@ -184,7 +187,7 @@ def create_directories():
 
 def print_completion_message():
     """Print setup completion message"""
-    print_header("Setup Complete!")
+    storage.print_header("Setup Complete!")
     
     print("✓ Oil Shop Management System has been set up successfully!")
 
@@ -222,5 +225,332 @@ def main():
         print("Please check the error and try again, or set up manually using README.md")
         sys.exit(1)
 
+# ============================================
+# Synthetic dataset generator
+# ============================================
+
+GENERATOR_BRANDS = ['Shell', 'Mobil', 'Castrol', 'Total', 'Valvoline', 'Motul', 'Liqui Moly', 'Caltex']
+GENERATOR_LINES = {
+    'Engine Oil': ['Helix Ultra', 'Super', 'Magnatec', 'Quartz', 'MaxLife', 'Synergy'],
+    'Diesel Oil': ['Rimula', 'Delvac', 'CRB Turbomax', 'Rubia', 'Premium Blue'],
+    'Motorcycle Oil': ['Advance', 'Power 1', 'Hi-Tech 4T', '7100 4T'],
+    'Gear Oil': ['Spirax', 'Mobilube', 'Axle EPX', 'Transmission'],
+    'Hydraulic Oil': ['Tellus', 'DTE', 'Hyspin', 'Azolla'],
+    'Transmission Oil': ['ATF Dexron III', 'ATF Multi', 'CVT Fluid'],
+    'Brake Fluid': ['DOT 3', 'DOT 4', 'DOT 5.1'],
+    'Coolant': ['Antifreeze', 'Radicool', 'Glacelf'],
+}
+GENERATOR_GRADES = ['0W-20', '5W-30', '5W-40', '10W-30', '10W-40', '15W-40', '20W-50', '80W-90', '']
+GENERATOR_SIZES = ['0.5L', '1L', '4L', '5L', '20L']
+PAYMENT_METHODS = ['cash', 'card', 'online']
+PAYMENT_WEIGHTS = [60, 30, 10]
+BASKET_SIZES = [1, 2, 3, 4, 5, 6, 8, 10]
+BASKET_WEIGHTS = [42, 24, 13, 8, 5, 4, 2, 2]
+# Relative sales volume by weekday (Monday first) and by hour of day
+WEEKDAY_FACTORS = [0.85, 0.9, 0.9, 0.95, 1.1, 1.35, 0.95]
+HOUR_WEIGHTS = {8: 4, 9: 7, 10: 9, 11: 9, 12: 8, 13: 7, 14: 7, 15: 8, 16: 9, 17: 10, 18: 8, 19: 5, 20: 2}
+
+def _tsv_value(value):
+    if value is None:
+        return '\\N'
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n')
+
+class BulkLoader:
+    """Buffers rows per table and flushes them as multi-row INSERTs or LOAD DATA"""
+
+    def __init__(self, conn, method='insert', batch_size=5000):
+        self.conn = conn
+        self.cursor = conn.cursor()
+        self.method = method
+        self.batch_size = batch_size
+        self.buffers = {}
+        self.columns = {}
+        self.loaded = {}
+
+    def add(self, table, columns, row):
+        buffer = self.buffers.setdefault(table, [])
+        self.columns[table] = columns
+        buffer.append(row)
+        if len(buffer) >= self.batch_size:
+            self.flush(table)
+
+    def flush(self, table=None):
+        tables = [table] if table else list(self.buffers)
+        for name in tables:
+            rows = self.buffers.get(name)
+            if not rows:
+                continue
+            columns = self.columns[name]
+            if self.method == 'infile':
+                self._load_infile(name, columns, rows)
+            else:
+                placeholders = ', '.join(['%s'] * len(columns))
+                self.cursor.executemany(
+                    f"INSERT INTO {name} ({', '.join(columns)}) VALUES ({placeholders})", rows)
+            self.conn.commit()
+            self.loaded[name] = self.loaded.get(name, 0) + len(rows)
+            self.buffers[name] = []
+
+    def _load_infile(self, table, columns, rows):
+        import tempfile
+        with tempfile.NamedTemporaryFile('w', suffix='.tsv', delete=False, encoding='utf-8') as f:
+            path = f.name
+            for row in rows:
+                f.write('\t'.join(_tsv_value(value) for value in row))
+                f.write('\n')
+        try:
+            self.cursor.execute(
+                f"LOAD DATA LOCAL INFILE %s INTO TABLE {table} "
+                f"FIELDS TERMINATED BY '\\t' LINES TERMINATED BY '\\n' ({', '.join(columns)})",
+                (path.replace('\\', '/'),))
+        finally:
+            os.remove(path)
+
+    def close(self):
+        self.flush()
+        self.cursor.close()
+
+# Sales history and every table derived from it, cleared by --truncate
+HISTORY_TABLES = ('sale_items', 'sales', 'sale_items_archive', 'sales_archive', 'stock_movements',
+                  'stock_snapshots', 'customer_stats', 'reorder_suggestions')
+
+MOVEMENT_COLUMNS = ('product_id', 'change_qty', 'reason', 'reference_id', 'note', 'created_at')
+
+def _next_id(cursor, table):
+    cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}")
+    return cursor.fetchone()[0] + 1
+
+def _history_bounds(args):
+    """First and last (exclusive) day of the generated sales history"""
+    from datetime import datetime, timedelta
+
+    end = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    return end - timedelta(days=int(args.years * 365)), end
+
+def generate_catalog(loader, cursor, rng, args):
+    """Generate suppliers, products and employees; return their ids, sale weights and stock"""
+    from werkzeug.security import generate_password_hash
+
+    supplier_start = _next_id(cursor, 'suppliers')
+    supplier_ids = []
+    for n in range(args.suppliers):
+        supplier_id = supplier_start + n
+        brand = GENERATOR_BRANDS[n % len(GENERATOR_BRANDS)]
+        loader.add('suppliers', ('id', 'name', 'contact_person', 'phone', 'email', 'address'),
+                   (supplier_id, f"{brand} Distributor {supplier_id}", f"Contact {supplier_id}",
+                    f"555-{supplier_id % 10000:04d}", f"orders{supplier_id}@example.com",
+                    f"{rng.randint(1, 999)} Industrial Rd"))
+        supplier_ids.append(supplier_id)
+    loader.flush('suppliers')
+
+    categories = list(GENERATOR_LINES)
+    product_start = _next_id(cursor, 'products')
+    created_at = _history_bounds(args)[0].strftime('%Y-%m-%d %H:%M:%S')
+    products = []
+    stock = {}
+    for n in range(args.products):
+        product_id = product_start + n
+        category = rng.choice(categories)
+        grade = rng.choice(GENERATOR_GRADES) if category in ('Engine Oil', 'Diesel Oil', 'Motorcycle Oil', 'Gear Oil') else ''
+        size = rng.choice(GENERATOR_SIZES)
+        name = ' '.join(part for part in (rng.choice(GENERATOR_BRANDS), rng.choice(GENERATOR_LINES[category]), grade, size) if part)
+        price = round(min(max(rng.lognormvariate(3.5, 0.6), 3), 400), 2)
+        cost_price = round(price * rng.uniform(0.55, 0.82), 2)
+        stock[product_id] = rng.randint(0, 500)
+        loader.add('products', ('id', 'name', 'barcode', 'category', 'price', 'cost_price', 'quantity',
+                                'min_stock_level', 'supplier_id', 'description', 'created_at'),
+                   (product_id, name, f"20{product_id:011d}", category, price, cost_price,
+                    stock[product_id], rng.choice([5, 8, 10, 12, 15, 20]),
+                    rng.choice(supplier_ids) if supplier_ids else None, f"Generated {category.lower()}",
+                    created_at))
+        products.append((product_id, price, name, f"20{product_id:011d}", cost_price))
+    loader.flush('products')
+
+    employee_start = _next_id(cursor, 'employees')
+    password_hash = generate_password_hash(args.employee_password)
+    employee_ids = []
+    for n in range(args.employees):
+        employee_id = employee_start + n
+        role = 'manager' if n % 10 == 0 else 'staff'
+        loader.add('employees', ('id', 'username', 'password', 'role'),
+                   (employee_id, f"staff{employee_id:05d}", password_hash, role))
+        employee_ids.append(employee_id)
+    loader.flush('employees')
+
+    # Zipf-like popularity so a small set of hot SKUs dominates sales
+    ranks = list(range(1, len(products) + 1))
+    rng.shuffle(ranks)
+    weights = [1.0 / (rank ** args.skew) for rank in ranks]
+    return products, weights, employee_ids, stock
+
+def generate_sales(loader, cursor, rng, args, products, weights, employee_ids):
+    """Generate sales, sale_items and their stock movements with weekly/yearly seasonality and
+    varied baskets; returns the units sold per product"""
+    import bisect
+    import math
+    from datetime import timedelta
+    from itertools import accumulate
+
+    cum_weights = list(accumulate(weights))
+    total_weight = cum_weights[-1]
+    hours = list(HOUR_WEIGHTS)
+    hour_weights = list(HOUR_WEIGHTS.values())
+    customers = [f"07{rng.randint(10000000, 99999999)}" for _ in range(args.customers)]
+    if not employee_ids:
+        cursor.execute("SELECT id FROM employees")
+        employee_ids = [row[0] for row in cursor.fetchall()] or [None]
+
+    sale_id = _next_id(cursor, 'sales')
+    item_id = _next_id(cursor, 'sale_items')
+    day, end = _history_bounds(args)
+    sold = {}
+    sale_columns = ('id', 'customer_name', 'customer_phone', 'total_amount', 'discount',
+                    'payment_method', 'employee_id', 'created_at')
+    item_columns = ('id', 'sale_id', 'product_id', 'product_name', 'barcode', 'quantity', 'price',
+                    'cost_price', 'subtotal', 'created_at')
+    growth_days = max((end - day).days, 1)
+
+    while day < end:
+        elapsed = (end - day).days
+        season = 1 + args.seasonality * math.cos(2 * math.pi * (day.timetuple().tm_yday - 15) / 365.25)
+        growth = 1 + args.growth * (1 - elapsed / growth_days)
+        expected = args.sales_per_day * WEEKDAY_FACTORS[day.weekday()] * season * growth
+        count = max(0, int(rng.gauss(expected, math.sqrt(max(expected, 1)))))
+        for _ in range(count):
+            created_at = day.replace(hour=rng.choices(hours, hour_weights)[0],
+                                     minute=rng.randrange(60), second=rng.randrange(60))
+            stamp = created_at.strftime('%Y-%m-%d %H:%M:%S')
+            basket = rng.choices(BASKET_SIZES, BASKET_WEIGHTS)[0]
+            subtotal = 0.0
+            chosen = set()
+            for _ in range(basket):
+                index = bisect.bisect_left(cum_weights, rng.random() * total_weight)
+                if index in chosen:
+                    continue
+                chosen.add(index)
+                product_id, price, name, barcode, cost_price = products[min(index, len(products) - 1)]
+                quantity = 1 if rng.random() < 0.75 else rng.randint(2, 4)
+                line_total = round(price * quantity, 2)
+                subtotal += line_total
+                loader.add('sale_items', item_columns,
+                           (item_id, sale_id, product_id, name, barcode, quantity, price, cost_price,
+                            line_total, stamp))
+                loader.add('stock_movements', MOVEMENT_COLUMNS,
+                           (product_id, -quantity, 'sale', sale_id, None, stamp))
+                sold[product_id] = sold.get(product_id, 0) + quantity
+                item_id += 1
+            discount = round(subtotal * rng.choice([0.05, 0.1]), 2) if rng.random() < 0.08 else 0
+            is_known = rng.random() < args.repeat_customers
+            loader.add('sales', sale_columns,
+                       (sale_id, 'Customer' if is_known else 'Walk-in',
+                        rng.choice(customers) if is_known and customers else '',
+                        round(subtotal - discount, 2), discount,
+                        rng.choices(PAYMENT_METHODS, PAYMENT_WEIGHTS)[0],
+                        rng.choice(employee_ids), stamp))
+            sale_id += 1
+        day += timedelta(days=1)
+    return sold
+
+def generate_stock_ledger(loader, args, stock, sold):
+    """Record each generated product's opening stock so its ledger sums to products.quantity"""
+    opened = _history_bounds(args)[0].strftime('%Y-%m-%d %H:%M:%S')
+    for product_id, quantity in stock.items():
+        loader.add('stock_movements', MOVEMENT_COLUMNS,
+                   (product_id, quantity + sold.get(product_id, 0), 'initial', None,
+                    'Generated opening stock', opened))
+
+def generate_dataset(argv=None):
+    """Generate a large synthetic dataset for performance testing"""
+    import argparse
+    import random
+    import time
+
+    import customers
+    import forecasting
+
+    parser = argparse.ArgumentParser(prog='setup.py generate',
+                                     description="Generate synthetic products, suppliers, employees and sales history")
+    storage.add_cli_args(parser)
+    parser.add_argument('--products', type=int, default=5000)
+    parser.add_argument('--suppliers', type=int, default=50)
+    parser.add_argument('--employees', type=int, default=25)
+    parser.add_argument('--employee-password', default='password123')
+    parser.add_argument('--years', type=float, default=3)
+    parser.add_argument('--sales-per-day', type=float, default=400)
+    parser.add_argument('--customers', type=int, default=20000, help="Size of the repeat-customer phone pool")
+    parser.add_argument('--repeat-customers', type=float, default=0.35, help="Share of sales with a known phone")
+    parser.add_argument('--seasonality', type=float, default=0.2, help="Amplitude of the yearly cycle")
+    parser.add_argument('--growth', type=float, default=0.3, help="Volume growth over the generated period")
+    parser.add_argument('--skew', type=float, default=1.1, help="Zipf exponent for SKU popularity")
+    parser.add_argument('--method', choices=['insert', 'infile'], default='insert',
+                        help="Multi-row INSERT batches or LOAD DATA LOCAL INFILE (MySQL)")
+    parser.add_argument('--batch-size', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--truncate', action='store_true', help="Remove existing sales history first")
+    args = parser.parse_args(argv)
+    on_mysql = args.backend == 'mysql'
+    if args.method == 'infile' and not on_mysql:
+        parser.error("--method infile needs the MySQL backend")
+
+    storage.print_header(f"Generating Synthetic Dataset ({args.backend})")
+    options = {'allow_local_infile': True} if args.method == 'infile' else {}
+    conn = storage.connect_from_args(args, **options)
+    if conn is None:
+        return 1
+
+    cursor = conn.cursor()
+    # Sale lines are flushed ahead of their sales, so foreign keys are checked only once loaded
+    if on_mysql:
+        cursor.execute("SET SESSION unique_checks = 0")
+        cursor.execute("SET SESSION foreign_key_checks = 0")
+    else:
+        cursor.execute("PRAGMA foreign_keys = OFF")
+    if args.truncate:
+        for table in HISTORY_TABLES:
+            cursor.execute(f"TRUNCATE TABLE {table}" if on_mysql else f"DELETE FROM {table}")
+        # Existing products keep their stock; restart their ledger from it
+        cursor.execute("""
+            INSERT INTO stock_movements (product_id, change_qty, reason, note)
+            SELECT id, quantity, 'initial', 'Stock when the history was regenerated' FROM products
+        """)
+        conn.commit()
+        print("✓ Existing sales history, archive, ledger and derived tables removed")
+
+    rng = random.Random(args.seed)
+    loader = BulkLoader(conn, method=args.method, batch_size=args.batch_size)
+    started = time.perf_counter()
+    try:
+        products, weights, employee_ids, stock = generate_catalog(loader, cursor, rng, args)
+        sold = {}
+        if products:
+            sold = generate_sales(loader, cursor, rng, args, products, weights, employee_ids)
+        generate_stock_ledger(loader, args, stock, sold)
+        loader.close()
+        customers.rebuild_stats(conn, args.batch_size)
+        forecast = forecasting.run_forecast(conn)
+    except Error as e:
+        conn.rollback()
+        print(f"❌ Error loading data: {e}")
+        return 1
+    finally:
+        if on_mysql:
+            cursor.execute("SET SESSION foreign_key_checks = 1")
+            cursor.execute("SET SESSION unique_checks = 1")
+        else:
+            cursor.execute("PRAGMA foreign_keys = ON")
+        cursor.close()
+        conn.close()
+
+    elapsed = time.perf_counter() - started
+    total = sum(loader.loaded.values())
+    for table, rows in loader.loaded.items():
+        print(f"✓ {table}: {rows:,} rows")
+    print("✓ customer_stats rebuilt from the generated sales")
+    print(f"✓ reorder_suggestions rebuilt: {forecast['to_reorder']} of {forecast['products']} products to reorder")
+    print(f"\n✓ Loaded {total:,} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s)")
+    return 0
+
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == 'generate':
+        sys.exit(generate_dataset(sys.argv[2:]))
     main()
\ No newline at end of file
@@ -1,14 +1,41 @@
 import os
+import sys
 import webbrowser
 import time
 import subprocess
+import urllib.request
+import urllib.error
 
 project_path = r"C:\Users\USER\Desktop\project\oil-shop-management"
+server_url = "http://127.0.0.1:5000"
+ready_url = server_url + "/api/ready"
+startup_timeout = 60
 
 os.chdir(project_path)
 
-subprocess.Popen(["python", "app.py"])
+# No debug reloader: it would import the whole app twice before serving
+env = dict(os.environ, DEBUG=os.environ.get('DEBUG', 'False'))
+server = subprocess.Popen(["python", "app.py"], env=env)
 
-time.sleep(2)
+# Open the browser as soon as the server (and its database) answers
+deadline = time.monotonic() + startup_timeout
+while True:
+    if server.poll() is not None:
+        print("The server stopped during start-up; see the messages above.")
+        sys.exit(1)
+    try:
+        with urllib.request.urlopen(ready_url, timeout=1) as response:
+            if response.status == 200:
+                break
+    except urllib.error.HTTPError as e:
+        # 503: the server is up but the database is not reachable yet
+        if time.monotonic() > deadline:
+            print(f"The server is running but not ready ({e.code}); check the database.")
+            break
+    except (urllib.error.URLError, OSError):
+        if time.monotonic() > deadline:
+            print("The server did not start in time.")
+            break
+    time.sleep(0.1)
 
-webbrowser.open("http://127.0.0.1:5000")
+webbrowser.open(server_url)
@@ -10,7 +10,8 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    # The launcher only starts app.py and polls it; keep the heavy libraries out
+    excludes=['reportlab', 'pandas', 'numpy', 'PIL', 'openpyxl', 'qrcode', 'barcode', 'pyzbar'],
     noarchive=False,
     optimize=0,
 )
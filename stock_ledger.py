@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Oil Shop Management System - Stock Ledger Snapshots
+Periodic per-product stock snapshots for the stock_movements ledger.
+
+Every change to products.quantity (sales, manual adjustments, product
+edits and the initial stock of new products) is appended to
+`stock_movements` in the same transaction, one multi-row INSERT per
+transaction. `snapshot` stores every product's quantity together with the
+id of the last movement it includes, so stock on a past date is the
+nearest earlier snapshot plus a short range scan of the movements after
+it, instead of a replay of the full history. Schedule it nightly (cron or
+the Windows Task Scheduler).
+
+`migrate` creates the ledger tables on an existing database and takes the
+first snapshot, which becomes the base for all earlier stock.
+
+Usage:
+    python stock_ledger.py migrate
+    python stock_ledger.py snapshot [--keep-days 400]
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime, timedelta
+
+from mysql.connector import Error
+
+import storage
+from repositories import transaction, StockRepository
+
+LEDGER_CONFIG = {
+    'keep_days': 400,
+}
+
+LEDGER_TABLES = ('stock_movements', 'stock_snapshots')
+
+
+def take_snapshot(conn, keep_days=None):
+    """Snapshot all products and prune old snapshots; returns (taken_at, products, pruned)"""
+    keep_days = LEDGER_CONFIG['keep_days'] if keep_days is None else keep_days
+    taken_at = datetime.now().replace(microsecond=0)
+    stock = StockRepository(conn)
+    with transaction(conn):
+        products = stock.take_snapshot(taken_at)
+    with transaction(conn):
+        pruned = stock.prune_snapshots(taken_at - timedelta(days=keep_days))
+    return taken_at, products, pruned
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain the stock movement ledger")
+    storage.add_cli_args(parser)
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('migrate', help="Create the ledger tables and take the first snapshot")
+    snapshot = commands.add_parser('snapshot', help="Snapshot the stock of every product")
+    snapshot.add_argument('--keep-days', type=int,
+                          default=int(os.environ.get('STOCK_SNAPSHOT_KEEP_DAYS', LEDGER_CONFIG['keep_days'])),
+                          help="Days of daily snapshots to keep (the oldest kept one covers earlier dates)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    conn = storage.connect_from_args(args)
+    if conn is None:
+        return 1
+
+    try:
+        if args.command == 'migrate':
+            storage.ensure_tables(conn, *LEDGER_TABLES)
+            print("✓ Ledger tables ready")
+            keep_days = LEDGER_CONFIG['keep_days']
+        else:
+            keep_days = args.keep_days
+        taken_at, products, pruned = take_snapshot(conn, keep_days)
+        print(f"✓ Snapshot of {products} products at {taken_at:%Y-%m-%d %H:%M:%S}"
+              + (f", {pruned} old snapshot rows pruned" if pruned else ""))
+    except Error as e:
+        print(f"❌ {e}")
+        return 1
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
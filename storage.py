@@ -0,0 +1,880 @@
+"""
+Oil Shop Management System - Storage Backends
+Connection factory shared by the routes and the command line tools.
+
+Two backends expose the same mysql-connector style API (cursor(dictionary=True),
+%s placeholders, lastrowid, commit/rollback, mysql.connector.Error exceptions):
+
+  mysql   - the default; a MySQL server configured through DB_CONFIG
+  sqlite  - an embedded SQLite database in WAL mode for single-PC shops. The
+            schema is translated from database_init.sql on first start and
+            connections are cached per thread with tuned pragmas. An admin
+            account is only created when `seed_admin` is set.
+
+With MySQL, reporting reads can be sent to read replicas (connect_replica).
+A replica is only used while its replication lag, checked at most every
+few seconds, is under REPLICA_MAX_LAG_SECONDS; otherwise, or when it cannot
+be reached, the read falls back to the primary. To try it locally, run a
+second mysqld (e.g. on port 3307) replicating from the first and start
+the app with DB_REPLICAS=127.0.0.1:3307.
+
+Connections to the MySQL primary go through a circuit breaker: after
+`failure_threshold` consecutive failed connects it opens and connect()
+raises CircuitOpenError at once instead of waiting on the server again;
+after `open_seconds` a single caller probes the server (half-open) and
+its success closes the breaker.
+
+mysql-connector only bounds the connect and handshake with connection_timeout
+and then clears the socket timeout, so a statement the server never answers
+(a lock wait, a runaway UPDATE, a server that died mid-query) would block
+its caller forever. connect() therefore sets `read_timeout` on the socket
+of every connection it returns; that needs the pure-Python driver
+(use_pure=True), since the C extension has no read timeout in this driver
+version. connect(batch=True) opens a separate connection with the `batch`
+settings for long-running jobs.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import date, datetime
+from decimal import Decimal
+
+import mysql.connector
+from mysql.connector import errors as mysql_errors
+from mysql.connector import pooling
+
+STORAGE_CONFIG = {
+    'backend': 'mysql',
+    'mysql': {},
+    'pool_size': 10,
+    # Socket timeout (seconds) put on every MySQL connection handed out; 0 = none
+    'read_timeout': 0,
+    # Dedicated connections for background jobs; mysql None = same settings as 'mysql'
+    'batch': {
+        'mysql': None,
+        'read_timeout': 0,
+    },
+    'replicas': [],
+    'breaker': {
+        'failure_threshold': 5,
+        'open_seconds': 10.0,
+    },
+    'replica': {
+        'max_lag_seconds': 5,
+        'check_interval': 2.0,
+        'retry_after': 30.0,
+    },
+    'sqlite': {
+        'path': 'oil_shop.db',
+        'schema': 'database_init.sql',
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size_kb': 64 * 1024,
+        'busy_timeout_ms': 5000,
+        # Create this admin account when missing; off unless asked for
+        'seed_admin': False,
+        'admin_username': 'admin',
+        'admin_password': None,
+    },
+}
+
+_local = threading.local()
+_init_lock = threading.Lock()
+_sqlite_ready = set()
+_pool = None
+_pool_lock = threading.Lock()
+_replicas = []
+_replica_lock = threading.Lock()
+_replica_turn = 0
+
+
+class CircuitOpenError(mysql_errors.InterfaceError):
+    """Raised without contacting the server while the circuit breaker is open"""
+
+    def __init__(self, retry_after):
+        super().__init__(msg=f"Database unavailable; retrying the connection in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker around connection attempts"""
+
+    def __init__(self):
+        self.state = 'closed'
+        self.failures = 0
+        self.retry_at = 0.0
+        self.probing = False
+        self.trips = 0
+        self.rejected = 0
+        self.last_error = None
+        self._lock = threading.Lock()
+
+    def retry_after(self):
+        return max(self.retry_at - time.monotonic(), 0.0)
+
+    def before_attempt(self):
+        """Raise CircuitOpenError unless this caller may contact the server"""
+        with self._lock:
+            if self.state == 'closed':
+                return
+            if self.state == 'open' and time.monotonic() >= self.retry_at:
+                self.state = 'half_open'
+            if self.state == 'half_open' and not self.probing:
+                self.probing = True
+                return
+            self.rejected += 1
+            retry_after = self.retry_after()
+        raise CircuitOpenError(retry_after)
+
+    def succeeded(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self.probing = False
+
+    def failed(self, error):
+        settings = STORAGE_CONFIG['breaker']
+        with self._lock:
+            self.failures += 1
+            self.last_error = str(error)
+            self.probing = False
+            if self.state == 'half_open' or self.failures >= settings['failure_threshold']:
+                if self.state != 'open':
+                    self.trips += 1
+                self.state = 'open'
+                self.retry_at = time.monotonic() + settings['open_seconds']
+
+    def status(self):
+        with self._lock:
+            return {'state': self.state, 'consecutive_failures': self.failures,
+                    'retry_after_seconds': round(self.retry_after(), 1) if self.state == 'open' else None,
+                    'trips': self.trips, 'rejected': self.rejected, 'last_error': self.last_error}
+
+
+breaker = CircuitBreaker()
+
+
+def configure(backend, mysql_config=None, sqlite_config=None, pool_size=None):
+    """Select the storage backend and its settings"""
+    global _pool
+    if backend not in ('mysql', 'sqlite'):
+        raise ValueError(f"Unknown DB_BACKEND: {backend}")
+    STORAGE_CONFIG['backend'] = backend
+    if mysql_config is not None:
+        STORAGE_CONFIG['mysql'] = mysql_config
+    if sqlite_config:
+        STORAGE_CONFIG['sqlite'].update(sqlite_config)
+    if STORAGE_CONFIG['sqlite']['seed_admin'] and not STORAGE_CONFIG['sqlite']['admin_password']:
+        raise ValueError("seed_admin needs an admin_password (SQLITE_ADMIN_PASSWORD)")
+    if pool_size is not None:
+        STORAGE_CONFIG['pool_size'] = pool_size
+    _pool = None
+
+
+def backend():
+    return STORAGE_CONFIG['backend']
+
+
+def connect(batch=False):
+    """Open a connection on the configured backend
+
+    batch=True is for background jobs: an unpooled connection with the batch
+    settings (no interactive statement time limit, a longer read timeout).
+    """
+    if STORAGE_CONFIG['backend'] == 'sqlite':
+        return connect_sqlite()
+    breaker.before_attempt()
+    try:
+        conn = connect_mysql_batch() if batch else connect_mysql()
+    except Exception as e:
+        breaker.failed(e)
+        raise
+    breaker.succeeded()
+    return conn
+
+
+def configure_timeouts(read_timeout, batch_mysql_config=None, batch_read_timeout=0):
+    """Set the socket read timeouts and the MySQL settings of batch connections"""
+    STORAGE_CONFIG['read_timeout'] = read_timeout
+    STORAGE_CONFIG['batch'] = {'mysql': batch_mysql_config, 'read_timeout': batch_read_timeout}
+
+
+def configure_breaker(settings):
+    STORAGE_CONFIG['breaker'].update(settings)
+
+
+def breaker_status():
+    if STORAGE_CONFIG['backend'] != 'mysql':
+        return None
+    return breaker.status()
+
+
+# ============================================
+# MySQL backend
+# ============================================
+
+class PooledConnection:
+    """Pooled MySQL connection that ends any open transaction when released
+
+    The pool does not reset the session on release (that would deallocate the
+    prepared statements cached on the connection), so a rollback is issued
+    instead to drop the read view left open by plain SELECTs.
+    """
+
+    def __init__(self, cnx):
+        self._cnx = cnx
+
+    def __getattr__(self, name):
+        return getattr(self._cnx, name)
+
+    @property
+    def wrapped(self):
+        return self._cnx._cnx
+
+    def close(self):
+        try:
+            self._cnx.rollback()
+        except mysql_errors.Error:
+            pass
+        self._cnx.close()
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = pooling.MySQLConnectionPool(
+                    pool_name='oil_shop',
+                    pool_size=min(STORAGE_CONFIG['pool_size'], pooling.CNX_POOL_MAXSIZE),
+                    pool_reset_session=False,
+                    **STORAGE_CONFIG['mysql'])
+    return _pool
+
+
+def set_read_timeout(conn, timeout):
+    """Bound each socket read and write of a pure-Python connection to `timeout` seconds
+
+    Applied on every checkout: the pool reconnects broken connections on new
+    sockets, and the driver resets the timeout after each handshake.
+    """
+    sock = getattr(driver_connection(conn), '_socket', None)
+    if sock is not None:
+        sock.set_connection_timeout(timeout or None)
+    return conn
+
+
+def connect_mysql():
+    """Borrow a pooled connection, opening a direct one when the pool is exhausted"""
+    timeout = STORAGE_CONFIG['read_timeout']
+    if STORAGE_CONFIG['pool_size'] <= 0:
+        return set_read_timeout(mysql.connector.connect(**STORAGE_CONFIG['mysql']), timeout)
+    try:
+        return set_read_timeout(PooledConnection(_get_pool().get_connection()), timeout)
+    except mysql_errors.PoolError:
+        return set_read_timeout(mysql.connector.connect(**STORAGE_CONFIG['mysql']), timeout)
+
+
+def connect_mysql_batch():
+    """Open a direct connection with the batch settings"""
+    settings = STORAGE_CONFIG['batch']
+    config = settings['mysql'] if settings['mysql'] is not None else STORAGE_CONFIG['mysql']
+    return set_read_timeout(mysql.connector.connect(**config), settings['read_timeout'])
+
+
+def driver_connection(conn):
+    """Return the driver connection behind tracing and pooling wrappers"""
+    while True:
+        inner = getattr(conn, 'wrapped', None)
+        if inner is None:
+            return conn
+        conn = inner
+
+
+def statement_cache(conn):
+    """Return the prepared-cursor cache bound to the underlying driver session"""
+    cache = getattr(conn, 'statements', None)
+    if cache is not None:
+        return cache
+    driver = driver_connection(conn)
+    session = getattr(driver, 'connection_id', None)
+    cached = getattr(driver, '_prepared_statements', None)
+    if cached is None or cached[0] != session:
+        cached = (session, {})
+        driver._prepared_statements = cached
+    return cached[1]
+
+
+# ============================================
+# MySQL read replicas
+# ============================================
+
+class ReplicaConnection(PooledConnection):
+    """Connection to a read replica; never use it for writes"""
+
+    is_replica = True
+
+
+def is_replica(conn):
+    return getattr(conn, 'is_replica', False)
+
+
+class _Replica:
+    """Pool and health of one replica endpoint"""
+
+    def __init__(self, index, config):
+        self.index = index
+        self.config = config
+        self.pool = None
+        self.usable_until = 0.0
+        self.skip_until = 0.0
+        self.lag = None
+        self.state = 'unchecked'
+
+    def status(self):
+        return {'host': self.config.get('host'), 'port': self.config.get('port', 3306),
+                'state': self.state, 'lag_seconds': self.lag}
+
+    def _open(self):
+        if self.pool is None and STORAGE_CONFIG['pool_size'] > 0:
+            self.pool = pooling.MySQLConnectionPool(
+                pool_name=f'oil_shop_replica_{self.index}',
+                pool_size=min(STORAGE_CONFIG['pool_size'], pooling.CNX_POOL_MAXSIZE),
+                pool_reset_session=False,
+                **self.config)
+        if self.pool is not None:
+            try:
+                return self.pool.get_connection()
+            except mysql_errors.PoolError:
+                pass
+        return mysql.connector.connect(**self.config)
+
+    def _check_lag(self, cnx):
+        cursor = cnx.cursor(dictionary=True)
+        try:
+            try:
+                cursor.execute("SHOW REPLICA STATUS")
+            except mysql_errors.ProgrammingError:
+                # MySQL before 8.0.22
+                cursor.execute("SHOW SLAVE STATUS")
+            status = cursor.fetchone()
+        finally:
+            cursor.close()
+        if status is None:
+            return None
+        lag = status.get('Seconds_Behind_Source', status.get('Seconds_Behind_Master'))
+        return None if lag is None else int(lag)
+
+    def connect(self, now):
+        """Return a ReplicaConnection, or None while the replica is down or lagging"""
+        if now < self.skip_until:
+            return None
+        try:
+            cnx = set_read_timeout(self._open(), STORAGE_CONFIG['read_timeout'])
+        except mysql_errors.Error:
+            self.state = 'down'
+            self.skip_until = now + STORAGE_CONFIG['replica']['retry_after']
+            return None
+        if now >= self.usable_until:
+            settings = STORAGE_CONFIG['replica']
+            try:
+                self.lag = self._check_lag(cnx)
+            except mysql_errors.Error:
+                self.lag = None
+            if self.lag is None or self.lag > settings['max_lag_seconds']:
+                # Stopped or behind: read from elsewhere until the next check
+                self.state = 'lagging'
+                self.skip_until = now + settings['check_interval']
+                cnx.close()
+                return None
+            self.state = 'ok'
+            self.usable_until = now + settings['check_interval']
+        return ReplicaConnection(cnx)
+
+
+def configure_replicas(replica_configs, settings=None):
+    """Register read replicas (mysql-connector config dicts) for connect_replica"""
+    global _replicas
+    STORAGE_CONFIG['replicas'] = list(replica_configs)
+    if settings:
+        STORAGE_CONFIG['replica'].update(settings)
+    _replicas = [_Replica(i, config) for i, config in enumerate(STORAGE_CONFIG['replicas'])]
+
+
+def connect_replica():
+    """Open a connection for a read that tolerates slight staleness
+
+    Replicas are tried in turn; the primary is used when none is healthy or
+    the backend has no replicas (SQLite).
+    """
+    global _replica_turn
+    if STORAGE_CONFIG['backend'] != 'mysql' or not _replicas:
+        return connect()
+    with _replica_lock:
+        start = _replica_turn
+        _replica_turn = (_replica_turn + 1) % len(_replicas)
+    now = time.monotonic()
+    for offset in range(len(_replicas)):
+        conn = _replicas[(start + offset) % len(_replicas)].connect(now)
+        if conn is not None:
+            return conn
+    return connect()
+
+
+def replica_status():
+    return [replica.status() for replica in _replicas]
+
+
+# ============================================
+# SQL script helpers
+# ============================================
+
+def split_sql_statements(sql_script):
+    """Split a SQL script on semicolons that are outside quotes and comments"""
+    statements = []
+    current = []
+    quote = None
+    i = 0
+    length = len(sql_script)
+    while i < length:
+        char = sql_script[i]
+        if quote:
+            current.append(char)
+            if char == '\\' and i + 1 < length:
+                current.append(sql_script[i + 1])
+                i += 1
+            elif char == quote:
+                quote = None
+        elif char in ("'", '"', '`'):
+            quote = char
+            current.append(char)
+        elif sql_script.startswith('--', i) or char == '#':
+            newline = sql_script.find('\n', i)
+            i = length if newline == -1 else newline
+            continue
+        elif sql_script.startswith('/*', i):
+            end = sql_script.find('*/', i + 2)
+            i = length if end == -1 else end + 2
+            continue
+        elif char == ';':
+            statement = ''.join(current).strip()
+            if statement:
+                statements.append(statement)
+            current = []
+        else:
+            current.append(char)
+        i += 1
+    statement = ''.join(current).strip()
+    if statement:
+        statements.append(statement)
+    return statements
+
+
+def _split_top_level(body):
+    """Split a column/constraint list on commas that are not inside parentheses"""
+    parts = []
+    depth = 0
+    current = []
+    quote = None
+    for char in body:
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in ("'", '"'):
+            quote = char
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            parts.append(''.join(current).strip())
+            current = []
+            continue
+        current.append(char)
+    if ''.join(current).strip():
+        parts.append(''.join(current).strip())
+    return parts
+
+
+_CREATE_TABLE_RE = re.compile(r'^CREATE\s+TABLE\s+(IF\s+NOT\s+EXISTS\s+)?`?(\w+)`?\s*\(', re.IGNORECASE)
+_INDEX_DEF_RE = re.compile(r'^(UNIQUE\s+)?(?:INDEX|KEY)\s+`?(\w+)`?\s*\((.*)\)$', re.IGNORECASE | re.DOTALL)
+_AUTO_PK_RE = re.compile(r'^(`?\w+`?)\s+(?:BIG)?INT\b.*\bPRIMARY\s+KEY\b.*\bAUTO_INCREMENT\b.*$', re.IGNORECASE | re.DOTALL)
+_ENUM_RE = re.compile(r'^(`?\w+`?)\s+ENUM\s*\(([^)]*)\)', re.IGNORECASE)
+_VIEW_RE = re.compile(r'^CREATE\s+OR\s+REPLACE\s+VIEW\s+`?(\w+)`?', re.IGNORECASE)
+_LOCAL_NOW = "(datetime('now', 'localtime'))"
+
+
+def _translate_create_table(statement):
+    match = _CREATE_TABLE_RE.match(statement)
+    table = match.group(2)
+    body = statement[match.end():statement.rindex(')')]
+    columns = []
+    extra = []
+    has_updated_at = False
+
+    for definition in _split_top_level(body):
+        index = _INDEX_DEF_RE.match(definition)
+        if index:
+            kind = 'UNIQUE INDEX' if index.group(1) else 'INDEX'
+            extra.append(f"CREATE {kind} IF NOT EXISTS {table}_{index.group(2)} ON {table} ({index.group(3)})")
+            continue
+        if re.match(r'^PRIMARY\s+KEY\b', definition, re.IGNORECASE) or \
+                re.match(r'^(CONSTRAINT\s+\w+\s+)?FOREIGN\s+KEY\b', definition, re.IGNORECASE):
+            columns.append(definition)
+            continue
+
+        if _AUTO_PK_RE.match(definition):
+            columns.append(f"{definition.split()[0]} INTEGER PRIMARY KEY AUTOINCREMENT")
+            continue
+        enum = _ENUM_RE.match(definition)
+        if enum:
+            definition = f"{enum.group(1)} TEXT CHECK ({enum.group(1)} IN ({enum.group(2)}))" \
+                         + definition[enum.end():]
+        if re.search(r'\bON\s+UPDATE\s+CURRENT_TIMESTAMP\b', definition, re.IGNORECASE):
+            has_updated_at = definition.split()[0].strip('`')
+            definition = re.sub(r'\s*\bON\s+UPDATE\s+CURRENT_TIMESTAMP\b', '', definition, flags=re.IGNORECASE)
+        definition = re.sub(r'\bDEFAULT\s+CURRENT_TIMESTAMP\b', f"DEFAULT {_LOCAL_NOW}", definition, flags=re.IGNORECASE)
+        definition = re.sub(r'\bUNSIGNED\b', '', definition, flags=re.IGNORECASE)
+        definition = re.sub(r'\bAUTO_INCREMENT\b', '', definition, flags=re.IGNORECASE)
+        definition = re.sub(r'\bJSON\b', 'TEXT', definition)
+        columns.append(definition)
+
+    prefix = 'CREATE TABLE IF NOT EXISTS' if match.group(1) else 'CREATE TABLE'
+    statements = [f"{prefix} {table} (\n    " + ",\n    ".join(columns) + "\n)"]
+    statements.extend(extra)
+    if has_updated_at:
+        statements.append(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_touch_{has_updated_at} AFTER UPDATE ON {table} "
+            f"FOR EACH ROW WHEN NEW.{has_updated_at} = OLD.{has_updated_at} BEGIN "
+            f"UPDATE {table} SET {has_updated_at} = {_LOCAL_NOW} WHERE rowid = NEW.rowid; END")
+    return statements
+
+
+def translate_schema(sql_script):
+    """Translate a MySQL DDL/seed script into SQLite statements"""
+    translated = []
+    for statement in split_sql_statements(sql_script):
+        upper = statement.upper()
+        if upper.startswith(('CREATE DATABASE', 'USE ', 'SET ')):
+            continue
+        if _CREATE_TABLE_RE.match(statement):
+            translated.extend(_translate_create_table(statement))
+            continue
+        view = _VIEW_RE.match(statement)
+        if view:
+            translated.append(f"DROP VIEW IF EXISTS {view.group(1)}")
+            statement = 'CREATE VIEW' + statement[len('CREATE OR REPLACE VIEW'):]
+        translated.append(translate_sql(statement))
+    return translated
+
+
+def table_schema(tables, schema_file=None):
+    """CREATE TABLE IF NOT EXISTS statements for `tables`, taken from database_init.sql"""
+    with open(schema_file or STORAGE_CONFIG['sqlite']['schema'], 'r') as f:
+        statements = split_sql_statements(f.read())
+    prefixes = tuple(f"CREATE TABLE {table} " for table in tables)
+    return [statement.replace('CREATE TABLE', 'CREATE TABLE IF NOT EXISTS', 1)
+            for statement in statements if statement.startswith(prefixes)]
+
+
+def ensure_tables(conn, *tables):
+    """Create the given tables on the configured backend when they are missing"""
+    cursor = conn.cursor()
+    try:
+        for statement in table_schema(tables):
+            if backend() == 'sqlite':
+                for translated in translate_schema(statement):
+                    cursor.execute(translated)
+            else:
+                cursor.execute(statement)
+        conn.commit()
+    finally:
+        cursor.close()
+
+
+# ============================================
+# SQLite backend
+# ============================================
+
+_PLACEHOLDER_RE = re.compile(r'%\((\w+)\)s|%s')
+_FOR_UPDATE_RE = re.compile(r'\s+FOR\s+UPDATE(\s+SKIP\s+LOCKED)?\s*$', re.IGNORECASE)
+_translation_cache = {}
+_CENTS = Decimal('0.01')
+
+
+def translate_sql(sql):
+    """Translate a single MySQL statement to SQLite syntax (cached)"""
+    translated = _translation_cache.get(sql)
+    if translated is not None:
+        return translated
+    text = _PLACEHOLDER_RE.sub(lambda m: f":{m.group(1)}" if m.group(1) else '?', sql)
+    text = text.replace('%%', '%')
+    text = _FOR_UPDATE_RE.sub('', text)
+    text = re.sub(r'^\s*EXPLAIN\s+(?!QUERY\s+PLAN)', 'EXPLAIN QUERY PLAN ', text, flags=re.IGNORECASE)
+    text = re.sub(r'^\s*INSERT\s+IGNORE\b', 'INSERT OR IGNORE', text, flags=re.IGNORECASE)
+    if len(_translation_cache) < 2048:
+        _translation_cache[sql] = text
+    return text
+
+
+def _parse_timestamp(value):
+    text = value.decode() if isinstance(value, bytes) else str(value)
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        return text
+
+
+def _to_decimal(value):
+    try:
+        number = Decimal(value.decode() if isinstance(value, bytes) else str(value))
+    except ArithmeticError:
+        return value
+    # NUMERIC affinity stores 32.00 as 32; restore the DECIMAL(10, 2) scale
+    if number.as_tuple().exponent > -2:
+        number = number.quantize(_CENTS)
+    return number
+
+
+def _month(value):
+    parsed = _parse_timestamp(value) if value is not None else None
+    return parsed.month if isinstance(parsed, (date, datetime)) else None
+
+
+def _year(value):
+    parsed = _parse_timestamp(value) if value is not None else None
+    return parsed.year if isinstance(parsed, (date, datetime)) else None
+
+
+sqlite3.register_adapter(Decimal, str)
+sqlite3.register_adapter(datetime, lambda value: value.strftime('%Y-%m-%d %H:%M:%S'))
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+sqlite3.register_converter('TIMESTAMP', _parse_timestamp)
+sqlite3.register_converter('DATETIME', _parse_timestamp)
+sqlite3.register_converter('DECIMAL', _to_decimal)
+
+
+def _translate_error(e):
+    message = str(e)
+    if isinstance(e, sqlite3.IntegrityError):
+        return mysql_errors.IntegrityError(msg=message)
+    if isinstance(e, sqlite3.OperationalError):
+        return mysql_errors.OperationalError(msg=message)
+    if isinstance(e, (sqlite3.ProgrammingError, sqlite3.InterfaceError)):
+        return mysql_errors.ProgrammingError(msg=message)
+    return mysql_errors.DatabaseError(msg=message)
+
+
+def _dict_factory(cursor, row):
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+
+class SQLiteCursor:
+    """mysql-connector style cursor over a sqlite3 cursor"""
+
+    def __init__(self, cursor, dictionary=False):
+        self._cursor = cursor
+        if dictionary:
+            self._cursor.row_factory = _dict_factory
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def column_names(self):
+        return tuple(column[0] for column in self._cursor.description or ())
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        try:
+            self._cursor.execute(translate_sql(operation), params if params is not None else ())
+        except sqlite3.Error as e:
+            raise _translate_error(e) from e
+        return None
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        try:
+            self._cursor.executemany(translate_sql(operation), seq_params)
+        except sqlite3.Error as e:
+            raise _translate_error(e) from e
+        return None
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchmany(self, size=1):
+        return self._cursor.fetchmany(size)
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """mysql-connector style facade over a cached per-thread sqlite3 connection"""
+
+    def __init__(self, conn, statements):
+        self._conn = conn
+        self.statements = statements
+
+    @property
+    def wrapped(self):
+        return self._conn
+
+    def cursor(self, dictionary=False, buffered=None, prepared=None, **kwargs):
+        return SQLiteCursor(self._conn.cursor(), dictionary=dictionary)
+
+    def commit(self):
+        try:
+            self._conn.commit()
+        except sqlite3.Error as e:
+            raise _translate_error(e) from e
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def start_transaction(self, *args, **kwargs):
+        if not self._conn.in_transaction:
+            self._conn.execute('BEGIN IMMEDIATE')
+
+    @property
+    def in_transaction(self):
+        return self._conn.in_transaction
+
+    def is_connected(self):
+        return True
+
+    def ping(self, *args, **kwargs):
+        return None
+
+    def close(self):
+        # The underlying connection stays cached for this thread; discard
+        # any uncommitted work like closing a MySQL connection would.
+        if self._conn.in_transaction:
+            self._conn.rollback()
+
+
+def _open_sqlite(config):
+    conn = sqlite3.connect(config['path'], detect_types=sqlite3.PARSE_DECLTYPES,
+                           isolation_level='IMMEDIATE', timeout=config['busy_timeout_ms'] / 1000,
+                           cached_statements=256)
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('PRAGMA synchronous = NORMAL')
+    conn.execute('PRAGMA foreign_keys = ON')
+    conn.execute('PRAGMA temp_store = MEMORY')
+    conn.execute(f"PRAGMA mmap_size = {int(config['mmap_size'])}")
+    conn.execute(f"PRAGMA cache_size = -{int(config['cache_size_kb'])}")
+    conn.execute(f"PRAGMA busy_timeout = {int(config['busy_timeout_ms'])}")
+    conn.create_function('CURDATE', 0, lambda: date.today().isoformat(), deterministic=False)
+    conn.create_function('NOW', 0, lambda: datetime.now().strftime('%Y-%m-%d %H:%M:%S'), deterministic=False)
+    conn.create_function('MONTH', 1, _month, deterministic=True)
+    conn.create_function('YEAR', 1, _year, deterministic=True)
+    return conn
+
+
+def initialize_sqlite(conn, config):
+    """Create the schema from database_init.sql"""
+    with open(config['schema'], 'r') as f:
+        statements = translate_schema(f.read())
+    conn.execute('PRAGMA foreign_keys = OFF')
+    try:
+        conn.execute('BEGIN')
+        for statement in statements:
+            conn.execute(statement)
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    finally:
+        conn.execute('PRAGMA foreign_keys = ON')
+    print(f"✓ SQLite database initialized at {config['path']}")
+
+
+def seed_admin(conn, config):
+    """Create the configured admin account unless that username exists"""
+    from werkzeug.security import generate_password_hash
+
+    cursor = conn.execute("INSERT OR IGNORE INTO employees (username, password, role) VALUES (?, ?, 'admin')",
+                          (config['admin_username'], generate_password_hash(config['admin_password'])))
+    conn.commit()
+    if cursor.rowcount:
+        print(f"✓ Admin user {config['admin_username']} created")
+
+
+def connect_sqlite():
+    """Return this thread's cached SQLite connection, creating the schema on first use"""
+    config = STORAGE_CONFIG['sqlite']
+    path = os.path.abspath(config['path'])
+    cached = getattr(_local, 'sqlite', None)
+    if cached is not None and cached[0] == path:
+        return SQLiteConnection(cached[1], cached[2])
+
+    try:
+        conn = _open_sqlite(config)
+        if path not in _sqlite_ready:
+            with _init_lock:
+                if path not in _sqlite_ready:
+                    exists = conn.execute(
+                        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'products'").fetchone()
+                    if not exists:
+                        initialize_sqlite(conn, config)
+                    if config['seed_admin']:
+                        seed_admin(conn, config)
+                    _sqlite_ready.add(path)
+    except sqlite3.Error as e:
+        raise _translate_error(e) from e
+    _local.sqlite = (path, conn, {})
+    return SQLiteConnection(conn, _local.sqlite[2])
+
+
+# ============================================
+# Command line tools
+# ============================================
+
+def print_header(text):
+    print("\n" + "="*60)
+    print(f"  {text}")
+    print("="*60 + "\n")
+
+
+def add_cli_args(parser):
+    """Add the backend and connection options shared by the command line tools"""
+    parser.add_argument('--backend', choices=['mysql', 'sqlite'],
+                        default=os.environ.get('DB_BACKEND', 'mysql'))
+    parser.add_argument('--sqlite-path', default=os.environ.get('SQLITE_PATH', 'oil_shop.db'))
+    parser.add_argument('--db-host', default=os.environ.get('DB_HOST', 'localhost'))
+    parser.add_argument('--db-user', default=os.environ.get('DB_USER', 'root'))
+    parser.add_argument('--db-password', default=os.environ.get('DB_PASSWORD', '1234'))
+    parser.add_argument('--db-name', default=os.environ.get('DB_NAME', 'oil_shop_db'))
+    return parser
+
+
+def connect_from_args(args, **mysql_options):
+    """Configure the backend from add_cli_args options and connect; None (reported) on failure
+
+    mysql_options are extra mysql.connector settings, such as allow_local_infile.
+    """
+    configure(args.backend,
+              {'host': args.db_host, 'user': args.db_user,
+               'password': args.db_password, 'database': args.db_name, **mysql_options},
+              {'path': args.sqlite_path}, pool_size=0)
+    try:
+        return connect()
+    except mysql_errors.Error as e:
+        print(f"❌ Error connecting to the database: {e}")
+        return None
@@ -0,0 +1,64 @@
+"""
+Shared fixtures: the Flask app on a throwaway SQLite database.
+
+app.py reads its settings from the environment when it is imported, so the
+app is built once per test session with DB_BACKEND=sqlite, a seeded admin,
+query budgets enforced and no background job workers.
+"""
+
+import copy
+import importlib
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import storage  # noqa: E402
+
+ADMIN_USERNAME = 'admin'
+ADMIN_PASSWORD = 'test-admin-password'
+
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    base = tmp_path_factory.mktemp('oil_shop')
+    env = pytest.MonkeyPatch()
+    env.setenv('DB_BACKEND', 'sqlite')
+    env.setenv('SQLITE_PATH', str(base / 'oil_shop.db'))
+    env.setenv('SQLITE_SEED_ADMIN', 'True')
+    env.setenv('SQLITE_ADMIN_USERNAME', ADMIN_USERNAME)
+    env.setenv('SQLITE_ADMIN_PASSWORD', ADMIN_PASSWORD)
+    env.setenv('JOBS_ENABLED', 'False')
+    env.setenv('JOB_RESULT_DIR', str(base / 'job_results'))
+    env.setenv('QUERY_TRACE', 'True')
+    env.setenv('QUERY_BUDGET_ENFORCE', 'True')
+    env.setenv('MAX_LOGIN_ATTEMPTS_PER_IP', '1000')
+    # database_init.sql and the templates are read relative to the working directory
+    env.chdir(ROOT)
+    module = importlib.import_module('app')
+    module.app.config['TESTING'] = True
+    yield module.app
+    env.undo()
+
+
+@pytest.fixture
+def client(app):
+    """Test client signed in as the seeded admin"""
+    client = app.test_client()
+    response = client.post('/login', json={'username': ADMIN_USERNAME, 'password': ADMIN_PASSWORD})
+    assert response.status_code == 200, response.get_json()
+    return client
+
+
+@pytest.fixture
+def sqlite_storage(tmp_path, monkeypatch):
+    """storage configured for a fresh SQLite file; restores the previous configuration"""
+    saved = copy.deepcopy(storage.STORAGE_CONFIG)
+    monkeypatch.chdir(ROOT)
+    storage.configure('sqlite', sqlite_config={'path': str(tmp_path / 'test.db'), 'seed_admin': False})
+    yield storage
+    storage.STORAGE_CONFIG.clear()
+    storage.STORAGE_CONFIG.update(saved)
@@ -0,0 +1,91 @@
+"""Inventory analytics: margin, GMROI, cover, sell-through and ABC classes"""
+
+import math
+
+import pandas as pd
+import pytest
+
+import analytics
+
+PERIOD_DAYS = 73  # annualizes by exactly 5
+
+
+@pytest.fixture
+def report():
+    products = pd.DataFrame.from_records([
+        (1, 'Helix 5W-40', '1', 'Engine Oil', 10.0, 6.0, 10, 5),
+        (2, 'Delvac 15W-40', '2', 'Engine Oil', 20.0, 10.0, 0, 5),
+        (3, 'Gear Oil 80W-90', '3', 'Gear Oil', 5.0, 4.0, 50, 5),
+        (4, 'Unsold', '4', None, 8.0, 5.0, 20, 5),
+    ], columns=analytics.PRODUCT_COLUMNS)
+    sales = pd.DataFrame.from_records([
+        (1, 50, 500.0, 300.0),
+        (2, 20, 400.0, 200.0),
+        (3, 10, 50.0, 40.0),
+    ], columns=analytics.SALES_COLUMNS)
+    per_product, per_category = analytics.compute(products, sales, PERIOD_DAYS)
+    return per_product.set_index('product_id'), per_category.set_index('category')
+
+
+def test_product_metrics(report):
+    products, _ = report
+    helix = products.loc[1]
+    assert helix['gross_margin'] == 200.0
+    assert helix['margin_pct'] == pytest.approx(0.4)
+    assert helix['unit_margin'] == 4.0
+    assert helix['stock_value'] == 60.0
+    assert helix['gmroi'] == pytest.approx(200 * 5 / 60)
+    assert helix['days_of_cover'] == pytest.approx(10 / (50 / PERIOD_DAYS))
+    assert helix['sell_through'] == pytest.approx(50 / 60)
+
+
+def test_zero_denominators_are_nan(report):
+    products, _ = report
+    sold_out, unsold = products.loc[2], products.loc[4]
+    assert math.isnan(sold_out['gmroi'])
+    assert sold_out['days_of_cover'] == 0
+    assert sold_out['sell_through'] == 1
+    assert unsold['units_sold'] == 0 and unsold['revenue'] == 0
+    assert math.isnan(unsold['margin_pct'])
+    assert math.isnan(unsold['days_of_cover'])
+    assert unsold['category'] == 'Uncategorized'
+
+
+def test_abc_classes(report):
+    products, _ = report
+    # 500 and 400 of 950 start below 80%, 50 starts below 95%, unsold products are C
+    assert products['abc'].to_dict() == {1: 'A', 2: 'A', 3: 'B', 4: 'C'}
+    assert list(products.index) == [1, 2, 3, 4]
+    assert products['revenue_share'].sum() == pytest.approx(1.0)
+
+
+def test_category_totals(report):
+    _, categories = report
+    engine = categories.loc['Engine Oil']
+    assert engine['products'] == 2
+    assert engine['revenue'] == 900.0
+    assert engine['gross_margin'] == 400.0
+    assert engine['margin_pct'] == pytest.approx(400 / 900)
+    assert engine['gmroi'] == pytest.approx(400 * 5 / 60)
+    assert engine['a_products'] == 2
+    assert list(categories.index) == ['Engine Oil', 'Gear Oil', 'Uncategorized']
+
+
+def test_frame_columns_rounds_and_drops_nan(report):
+    products, _ = report
+    columns = analytics.frame_columns(products.reset_index(), decimals=2)
+    assert columns['margin_pct'] == [0.4, 0.5, 0.2, None]
+    assert columns['gmroi'][1] is None
+    assert columns['abc'] == ['A', 'A', 'B', 'C']
+
+
+def test_analytics_endpoint(client):
+    body = client.get('/api/analytics/inventory?period_days=30').get_json()
+    assert body['period_days'] == 30
+    assert body['summary']['products'] == len(body['products'])
+    assert sum(body['summary']['abc'].values()) == body['summary']['products']
+
+    columnar = client.get('/api/analytics/inventory?format=columns&abc=c&limit=3').get_json()
+    assert columnar['products']['count'] <= 3
+    assert set(columnar['products']['columns']['abc']) <= {'C'}
+    assert client.get('/api/analytics/inventory?period_days=0').status_code == 400
@@ -0,0 +1,23 @@
+"""The app on the SQLite backend: sign-in and basic reads"""
+
+from conftest import ADMIN_PASSWORD, ADMIN_USERNAME
+
+
+def test_login_requires_the_seeded_password(app):
+    client = app.test_client()
+    assert client.post('/login', json={'username': ADMIN_USERNAME, 'password': 'admin123'}).status_code == 401
+    assert client.post('/login', json={'username': ADMIN_USERNAME, 'password': ADMIN_PASSWORD}).status_code == 200
+
+
+def test_products_are_served_from_sqlite(client):
+    response = client.get('/api/products')
+    assert response.status_code == 200
+    assert '1234567890123' in {product['barcode'] for product in response.get_json()}
+
+
+def test_pages_use_the_synchronous_invoice_without_job_workers(client):
+    page = client.get('/dashboard').get_data(as_text=True)
+    assert 'const JOBS_ENABLED = false;' in page
+    response = client.get('/api/sales/1/invoice')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/pdf'
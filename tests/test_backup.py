@@ -0,0 +1,70 @@
+"""Incremental backup change filtering and the updated_at columns it relies on"""
+
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import backup
+import sales_archive
+
+SINCE = datetime(2025, 1, 1, 2, 0)
+SALE_COLUMNS = ['id', 'customer_phone', 'total_amount', 'created_at', 'updated_at']
+
+
+@pytest.mark.parametrize('table, columns, expected', [
+    ('products', ['id', 'name', 'updated_at'], ("`updated_at` >= %s", (SINCE,))),
+    ('sales', SALE_COLUMNS, ("`updated_at` >= %s", (SINCE,))),
+    ('sale_items', ['id', 'sale_id', 'created_at', 'updated_at'], ("`updated_at` >= %s", (SINCE,))),
+    ('stock_movements', ['id', 'change_qty', 'created_at'], ("`created_at` >= %s", (SINCE,))),
+    # created_at alone does not see updates, so other tables are dumped in full
+    ('jobs', ['id', 'status', 'created_at'], (None, ())),
+    ('cache_versions', ['entity', 'version'], (None, ())),
+])
+def test_change_filter(table, columns, expected):
+    assert backup.change_filter(table, columns, SINCE) == expected
+
+
+def test_change_filter_without_a_base_dumps_everything():
+    assert backup.change_filter('sales', SALE_COLUMNS, None) == (None, ())
+
+
+@pytest.mark.parametrize('table', backup.CHANGE_TRACKED_TABLES)
+def test_change_tracked_tables_have_updated_at(sqlite_storage, table):
+    conn = sqlite_storage.connect()
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT * FROM {table} LIMIT 0")
+    cursor.fetchall()
+    assert 'updated_at' in cursor.column_names
+    cursor.close()
+
+
+def test_updating_a_sale_moves_its_updated_at(sqlite_storage):
+    conn = sqlite_storage.connect()
+    cursor = conn.cursor()
+    cursor.execute("UPDATE sales SET updated_at = %s WHERE id = 1", (SINCE,))
+    conn.commit()
+    cursor.execute("UPDATE sales SET customer_phone = %s WHERE id = 1", ('5550000',))
+    conn.commit()
+    cursor.execute("SELECT updated_at FROM sales WHERE id = 1")
+    assert cursor.fetchone()[0] > SINCE
+    cursor.close()
+
+
+def test_archived_sales_are_stamped_when_they_move(sqlite_storage):
+    conn = sqlite_storage.connect()
+    cursor = conn.cursor()
+    cursor.execute("UPDATE sales SET created_at = %s, updated_at = %s WHERE id = 1", (SINCE, SINCE))
+    cursor.execute("UPDATE sale_items SET created_at = %s, updated_at = %s WHERE sale_id = 1", (SINCE, SINCE))
+    conn.commit()
+
+    moved_sales, moved_items = sales_archive.archive_sales(conn, date(2025, 6, 1), 100)
+    assert (moved_sales, moved_items) == (1, 1)
+    cursor.execute("SELECT created_at, updated_at FROM sales_archive WHERE id = 1")
+    created_at, updated_at = cursor.fetchone()
+    assert created_at == SINCE
+    assert updated_at > datetime.now() - timedelta(minutes=5)
+    cursor.close()
+
+
+def test_migrate_is_a_no_op_on_sqlite(sqlite_storage):
+    assert backup.migrate(sqlite_storage.connect()) == []
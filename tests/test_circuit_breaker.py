@@ -0,0 +1,133 @@
+"""The circuit breaker around MySQL connection attempts, and the 503 it turns into"""
+
+from types import SimpleNamespace
+
+import pytest
+from mysql.connector import errors as mysql_errors
+
+import storage
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(storage, 'time', SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+
+@pytest.fixture
+def mysql_down(monkeypatch, clock):
+    """storage on the MySQL backend with a fresh breaker and a server that refuses connections"""
+    attempts = []
+
+    def refuse():
+        attempts.append(clock.now)
+        raise mysql_errors.InterfaceError(msg="Can't connect to MySQL server")
+
+    monkeypatch.setitem(storage.STORAGE_CONFIG, 'backend', 'mysql')
+    monkeypatch.setitem(storage.STORAGE_CONFIG, 'breaker', {'failure_threshold': 3, 'open_seconds': 10.0})
+    monkeypatch.setattr(storage, 'breaker', storage.CircuitBreaker())
+    monkeypatch.setattr(storage, 'connect_mysql', refuse)
+    return attempts
+
+
+def test_breaker_opens_after_consecutive_failures(mysql_down):
+    for _ in range(3):
+        with pytest.raises(mysql_errors.InterfaceError) as raised:
+            storage.connect()
+        assert not isinstance(raised.value, storage.CircuitOpenError)
+    assert storage.breaker.state == 'open'
+    assert len(mysql_down) == 3
+
+    # While open, callers fail fast without contacting the server
+    with pytest.raises(storage.CircuitOpenError) as raised:
+        storage.connect()
+    assert raised.value.retry_after == 10.0
+    assert len(mysql_down) == 3
+
+    status = storage.breaker_status()
+    assert status['state'] == 'open' and status['trips'] == 1 and status['rejected'] == 1
+    assert status['consecutive_failures'] == 3
+    assert status['last_error'].endswith("Can't connect to MySQL server")
+
+
+def test_success_resets_the_failure_count(mysql_down, monkeypatch):
+    refuse = storage.connect_mysql
+    for _ in range(2):
+        with pytest.raises(mysql_errors.InterfaceError):
+            storage.connect()
+    monkeypatch.setattr(storage, 'connect_mysql', lambda: 'connection')
+    assert storage.connect() == 'connection'
+    assert storage.breaker.failures == 0
+
+    monkeypatch.setattr(storage, 'connect_mysql', refuse)
+    for _ in range(2):
+        with pytest.raises(mysql_errors.InterfaceError):
+            storage.connect()
+    assert storage.breaker.state == 'closed'
+
+
+def test_half_open_lets_one_probe_through(clock):
+    breaker = storage.CircuitBreaker()
+    for _ in range(storage.STORAGE_CONFIG['breaker']['failure_threshold']):
+        breaker.before_attempt()
+        breaker.failed('refused')
+    assert breaker.state == 'open'
+
+    clock.now += storage.STORAGE_CONFIG['breaker']['open_seconds']
+    breaker.before_attempt()
+    assert breaker.state == 'half_open'
+    # Other callers keep failing fast while the probe is out
+    with pytest.raises(storage.CircuitOpenError):
+        breaker.before_attempt()
+
+    breaker.succeeded()
+    assert breaker.state == 'closed'
+    breaker.before_attempt()
+
+
+def test_failed_probe_reopens_the_breaker(mysql_down, clock):
+    for _ in range(3):
+        with pytest.raises(mysql_errors.InterfaceError):
+            storage.connect()
+
+    clock.now += 10.0
+    with pytest.raises(mysql_errors.InterfaceError):
+        storage.connect()
+    assert len(mysql_down) == 4
+    assert storage.breaker.state == 'open'
+    assert storage.breaker.trips == 2
+    assert storage.breaker.retry_after() == 10.0
+
+
+def test_breaker_status_only_on_mysql(sqlite_storage):
+    assert sqlite_storage.breaker_status() is None
+
+
+def test_outage_answers_503_with_retry_after(client, request):
+    # Signed-in users stay signed in through an outage once the user loader has seen them
+    assert client.get('/api/sales/1/receipt').status_code == 200
+    attempts = request.getfixturevalue('mysql_down')
+
+    # The user loader and the route both fail to connect
+    response = client.get('/api/sales/1/receipt')
+    assert response.status_code == 503
+    assert response.get_json() == {'error': 'Database connection failed'}
+    assert 'Retry-After' not in response.headers
+    assert len(attempts) == 2
+
+    response = client.get('/api/sales/1/receipt')
+    assert storage.breaker.state == 'open'
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '10'
+
+    assert client.get('/api/sales/1/receipt').headers['Retry-After'] == '10'
+    assert len(attempts) == 3
@@ -0,0 +1,56 @@
+"""Customer phone normalization, oil grades and purchase history lookups"""
+
+import pytest
+
+import customers
+
+
+@pytest.mark.parametrize('raw, normalized', [
+    ('077 123-4567', '0771234567'),
+    ('(077) 123.45/67', '0771234567'),
+    (' 555-1234 ', '5551234'),
+    ('5551234', '5551234'),
+    ('', ''),
+    (None, ''),
+])
+def test_normalize_phone(raw, normalized):
+    assert customers.normalize_phone(raw) == normalized
+
+
+@pytest.mark.parametrize('product_name, grade', [
+    ('Shell Helix Ultra 5W-40', '5W-40'),
+    ('Mobil Delvac MX 15w40', '15W-40'),
+    ('Monograde SAE 30', 'SAE 30'),
+    ('Hydraulic Oil ISO VG 68', 'ISO 68'),
+    ('Brake Fluid DOT 4', None),
+])
+def test_oil_grade(product_name, grade):
+    assert customers.oil_grade(product_name) == grade
+
+
+@pytest.mark.parametrize('phone', ['555-1234', '5551234', '555 1234'])
+def test_seeded_customer_history(client, phone):
+    response = client.get(f'/api/customers/{phone}/history')
+    assert response.status_code == 200, response.get_json()
+    body = response.get_json()
+    assert body['phone'] == '5551234'
+    assert body['stats']['customer_name'] == 'John Customer'
+    assert any(sale['customer_name'] == 'John Customer' for sale in body['sales'])
+
+
+def test_new_sale_extends_the_seeded_customer(client):
+    before = client.get('/api/customers/555-5678/history').get_json()['stats']
+    response = client.post('/api/sales', json={
+        'customer_name': 'Jane Smith', 'customer_phone': '555-5678',
+        'total_amount': 45.99, 'payment_method': 'cash',
+        'items': [{'product_id': 1, 'quantity': 1, 'price': 45.99, 'subtotal': 45.99}],
+    })
+    assert response.status_code == 200, response.get_json()
+
+    after = client.get('/api/customers/5555678/history').get_json()
+    assert after['stats']['visits'] == before['visits'] + 1
+    assert {sale['customer_phone'] for sale in after['sales']} == {'5555678'}
+
+
+def test_unknown_customer_is_not_found(client):
+    assert client.get('/api/customers/000-0000/history').status_code == 404
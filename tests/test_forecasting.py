@@ -0,0 +1,87 @@
+"""Demand smoothing and reorder suggestions"""
+
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pytest
+
+import forecasting
+from repositories import ReorderRepository
+
+TODAY = date(2025, 3, 31)  # a Monday
+
+
+def test_constant_demand_is_forecast_exactly():
+    forecast, error_std = forecasting.seasonal_smoothing(np.full((2, 28), 4.0), 0, 14)
+    assert forecast.shape == (2, 14)
+    np.testing.assert_allclose(forecast, 4.0)
+    np.testing.assert_allclose(error_std, 0.0)
+
+
+def test_weekly_pattern_is_kept():
+    # 10 units every Saturday, nothing on other days, starting on a Monday
+    matrix = np.zeros((1, 28))
+    matrix[0, 5::7] = 10
+    forecast, error_std = forecasting.seasonal_smoothing(matrix, 0, 7)
+    np.testing.assert_allclose(forecast[0], [0, 0, 0, 0, 0, 10, 0], atol=1e-9)
+    np.testing.assert_allclose(error_std, 0.0, atol=1e-9)
+
+
+def test_noisy_demand_has_error_spread_and_no_negative_forecast():
+    rng = np.random.default_rng(1)
+    forecast, error_std = forecasting.seasonal_smoothing(rng.poisson(0.3, (3, 60)).astype(float), 2, 7)
+    assert (forecast >= 0).all()
+    assert (error_std > 0).all()
+
+
+@pytest.fixture
+def steady_product(sqlite_storage):
+    """A product with 5 in stock that sold 4 units every day of the last four weeks"""
+    conn = sqlite_storage.connect()
+    cursor = conn.cursor()
+    cursor.execute("""
+        INSERT INTO products (name, barcode, category, price, cost_price, quantity, min_stock_level, supplier_id)
+        VALUES ('Steady Seller 5W-30', '5550000000001', 'Engine Oil', 20, 12.5, 5, 3, 2)
+    """)
+    product_id = cursor.lastrowid
+    start = datetime.combine(TODAY - timedelta(days=28), datetime.min.time())
+    cursor.executemany("""
+        INSERT INTO sale_items (sale_id, product_id, product_name, quantity, price, subtotal, created_at)
+        VALUES (1, %s, 'Steady Seller 5W-30', 4, 20, 80, %s)
+    """, [(product_id, start + timedelta(days=day, hours=10)) for day in range(28)])
+    conn.commit()
+    cursor.close()
+    return conn, product_id
+
+
+def test_suggestions(steady_product):
+    conn, product_id = steady_product
+    rows = forecasting.compute_suggestions(conn, TODAY, {'history_days': 28, 'lead_time_days': 7,
+                                                         'review_days': 7})
+    suggestions = {row[0]: dict(zip(forecasting.SUGGESTION_COLUMNS, row)) for row in rows}
+
+    steady = suggestions[product_id]
+    assert steady['daily_forecast'] == 4.0
+    assert steady['safety_stock'] == 0
+    assert steady['reorder_point'] == 28
+    # Enough for lead time and review period (14 days x 4) less the 5 in stock
+    assert steady['suggested_qty'] == 51
+    assert steady['estimated_cost'] == 51 * 12.5
+    assert steady['days_of_cover'] == 1.2
+    assert steady['needs_reorder'] == 1
+
+    # Seeded products sold nothing in the window and keep min_stock_level
+    unsold = suggestions[2]
+    assert unsold['reorder_point'] == 10
+    assert unsold['needs_reorder'] == 0 and unsold['suggested_qty'] == 0
+    assert unsold['days_of_cover'] is None
+
+
+def test_saved_suggestions_become_drafts_per_supplier(steady_product):
+    conn, product_id = steady_product
+    forecasting.save_suggestions(conn, forecasting.compute_suggestions(conn, TODAY, {'history_days': 28}))
+
+    drafts = ReorderRepository(conn).drafts()
+    assert [draft['supplier_id'] for draft in drafts] == [2]
+    assert [item['product_id'] for item in drafts[0]['items']] == [product_id]
+    assert drafts[0]['total_cost'] == pytest.approx(51 * 12.5)
@@ -0,0 +1,141 @@
+"""Background job queue: priority claims, retries with backoff and stale job recovery"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+import jobs
+from repositories import JobRepository
+
+
+@pytest.fixture
+def queue(sqlite_storage, monkeypatch):
+    """A connection to an empty jobs table with test handlers registered"""
+    monkeypatch.setattr(jobs, 'HANDLERS', {})
+    monkeypatch.setitem(jobs.JOBS_CONFIG, 'max_attempts', 3)
+    monkeypatch.setitem(jobs.JOBS_CONFIG, 'retry_base_seconds', 10.0)
+    monkeypatch.setitem(jobs.JOBS_CONFIG, 'retry_max_seconds', 600.0)
+    conn = sqlite_storage.connect()
+    sqlite_storage.ensure_tables(conn, 'jobs')
+    jobs.register('report', lambda ctx: {'rows': ctx.params.get('rows', 0)}, priority='low')
+    jobs.register('invoice', lambda ctx: {'sale_id': ctx.params['sale_id']}, priority='high')
+    jobs.register('export', lambda ctx: None)
+    yield conn
+    conn.close()
+
+
+def later(seconds):
+    return datetime.now().replace(microsecond=0) + timedelta(seconds=seconds)
+
+
+def claim(conn, max_priority=jobs.PRIORITIES['low'], now=None):
+    job = JobRepository(conn).claim(max_priority, now or later(1))
+    conn.commit()
+    return job
+
+
+def test_retry_delay_doubles_up_to_the_maximum(queue):
+    assert [jobs.retry_delay(attempts) for attempts in (1, 2, 3, 4)] == [10, 20, 40, 80]
+    assert jobs.retry_delay(20) == 600
+
+
+def test_jobs_are_claimed_by_priority_then_age(queue):
+    report = jobs.submit(queue, 'report')
+    export = jobs.submit(queue, 'export')
+    invoice = jobs.submit(queue, 'invoice', {'sale_id': 1})
+
+    assert [claim(queue)['id'] for _ in range(3)] == [invoice, export, report]
+    assert claim(queue) is None
+
+
+def test_reserved_workers_only_take_high_priority_jobs(queue):
+    jobs.submit(queue, 'report')
+    assert claim(queue, jobs.PRIORITIES['high']) is None
+
+    invoice = jobs.submit(queue, 'invoice', {'sale_id': 1})
+    job = claim(queue, jobs.PRIORITIES['high'])
+    assert job['id'] == invoice
+    assert job['status'] == 'running' and job['attempts'] == 1
+
+
+def test_a_job_is_claimed_once(queue):
+    jobs.submit(queue, 'export')
+    now = later(1)
+    assert claim(queue, now=now) is not None
+    assert claim(queue, now=now) is None
+
+
+def test_successful_run_stores_the_result(queue):
+    job_id = jobs.submit(queue, 'report', {'rows': 12})
+    assert jobs.run(claim(queue)) == 'completed'
+
+    job = JobRepository(queue).get(job_id)
+    assert job['status'] == 'done' and job['progress'] == 100
+    assert job['result'] == '{"rows": 12}'
+
+
+def test_failures_are_retried_with_backoff_then_fail(queue):
+    def flaky(ctx):
+        raise RuntimeError(f"attempt {ctx.attempt} failed")
+
+    jobs.register('flaky', flaky)
+    job_id = jobs.submit(queue, 'flaky')
+    repository = JobRepository(queue)
+
+    assert jobs.run(claim(queue)) == 'retried'
+    job = repository.get(job_id)
+    assert job['status'] == 'queued' and job['error'] == 'attempt 1 failed'
+    # Not due again until the first backoff (10s) has passed
+    assert claim(queue, now=later(5)) is None
+
+    assert jobs.run(claim(queue, now=later(11))) == 'retried'
+    assert claim(queue, now=later(15)) is None
+    assert jobs.run(claim(queue, now=later(21))) == 'failed'
+
+    job = repository.get(job_id)
+    assert job['status'] == 'failed' and job['attempts'] == 3
+    assert job['error'] == 'attempt 3 failed'
+    assert job['finished_at'] is not None
+    assert claim(queue, now=later(3600)) is None
+
+
+def test_job_failed_is_not_retried(queue):
+    def broken(ctx):
+        raise jobs.JobFailed('Sale 7 not found')
+
+    jobs.register('broken', broken, max_attempts=5)
+    job_id = jobs.submit(queue, 'broken')
+    assert jobs.run(claim(queue)) == 'failed'
+    job = JobRepository(queue).get(job_id)
+    assert job['attempts'] == 1 and job['max_attempts'] == 5
+    assert job['error'] == 'Sale 7 not found'
+
+
+def test_unknown_kind_fails(queue):
+    jobs.submit(queue, 'export')
+    job = claim(queue)
+    assert jobs.run(dict(job, kind='removed')) == 'failed'
+    assert JobRepository(queue).get(job['id'])['error'] == "Unknown job kind 'removed'"
+
+
+def test_stale_jobs_are_requeued_or_failed(queue):
+    repository = JobRepository(queue)
+    fresh = jobs.submit(queue, 'export')
+    claim(queue)
+    stale = jobs.submit(queue, 'export')
+    claim(queue)
+    exhausted = jobs.submit(queue, 'report')
+    for _ in range(2):
+        claim(queue)
+        repository.retry(exhausted, 'interrupted', later(0))
+    claim(queue)
+
+    cutoff = later(60)
+    repository.heartbeat([fresh], later(120))
+    assert repository.requeue_stale(cutoff, later(60)) == (1, 1)
+    queue.commit()
+
+    assert repository.get(fresh)['status'] == 'running'
+    assert repository.get(stale)['status'] == 'queued'
+    assert repository.get(exhausted)['status'] == 'failed'
+    assert repository.get(exhausted)['error'] == 'The worker running this job stopped'
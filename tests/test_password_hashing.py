@@ -0,0 +1,60 @@
+"""Login throttling token buckets and how logins answer when the password cannot be checked"""
+
+import sys
+
+import password_hashing
+
+from conftest import ADMIN_PASSWORD, ADMIN_USERNAME
+
+
+def test_bucket_allows_capacity_then_waits():
+    limiter = password_hashing.TokenBucketLimiter(3, 60)
+    assert [limiter.consume('key') for _ in range(3)] == [0, 0, 0]
+    wait = limiter.consume('key')
+    assert 0 < wait <= 60
+    assert limiter.consume('other') == 0
+
+
+def test_bucket_refund_and_reset():
+    limiter = password_hashing.TokenBucketLimiter(2, 60)
+    limiter.consume('key')
+    limiter.consume('key')
+    limiter.refund('key')
+    assert limiter.consume('key') == 0
+    assert limiter.consume('key') > 0
+    limiter.reset('key')
+    assert limiter.consume('key') == 0
+
+
+def test_refund_never_exceeds_capacity():
+    limiter = password_hashing.TokenBucketLimiter(1, 60)
+    limiter.refund('key')
+    limiter.consume('key')
+    limiter.refund('key')
+    limiter.refund('key')
+    assert limiter.consume('key') == 0
+    assert limiter.consume('key') > 0
+
+
+def test_login_during_an_outage_is_503_and_not_counted(app, monkeypatch):
+    client = app.test_client()
+    credentials = {'username': ADMIN_USERNAME, 'password': ADMIN_PASSWORD}
+    with monkeypatch.context() as outage:
+        outage.setattr(sys.modules['app'], 'get_db_connection', lambda replica=False: None)
+        for _ in range(password_hashing.PASSWORD_CONFIG['user_attempts'] + 2):
+            assert client.post('/login', json=credentials).status_code == 503
+    assert client.post('/login', json=credentials).status_code == 200
+
+
+def test_busy_hash_pool_is_503_and_not_counted(app, monkeypatch):
+    client = app.test_client()
+    credentials = {'username': ADMIN_USERNAME, 'password': ADMIN_PASSWORD}
+
+    def busy(pwhash, password):
+        raise password_hashing.HashQueueFull()
+
+    with monkeypatch.context() as pool:
+        pool.setattr(password_hashing, 'check_password', busy)
+        for _ in range(password_hashing.PASSWORD_CONFIG['user_attempts'] + 2):
+            assert client.post('/login', json=credentials).status_code == 503
+    assert client.post('/login', json=credentials).status_code == 200
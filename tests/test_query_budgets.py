@@ -0,0 +1,88 @@
+"""Every @query_budget route stays within its budget, with budgets enforced
+
+Caches are emptied before each request so the cold path, which runs the
+most queries, is the one measured. A route over its budget raises
+QueryBudgetExceeded out of the test client and fails the test.
+"""
+
+from datetime import date, datetime
+
+import pytest
+
+import cache_bus
+import jobs
+import query_tracer
+from repositories import transaction, JobRepository
+
+from conftest import ADMIN_PASSWORD, ADMIN_USERNAME
+
+CUSTOMER_PHONE = '077 123-4567'
+
+# endpoint: (method, url, json body, expected status)
+BUDGETED_REQUESTS = {
+    'get_products': ('GET', '/api/products', None, 200),
+    'get_product_by_barcode': ('GET', '/api/products/1234567890123', None, 200),
+    'get_sales': ('GET', '/api/sales', None, 200),
+    'get_items_for_sales': ('GET', '/api/sales/items?ids=1,2,{sale_id}', None, 200),
+    'get_sale_items': ('GET', '/api/sales/{sale_id}/items', None, 200),
+    'get_customer_history': ('GET', f'/api/customers/{CUSTOMER_PHONE}/history', None, 200),
+    'get_suppliers': ('GET', '/api/suppliers', None, 200),
+    'get_dashboard_stats': ('GET', '/api/dashboard/stats', None, 200),
+    'get_low_stock': ('GET', '/api/inventory/low-stock', None, 200),
+    'get_stock_at': ('GET', f'/api/inventory/stock-at?date={date.today()}', None, 200),
+    'get_stock_movements': ('GET', '/api/inventory/movements', None, 200),
+    'get_inventory_analytics': ('GET', '/api/analytics/inventory', None, 200),
+    'get_reorder_drafts': ('GET', '/api/reorder/drafts', None, 200),
+    'get_users': ('GET', '/api/users', None, 200),
+    'readiness': ('GET', '/api/ready', None, 200),
+    'get_receipt': ('GET', '/api/sales/{sale_id}/receipt', None, 200),
+    'generate_invoice': ('GET', '/api/sales/{sale_id}/invoice', None, 200),
+    'submit_job': ('POST', '/api/jobs', {'kind': 'forecast'}, 202),
+    'get_jobs': ('GET', '/api/jobs', None, 200),
+    'get_job': ('GET', '/api/jobs/{job_id}', None, 200),
+    'get_job_result': ('GET', '/api/jobs/{job_id}/result', None, 200),
+}
+
+
+@pytest.fixture(scope='module')
+def history(app):
+    """A sale with a customer phone and a finished invoice job"""
+    client = app.test_client()
+    client.post('/login', json={'username': ADMIN_USERNAME, 'password': ADMIN_PASSWORD})
+    response = client.post('/api/sales', json={
+        'customer_name': 'Budget Customer', 'customer_phone': CUSTOMER_PHONE,
+        'total_amount': 91.98, 'payment_method': 'cash',
+        'items': [{'product_id': 1, 'quantity': 2, 'price': 45.99, 'subtotal': 91.98}],
+    })
+    assert response.status_code == 200, response.get_json()
+    sale_id = response.get_json()['sale_id']
+
+    response = client.post('/api/jobs', json={'kind': 'invoice', 'params': {'sale_id': sale_id}})
+    job_id = response.get_json()['job_id']
+    with jobs.connection() as conn, transaction(conn):
+        job = JobRepository(conn).claim(jobs.PRIORITIES['low'], datetime.now())
+    assert job['id'] == job_id
+    assert jobs.run(job) == 'completed'
+    return {'sale_id': sale_id, 'job_id': job_id}
+
+
+def test_every_budgeted_route_is_covered(app):
+    budgeted = {endpoint for endpoint, view in app.view_functions.items()
+                if getattr(view, '_query_budget', None) is not None}
+    assert budgeted == set(BUDGETED_REQUESTS)
+
+
+@pytest.mark.parametrize('endpoint', sorted(BUDGETED_REQUESTS))
+def test_route_within_query_budget(app, client, history, endpoint):
+    method, url, body, status = BUDGETED_REQUESTS[endpoint]
+    cache_bus.clear_all()
+    response = client.open(url.format(**history), method=method, json=body)
+    assert response.status_code == status, response.get_data(as_text=True)[:500]
+    assert int(response.headers['X-Query-Count']) <= app.view_functions[endpoint]._query_budget
+
+
+def test_exceeding_a_budget_raises(app, client, monkeypatch):
+    monkeypatch.setattr(app.view_functions['get_sales'], '_query_budget', 1)
+    cache_bus.clear_all()
+    with pytest.raises(query_tracer.QueryBudgetExceeded):
+        client.get('/api/sales')
@@ -0,0 +1,78 @@
+"""Plain-text and ESC/POS receipt layout, and the receipt endpoint"""
+
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+import receipts
+
+SALE = {
+    'id': 42, 'created_at': datetime(2025, 3, 1, 14, 5, 9), 'employee_name': 'cashier',
+    'payment_method': 'card', 'customer_phone': '0771234567',
+    'discount': Decimal('5.00'), 'total_amount': Decimal('130.97'),
+}
+ITEMS = [
+    {'quantity': 2, 'product_name': 'Shell Helix Ultra 5W-40 Fully Synthetic 4L', 'price': Decimal('45.99'),
+     'subtotal': Decimal('91.98')},
+    {'quantity': 1, 'product_name': 'Gear Oil 80W-90', 'price': Decimal('43.99'), 'subtotal': Decimal('43.99')},
+]
+
+
+@pytest.mark.parametrize('width', [32, 42, 64])
+def test_text_lines_fit_the_paper(width):
+    text = receipts.render_text(SALE, ITEMS, width)
+    assert max(len(line) for line in text.splitlines()) <= width
+    assert '-' * width in text.splitlines()
+
+
+def test_text_layout():
+    lines = receipts.render_text(SALE, ITEMS, 42).splitlines()
+    assert lines[0].strip() == 'OIL SHOP'
+    assert lines[5].startswith('INV-00042') and lines[5].endswith('2025-03-01 14:05')
+    assert 'Payment: CARD' in lines[6]
+    assert 'Customer: 0771234567' in lines
+    assert '  2 Shell Helix Ultra 5W-40 Full     91.98' in lines
+    assert '    @ 45.99' in lines
+    # Single units get no unit-price line
+    assert sum(line.startswith('    @') for line in lines) == 1
+    assert lines[-5].startswith('Subtotal') and lines[-5].endswith('135.97')
+    assert lines[-4].startswith('Discount') and lines[-4].endswith('-5.00')
+    assert lines[-3].startswith('TOTAL') and lines[-3].endswith('$130.97')
+    assert lines[-1] == 'Thank you for your business!'.center(42).rstrip()
+
+
+def test_width_is_clamped():
+    narrow = receipts.render_text(SALE, ITEMS, 5)
+    assert max(len(line) for line in narrow.splitlines()) == receipts.RECEIPT_CONFIG['min_width']
+    assert receipts.clamp_width(None) == receipts.RECEIPT_CONFIG['width']
+    assert receipts.clamp_width(500) == receipts.RECEIPT_CONFIG['max_width']
+
+
+def test_escpos_commands_and_encoding():
+    data = receipts.render_escpos(dict(SALE, discount=0), ITEMS, 42)
+    assert isinstance(data, bytes)
+    assert data.startswith(b'\x1b@\x1ba\x01\x1d!\x11OIL SHOP\n')
+    assert b'\x1bE\x01TOTAL' in data and b'$130.97\x1bE\x00' in data
+    assert data.endswith(b'\x1bd\x03\x1dVB\x00')
+    assert b'Discount' not in data
+
+
+def test_escpos_replaces_characters_outside_the_code_page():
+    data = receipts.render_escpos(SALE, [dict(ITEMS[1], product_name='Öl ☃')], 42)
+    assert 'Öl'.encode('cp437') in data
+    assert b'?' in data
+
+
+def test_receipt_endpoint(client):
+    response = client.get('/api/sales/1/receipt?width=32')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    assert max(len(line) for line in response.get_data(as_text=True).splitlines()) <= 32
+
+    response = client.get('/api/sales/1/receipt?format=escpos')
+    assert response.mimetype == 'application/octet-stream'
+    assert response.data.startswith(receipts.ESC_INIT.encode())
+
+    assert client.get('/api/sales/1/receipt?format=pdf').status_code == 400
+    assert client.get('/api/sales/999999/receipt').status_code == 404
@@ -0,0 +1,127 @@
+"""Read replica routing: health and lag checks, fallback to the primary, read-your-writes"""
+
+from types import SimpleNamespace
+
+import pytest
+from mysql.connector import errors as mysql_errors
+
+import storage
+
+
+class FakeConnection:
+    def __init__(self, name):
+        self.name = name
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeReplica(storage._Replica):
+    """A replica endpoint with a scripted lag, or down when lag is 'down'"""
+
+    def __init__(self, index, config):
+        super().__init__(index, config)
+        self.lags = list(config['lags'])
+        self.opened = []
+
+    def _open(self):
+        if self.lags[0] == 'down':
+            raise mysql_errors.InterfaceError(msg="Can't connect to MySQL server")
+        cnx = FakeConnection(self.config['host'])
+        self.opened.append(cnx)
+        return cnx
+
+    def _check_lag(self, cnx):
+        return self.lags.pop(0) if len(self.lags) > 1 else self.lags[0]
+
+
+@pytest.fixture
+def replicas(monkeypatch):
+    """Configure replicas from {host: [lag, ...]}; the primary is FakeConnection('primary')"""
+    clock = {'now': 1000.0}
+    monkeypatch.setitem(storage.STORAGE_CONFIG, 'backend', 'mysql')
+    monkeypatch.setitem(storage.STORAGE_CONFIG, 'replicas', [])
+    monkeypatch.setitem(storage.STORAGE_CONFIG, 'replica',
+                        {'max_lag_seconds': 5, 'check_interval': 2.0, 'retry_after': 30.0})
+    monkeypatch.setattr(storage, 'connect', lambda batch=False: FakeConnection('primary'))
+    monkeypatch.setattr(storage, '_replica_turn', 0)
+    monkeypatch.setattr(storage, '_Replica', FakeReplica)
+    monkeypatch.setattr(storage, '_replicas', [])
+    monkeypatch.setattr(storage, 'time', SimpleNamespace(monotonic=lambda: clock['now']))
+
+    def configure(lags):
+        storage.configure_replicas([{'host': host, 'lags': host_lags} for host, host_lags in lags.items()])
+        return clock
+
+    return configure
+
+
+def test_without_replicas_reads_use_the_primary(sqlite_storage):
+    conn = sqlite_storage.connect_replica()
+    assert not storage.is_replica(conn)
+    conn.close()
+
+
+def test_healthy_replicas_take_turns(replicas):
+    replicas({'replica-a': [0], 'replica-b': [1]})
+    hosts = [storage.connect_replica().name for _ in range(4)]
+    assert hosts == ['replica-a', 'replica-b', 'replica-a', 'replica-b']
+    assert storage.is_replica(storage.connect_replica())
+    assert [status['state'] for status in storage.replica_status()] == ['ok', 'ok']
+
+
+def test_lagging_replica_is_skipped_until_the_next_check(replicas):
+    clock = replicas({'replica-a': [60, 0], 'replica-b': [0]})
+    assert storage.connect_replica().name == 'replica-b'
+    lagging = storage._replicas[0]
+    assert lagging.state == 'lagging' and lagging.lag == 60
+    assert lagging.opened[0].closed
+    assert storage.connect_replica().name == 'replica-b'
+
+    clock['now'] += 2.0
+    assert storage.connect_replica().name == 'replica-a'
+    assert lagging.state == 'ok'
+
+
+def test_stopped_replication_counts_as_lagging(replicas):
+    replicas({'replica-a': [None]})
+    assert storage.connect_replica().name == 'primary'
+    assert storage.replica_status()[0]['state'] == 'lagging'
+
+
+def test_down_replica_falls_back_to_the_primary(replicas):
+    clock = replicas({'replica-a': ['down']})
+    assert storage.connect_replica().name == 'primary'
+    assert storage.replica_status()[0]['state'] == 'down'
+
+    storage._replicas[0].lags = [0]
+    clock['now'] += 10.0
+    assert storage.connect_replica().name == 'primary'
+    clock['now'] += 20.0
+    assert storage.connect_replica().name == 'replica-a'
+
+
+def test_reads_after_a_write_go_to_the_primary(client, monkeypatch):
+    routed = []
+
+    def connect_replica():
+        routed.append('replica')
+        return storage.connect()
+
+    monkeypatch.setitem(storage.STORAGE_CONFIG, 'replicas', [{'host': 'replica-a'}])
+    monkeypatch.setattr(storage, 'connect_replica', connect_replica)
+
+    assert client.get('/api/products').status_code == 200
+    assert routed == ['replica']
+
+    supplier = client.get('/api/suppliers').get_json()[0]
+    routed.clear()
+    assert client.put(f"/api/suppliers/{supplier['id']}", json=supplier).status_code == 200
+    assert client.get('/api/products').status_code == 200
+    assert routed == []
+
+    with client.session_transaction() as session:
+        session['last_write_at'] -= 60
+    assert client.get('/api/products').status_code == 200
+    assert routed == ['replica']
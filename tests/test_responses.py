@@ -0,0 +1,61 @@
+"""Columnar list encoding and response compression"""
+
+import gzip
+import json
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+import responses
+
+
+def test_to_columns():
+    rows = [
+        {'id': 1, 'price': Decimal('45.99'), 'created_at': datetime(2025, 3, 1, 14, 5, 9, 123),
+         'day': date(2025, 3, 1), 'lead': timedelta(hours=1), 'note': None},
+        {'id': 2, 'price': Decimal('8.00'), 'created_at': datetime(2025, 3, 2, 9, 0),
+         'day': date(2025, 3, 2), 'lead': timedelta(0), 'note': 'x'},
+    ]
+    assert responses.to_columns(rows) == {'count': 2, 'columns': {
+        'id': [1, 2],
+        'price': [45.99, 8.0],
+        'created_at': ['2025-03-01T14:05:09', '2025-03-02T09:00:00'],
+        'day': ['2025-03-01', '2025-03-02'],
+        'lead': ['1:00:00', '0:00:00'],
+        'note': [None, 'x'],
+    }}
+
+
+def test_to_columns_empty():
+    assert responses.to_columns([]) == {'count': 0, 'columns': {}}
+
+
+@pytest.mark.parametrize('url', ['/api/products', '/api/sales', '/api/suppliers'])
+def test_columns_format_matches_rows(client, url):
+    rows = client.get(url).get_json()
+    columnar = client.get(f'{url}?format=columns').get_json()
+    assert columnar['count'] == len(rows)
+    assert set(columnar['columns']) == set(rows[0])
+    assert columnar['columns']['id'] == [row['id'] for row in rows]
+
+
+def test_large_responses_are_gzipped(client):
+    plain = client.get('/api/products')
+    assert 'Content-Encoding' not in plain.headers
+    assert len(plain.data) >= responses.COMPRESSION_CONFIG['min_size']
+
+    compressed = client.get('/api/products', headers={'Accept-Encoding': 'gzip'})
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in compressed.headers['Vary']
+    assert len(compressed.data) < len(plain.data)
+    assert json.loads(gzip.decompress(compressed.data)) == plain.get_json()
+
+
+def test_small_and_error_responses_are_not_compressed(client):
+    small = client.get('/api/products/1234567890123', headers={'Accept-Encoding': 'gzip'})
+    assert len(small.data) < responses.COMPRESSION_CONFIG['min_size']
+    assert 'Content-Encoding' not in small.headers
+    missing = client.get('/api/products/0000000000000', headers={'Accept-Encoding': 'gzip'})
+    assert missing.status_code == 404
+    assert 'Content-Encoding' not in missing.headers
@@ -0,0 +1,49 @@
+"""Batched sale-item retrieval and line items embedded in sales listings"""
+
+from repositories import SaleRepository
+
+
+def test_items_for_groups_hot_and_archived_sales(sqlite_storage):
+    conn = sqlite_storage.connect()
+    cursor = conn.cursor()
+    cursor.execute("""
+        INSERT INTO sales_archive (id, customer_name, total_amount, created_at)
+        VALUES (900, 'Archived', 22.99, '2020-01-05 10:00:00')
+    """)
+    cursor.execute("""
+        INSERT INTO sale_items_archive (id, sale_id, product_id, product_name, quantity, price, subtotal, created_at)
+        VALUES (9001, 900, 13, '2-Stroke Oil', 1, 22.99, 22.99, '2020-01-05 10:00:00')
+    """)
+    conn.commit()
+    cursor.close()
+
+    items = SaleRepository(conn).items_for([2, 1, 900, 2, 12345])
+    assert list(items) == [1, 2, 900]
+    assert [item['product_id'] for item in items[2]] == [4, 1]
+    assert [item['product_name'] for item in items[900]] == ['2-Stroke Oil']
+    assert SaleRepository(conn).items(900) == items[900]
+    assert SaleRepository(conn).items_for([]) == {}
+
+
+def test_sales_listing_embeds_items(client):
+    sales = client.get('/api/sales?include=items&limit=5').get_json()
+    assert 0 < len(sales) <= 5
+    for sale in sales:
+        assert len(sale['items']) == sale['items_count']
+        assert {item['sale_id'] for item in sale['items']} <= {sale['id']}
+    assert 'items' not in client.get('/api/sales?limit=5').get_json()[0]
+
+
+def test_items_for_many_sales(client):
+    body = client.get('/api/sales/items?ids=2,1,999999').get_json()
+    assert set(body) == {'1', '2', '999999'}
+    assert len(body['2']) == 2 and len(body['1']) == 1
+    assert body['999999'] == []
+    assert client.get('/api/sales/2/items').get_json() == body['2']
+
+
+def test_items_for_many_sales_validates_ids(client):
+    assert client.get('/api/sales/items').status_code == 400
+    assert client.get('/api/sales/items?ids=1,x').status_code == 400
+    too_many = ','.join(str(i) for i in range(1, 1002))
+    assert client.get(f'/api/sales/items?ids={too_many}').status_code == 400
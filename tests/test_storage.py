@@ -0,0 +1,138 @@
+"""SQLite backend: MySQL schema and statement translation, round trips and admin seeding"""
+
+import os
+import re
+import sqlite3
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from mysql.connector import errors as mysql_errors
+
+import storage
+
+from conftest import ROOT
+
+with open(os.path.join(ROOT, 'database_init.sql'), 'r') as f:
+    SCHEMA_SQL = f.read()
+
+SCHEMA_TABLES = set(re.findall(r'^CREATE TABLE (\w+) ', SCHEMA_SQL, re.MULTILINE))
+SCHEMA_VIEWS = set(re.findall(r'^CREATE OR REPLACE VIEW (\w+) ', SCHEMA_SQL, re.MULTILINE))
+
+
+@pytest.mark.parametrize('mysql_sql, sqlite_sql', [
+    ("SELECT * FROM products WHERE id = %s AND barcode = %s",
+     "SELECT * FROM products WHERE id = ? AND barcode = ?"),
+    ("UPDATE products SET quantity = %(quantity)s WHERE id = %(id)s",
+     "UPDATE products SET quantity = :quantity WHERE id = :id"),
+    ("SELECT name FROM products WHERE name LIKE '%%oil%%'",
+     "SELECT name FROM products WHERE name LIKE '%oil%'"),
+    ("SELECT id FROM products WHERE id = %s FOR UPDATE",
+     "SELECT id FROM products WHERE id = ?"),
+    ("SELECT id FROM jobs WHERE status = 'queued' LIMIT 1 FOR UPDATE SKIP LOCKED",
+     "SELECT id FROM jobs WHERE status = 'queued' LIMIT 1"),
+    ("INSERT IGNORE INTO cache_versions (entity) VALUES (%s)",
+     "INSERT OR IGNORE INTO cache_versions (entity) VALUES (?)"),
+    ("EXPLAIN SELECT * FROM sales", "EXPLAIN QUERY PLAN SELECT * FROM sales"),
+])
+def test_translate_sql(mysql_sql, sqlite_sql):
+    assert storage.translate_sql(mysql_sql) == sqlite_sql
+
+
+def test_translate_schema_creates_every_table_and_view():
+    conn = sqlite3.connect(':memory:')
+    for statement in storage.translate_schema(SCHEMA_SQL):
+        conn.execute(statement)
+    objects = {row[0]: row[1] for row in conn.execute("SELECT name, type FROM sqlite_master")}
+    assert {name for name, kind in objects.items() if kind == 'table'} >= SCHEMA_TABLES
+    assert {name for name, kind in objects.items() if kind == 'view'} == SCHEMA_VIEWS
+    assert objects['products_touch_updated_at'] == 'trigger'
+    assert conn.execute("SELECT COUNT(*) FROM products").fetchone()[0] > 0
+
+
+def test_translate_create_table():
+    statements = storage.translate_schema("""
+        CREATE TABLE widgets (
+            id INT PRIMARY KEY AUTO_INCREMENT,
+            kind ENUM('a', 'b') NOT NULL,
+            quantity INT UNSIGNED DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            UNIQUE KEY uniq_kind (kind),
+            INDEX idx_created (created_at)
+        );
+    """)
+    table, *rest = statements
+    assert 'id INTEGER PRIMARY KEY AUTOINCREMENT' in table
+    assert "kind TEXT CHECK (kind IN ('a', 'b')) NOT NULL" in table
+    assert 'UNSIGNED' not in table and 'ON UPDATE' not in table
+    assert "DEFAULT (datetime('now', 'localtime'))" in table
+    assert rest[:2] == ["CREATE UNIQUE INDEX IF NOT EXISTS widgets_uniq_kind ON widgets (kind)",
+                        "CREATE INDEX IF NOT EXISTS widgets_idx_created ON widgets (created_at)"]
+    assert rest[2].startswith("CREATE TRIGGER IF NOT EXISTS widgets_touch_updated_at")
+
+
+def test_mysql_style_round_trip(sqlite_storage):
+    conn = sqlite_storage.connect()
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute("""
+        INSERT INTO products (name, barcode, category, price, cost_price, quantity)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    """, ('Test Oil 5W-30', '9990001112223', 'Engine Oil', Decimal('12.50'), Decimal('8'), 3))
+    product_id = cursor.lastrowid
+    conn.commit()
+
+    cursor.execute("SELECT price, cost_price, quantity, created_at FROM products WHERE id = %s FOR UPDATE",
+                   (product_id,))
+    row = cursor.fetchone()
+    cursor.close()
+    conn.close()
+    assert row['price'] == Decimal('12.50')
+    assert str(row['cost_price']) == '8.00'
+    assert row['quantity'] == 3
+    assert isinstance(row['created_at'], datetime)
+
+
+def test_errors_are_translated(sqlite_storage):
+    conn = sqlite_storage.connect()
+    cursor = conn.cursor()
+    try:
+        with pytest.raises(mysql_errors.IntegrityError):
+            cursor.execute("INSERT INTO employees (username, password, role) VALUES (%s, %s, %s)",
+                           ('someone', 'x', 'owner'))
+        with pytest.raises(mysql_errors.OperationalError):
+            cursor.execute("SELECT * FROM no_such_table")
+    finally:
+        cursor.close()
+        conn.rollback()
+
+
+def test_ensure_tables_is_idempotent(sqlite_storage):
+    conn = sqlite_storage.connect()
+    sqlite_storage.ensure_tables(conn, 'jobs', 'stock_snapshots')
+    sqlite_storage.ensure_tables(conn, 'jobs', 'stock_snapshots')
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM jobs")
+    assert cursor.fetchone()[0] == 0
+    cursor.close()
+
+
+def test_admin_is_not_seeded_by_default(sqlite_storage):
+    conn = sqlite_storage.connect()
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM employees")
+    assert cursor.fetchone()[0] == 0
+    cursor.close()
+
+
+def test_admin_seeding_needs_the_flag_and_a_password(sqlite_storage, tmp_path):
+    with pytest.raises(ValueError):
+        sqlite_storage.configure('sqlite', sqlite_config={'path': str(tmp_path / 'seeded.db'),
+                                                          'seed_admin': True, 'admin_password': None})
+    sqlite_storage.configure('sqlite', sqlite_config={'path': str(tmp_path / 'seeded.db'),
+                                                      'seed_admin': True, 'admin_password': 'secret'})
+    conn = sqlite_storage.connect()
+    cursor = conn.cursor()
+    cursor.execute("SELECT username, role FROM employees")
+    assert cursor.fetchall() == [('admin', 'admin')]
+    cursor.close()